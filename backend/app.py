@@ -3,17 +3,236 @@
 Simple Flask server for the School Lunch Menu Web App
 """
 
-from flask import Flask, send_from_directory, jsonify, request
+from flask import Flask, Response, send_from_directory, jsonify, request
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 import sys
 import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
 
 # Import from same directory
-from school_lunch_checker import LunchMenuChecker
+from school_lunch_checker import (
+    TIMEZONE, LunchMenuChecker, allergen_codes, allergen_mask, configure_shared_cache,
+    menu_cache_headers, menu_etag, menu_now, menu_payload, metrics
+)
+from cache_backends import FileCacheBackend, cache_backend_from_url, private_temp_dir
+from menu_archive import MenuArchive
+from menu_search import MenuSearchIndex
+from schools import load_registry, prefetch_all, resolve_all
 
 # Serve frontend files from the frontend directory
 frontend_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'frontend')
 app = Flask(__name__, static_folder=frontend_dir)
 
+# Parsed menus are archived by date so repeat and historical lookups are
+# answered locally. Set LUNCH_MENU_ARCHIVE to an empty string to disable.
+archive_path = os.environ.get(
+    'LUNCH_MENU_ARCHIVE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'menu_archive.sqlite3')
+)
+menu_archive = MenuArchive(archive_path) if archive_path else None
+
+# Dish search index over the archive, rebuilt when the archive changes
+menu_search = MenuSearchIndex()
+
+# Schools served by this deployment (LUNCH_SCHOOLS_FILE, see schools.py).
+# Without a registry file requests without ?school= keep using the
+# checker's module-level URLs, so LUNCH_BASE_URL overrides still apply.
+schools_file = os.environ.get('LUNCH_SCHOOLS_FILE')
+school_registry = load_registry(schools_file)
+school_archives = {}
+_school_archives_lock = threading.Lock()
+
+
+def find_school(school_id):
+    """The School for a ?school= value (None: the default); KeyError if unknown"""
+    if school_id is None and not schools_file:
+        return None
+    return school_registry.get(school_id)
+
+
+def archive_for(school):
+    """A school's MenuArchive: the main archive for the default school and
+    a sibling file per namespace for the others"""
+    if school is None or school is school_registry.default or not archive_path:
+        return menu_archive
+    with _school_archives_lock:
+        if school.namespace not in school_archives:
+            root, ext = os.path.splitext(archive_path)
+            school_archives[school.namespace] = MenuArchive(
+                f"{root}-{school.namespace}{ext}"
+            )
+        return school_archives[school.namespace]
+
+
+# With several worker processes (see wsgi.py) or nodes, parsed pages and
+# rendered responses are shared through a cache backend so only one worker
+# fetches and parses each page: LUNCH_CACHE_BACKEND takes a memory://,
+# file:// or redis:// URL, LUNCH_SHARED_CACHE_DIR is a file:// shortcut.
+cache_backend_url = os.environ.get('LUNCH_CACHE_BACKEND')
+shared_cache_dir = os.environ.get('LUNCH_SHARED_CACHE_DIR')
+if cache_backend_url:
+    shared_cache = cache_backend_from_url(cache_backend_url)
+elif shared_cache_dir:
+    shared_cache = FileCacheBackend(shared_cache_dir)
+else:
+    shared_cache = None
+configure_shared_cache(shared_cache)
+
+# Background prefetch (enable with LUNCH_PREFETCH=1). Times are "HH:MM" for
+# every school day or "fri HH:MM" for one weekday; the Friday afternoon runs
+# pick up next week's menu, which the school usually posts on Friday. The
+# times are Ljubljana wall-clock times whatever the host's timezone.
+DEFAULT_PREFETCH_TIMES = '06:30,10:30,fri 12:00,fri 15:00,fri 18:00'
+WEEKDAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+PREFETCH_TIMEZONE = ZoneInfo(TIMEZONE)
+# Of several worker processes only the one holding this file's lock
+# prefetches (an empty LUNCH_PREFETCH_LOCK lets every process prefetch); by
+# default it lives in a directory private to this user
+PREFETCH_LOCK = os.environ.get('LUNCH_PREFETCH_LOCK')
+
+
+def parse_prefetch_times(spec):
+    """Parse "HH:MM" / "fri HH:MM" entries into (weekdays, hour, minute) tuples"""
+    schedule = []
+    for entry in spec.split(','):
+        entry = entry.strip().lower()
+        if not entry:
+            continue
+        if ' ' in entry:
+            day, clock = entry.split(None, 1)
+            weekdays = (WEEKDAY_NAMES.index(day[:3]),)
+        else:
+            clock = entry
+            weekdays = (0, 1, 2, 3, 4)
+        hour, minute = map(int, clock.split(':'))
+        schedule.append((weekdays, hour, minute))
+    return schedule
+
+
+def next_prefetch_time(schedule, now):
+    """The first scheduled prefetch strictly after now"""
+    candidates = []
+    for days_ahead in range(8):
+        day = now + timedelta(days=days_ahead)
+        for weekdays, hour, minute in schedule:
+            if day.weekday() in weekdays:
+                when = day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                if when > now:
+                    candidates.append(when)
+    return min(candidates) if candidates else None
+
+
+class PrefetchScheduler(threading.Thread):
+    """Daemon thread that warms the menu caches at the scheduled times
+
+    With lock_path, only the process holding an exclusive flock on that file
+    prefetches, so several gunicorn workers do not all warm the same pages;
+    another process takes over at its next scheduled time if the owner exits.
+    """
+
+    def __init__(self, schedule, lock_path=None):
+        super().__init__(name='menu-prefetch', daemon=True)
+        self.schedule = schedule
+        self.lock_path = lock_path
+        self._lock_file = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def owns_schedule(self):
+        """Whether this process is the one that prefetches"""
+        if self.lock_path is None or fcntl is None or self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def release(self):
+        """Give up the schedule so another process can take it over"""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def seconds_until_next(self, now=None):
+        """Seconds until the next scheduled prefetch, or None
+
+        The schedule is in Ljubljana time; now may be in any timezone.
+        """
+        now = (now or datetime.now(timezone.utc)).astimezone(PREFETCH_TIMEZONE)
+        when = next_prefetch_time(self.schedule, now)
+        if when is None:
+            return None
+        # Subtract in UTC so DST transitions are accounted for
+        delay = when.astimezone(timezone.utc) - now.astimezone(timezone.utc)
+        return delay.total_seconds()
+
+    def run_once(self):
+        if not self.owns_schedule():
+            return
+        if schools_file:
+            # Every school's site is warmed at once
+            for school_id, warmed in prefetch_all(school_registry, archive_for).items():
+                if isinstance(warmed, str):
+                    print(f"Error prefetching menus for {school_id}: {warmed}")
+                else:
+                    print(f"🔄 Prefetched {len(warmed)} menu page(s) for {school_id}")
+            return
+        try:
+            warmed = LunchMenuChecker(archive=menu_archive).prefetch()
+            print(f"🔄 Prefetched {len(warmed)} menu page(s)")
+        except Exception as e:
+            print(f"Error prefetching menus: {e}")
+
+    def run(self):
+        # Warm once at startup, then follow the schedule
+        try:
+            self.run_once()
+            while not self._stop_event.is_set():
+                delay = self.seconds_until_next()
+                if delay is None or self._stop_event.wait(delay):
+                    return
+                self.run_once()
+        finally:
+            self.release()
+
+
+prefetch_scheduler = None
+
+
+def start_prefetch_scheduler():
+    """Start the background prefetch thread (once per process)"""
+    global prefetch_scheduler
+    if prefetch_scheduler is None:
+        schedule = parse_prefetch_times(
+            os.environ.get('LUNCH_PREFETCH_TIMES', DEFAULT_PREFETCH_TIMES)
+        )
+        lock_path = PREFETCH_LOCK
+        if lock_path is None:
+            lock_path = os.path.join(private_temp_dir('school-lunch'), 'prefetch.lock')
+        prefetch_scheduler = PrefetchScheduler(schedule, lock_path or None)
+        prefetch_scheduler.start()
+    return prefetch_scheduler
+
+
+# Run as a script, the app is served through the Flask reloader, whose
+# watching parent process imports this module too; only the serving child
+# (WERKZEUG_RUN_MAIN) starts the scheduler, see the __main__ block below.
+if os.environ.get('LUNCH_PREFETCH') == '1' and __name__ != '__main__':
+    start_prefetch_scheduler()
+
 @app.route('/')
 def index():
     """Serve the main web app"""
@@ -25,50 +244,187 @@ def other_files(filename):
     """Serve other files"""
     return send_from_directory(frontend_dir, filename)
 
+
+# Serving mode for /api/menu: "direct" resolves every request (through the
+# page caches), "swr" answers from the last good result and refreshes it in
+# the background once it is older than LUNCH_SWR_SOFT_TTL seconds.
+SERVE_MODE = os.environ.get('LUNCH_SERVE_MODE', 'direct')
+SWR_SOFT_TTL = int(os.environ.get('LUNCH_SWR_SOFT_TTL', '300'))
+
+
+def build_menu_payload(test_date_str=None, school=None):
+    """Resolve the menu and build the /api/menu JSON payload
+
+    Returns ``(payload, error)``; ``error`` is set when the school site could
+    not be read, so the payload should not replace a previous good one.
+    """
+    test_date = datetime.strptime(test_date_str, '%Y-%m-%d') if test_date_str else None
+
+    # One listing fetch and one week-page fetch resolve both the menu
+    # link (URL and date range) and the day's menu content
+    if school is None:
+        checker = LunchMenuChecker(archive=menu_archive)
+    else:
+        checker = school.checker(archive_for(school))
+    resolution = checker.resolve_menu(test_date)
+
+    response_data = menu_payload(
+        resolution['menu_info'], resolution['menu'], test_date or menu_now()
+    )
+    response_data['fetched_at'] = datetime.now().isoformat()
+    response_data['test_date'] = test_date_str if test_date_str else None
+    if school is not None:
+        response_data['school'] = school.id
+    return response_data, resolution['error']
+
+
+class StaleWhileRevalidateCache:
+    """Last good /api/menu payload per key, refreshed in the background
+
+    A payload younger than soft_ttl is served as-is. An older one is still
+    served immediately (flagged stale) while a single background refresh
+    replaces it; failed refreshes keep the last good payload. With a shared
+    ``store`` (a cache_backends.CacheBackend) payloads built by other workers
+    are picked up too.
+    """
+
+    MAX_ENTRIES = 64
+    SHARED_ENTRY_TTL = 24 * 3600
+
+    def __init__(self, soft_ttl, store=None):
+        self.soft_ttl = soft_ttl
+        self.store = store
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Return ``(payload, stale, error)`` for key, building it on first use
+
+        ``error`` can only be set on a first build, which is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if self.store is not None and (entry is None or self._is_stale(entry)):
+            entry = self._load_shared(key, entry)
+
+        if entry is None:
+            payload, error = build()
+            if error is None:
+                self._store(key, payload)
+                self._save_shared(key, payload)
+            return payload, False, error
+
+        if self._is_stale(entry):
+            self._refresh_in_background(key, build)
+            return entry['payload'], True, None
+        return entry['payload'], False, None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _is_stale(self, entry):
+        return time.monotonic() - entry['stored_at'] >= self.soft_ttl
+
+    def _store(self, key, payload, stored_at=None):
+        entry = {'payload': payload, 'stored_at': stored_at or time.monotonic()}
+        with self._lock:
+            self._entries[key] = entry
+            if len(self._entries) > self.MAX_ENTRIES:
+                oldest = min(self._entries, key=lambda k: self._entries[k]['stored_at'])
+                del self._entries[oldest]
+        return entry
+
+    def _load_shared(self, key, entry):
+        """Adopt another worker's payload for key if it is newer than entry"""
+        try:
+            record = self.store.get(f"response:{key}")
+        except Exception as e:
+            print(f"Error reading shared response cache: {e}")
+            return entry
+        if not record:
+            return entry
+        # Monotonic clocks differ between processes; go by wall-clock age
+        stored_at = time.monotonic() - max(0.0, time.time() - record['stored_at'])
+        if entry and entry['stored_at'] >= stored_at:
+            return entry
+        return self._store(key, record['payload'], stored_at)
+
+    def _save_shared(self, key, payload):
+        if self.store is None:
+            return
+        try:
+            self.store.set(
+                f"response:{key}", {'payload': payload, 'stored_at': time.time()},
+                ttl=self.SHARED_ENTRY_TTL
+            )
+        except Exception as e:
+            print(f"Error writing shared response cache: {e}")
+
+    def _refresh_in_background(self, key, build):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                payload, error = build()
+                if error is None:
+                    self._store(key, payload)
+                    self._save_shared(key, payload)
+                else:
+                    print(f"Menu refresh failed, serving stale data: {error}")
+            except Exception as e:
+                print(f"Menu refresh failed, serving stale data: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name='menu-refresh', daemon=True).start()
+
+
+menu_responses = StaleWhileRevalidateCache(SWR_SOFT_TTL, shared_cache)
+
+
 @app.route('/api/menu')
 def get_menu():
     """API endpoint to get today's menu (or a specific test date)"""
     try:
         # Check if there's a test_date parameter
         test_date_str = request.args.get('test_date')
-        
-        checker = LunchMenuChecker()
-        
-        # Override the date if test_date is provided
-        if test_date_str:
-            from datetime import datetime
-            test_date = datetime.strptime(test_date_str, '%Y-%m-%d')
-            # Temporarily override datetime.now() in the checker
-            menu_result = checker.check_lunch_menu_for_date(test_date)
+        try:
+            school = find_school(request.args.get('school'))
+        except KeyError:
+            return jsonify({'success': False, 'error': 'Unknown school'}), 404
+
+        with metrics.timer('api_menu'):
+            if SERVE_MODE == 'swr':
+                key = test_date_str or f"today:{menu_now().date().isoformat()}"
+                if school is not None:
+                    key = f"{school.id}:{key}"
+                payload, stale, error = menu_responses.get(
+                    key, lambda: build_menu_payload(test_date_str, school)
+                )
+            else:
+                payload, error = build_menu_payload(test_date_str, school)
+                stale = False
+
+        response_data = dict(payload, stale=stale, timestamp=datetime.now().isoformat())
+        response = jsonify(response_data)
+
+        # Good menus are valid until the day ends; stale or failed ones, and
+        # weeks not covering the day, must be revalidated so clients pick up
+        # the refreshed menu
+        response.headers['ETag'] = menu_etag(response_data)
+        if error:
+            response.headers['Cache-Control'] = 'no-store'
+        elif stale:
+            response.headers['Cache-Control'] = 'no-cache'
         else:
-            # Get today's menu content
-            menu_result = checker.check_lunch_menu()
-        
-        # Get menu info (includes URL and date range)
-        menu_info = checker.get_current_week_menu_url_for_date(
-            test_date if test_date_str else None
-        )
-        
-        from datetime import datetime as dt
-        response_data = {
-            'success': True,
-            'menu': menu_result,
-            'timestamp': dt.now().isoformat(),
-            'test_date': test_date_str if test_date_str else None
-        }
-        
-        # Add menu URL and date range if available
-        if menu_info:
-            response_data['source_url'] = menu_info['url']
-            response_data['menu_title'] = menu_info['text']
-            
-            # Extract date range from menu title
-            import re
-            date_match = re.search(r'(\d{1,2}\.\s*\d{1,2}\.\s*–\s*\d{1,2}\.\s*\d{1,2}\.\s*\d{4})', menu_info['text'])
-            if date_match:
-                response_data['date_range'] = date_match.group(1)
-        
-        return jsonify(response_data)
+            response.headers.update(menu_cache_headers(response_data))
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -76,6 +432,125 @@ def get_menu():
         }), 500
 
 
+@app.route('/api/schools')
+def list_schools():
+    """API endpoint listing the schools served (ids for ?school=)"""
+    return jsonify({
+        'success': True,
+        'default': school_registry.default.id,
+        'schools': [school.to_dict() for school in school_registry],
+    })
+
+
+@app.route('/api/menus')
+def get_all_menus():
+    """API endpoint with every school's menu, fetched concurrently"""
+    test_date_str = request.args.get('test_date')
+    try:
+        test_date = (
+            datetime.strptime(test_date_str, '%Y-%m-%d') if test_date_str else None
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    with metrics.timer('api_menus'):
+        resolutions = resolve_all(school_registry, test_date, archive_for)
+    return jsonify({
+        'success': all(r['error'] is None for r in resolutions.values()),
+        'test_date': test_date_str,
+        'menus': {
+            school_id: dict(menu_payload(r['menu_info'], r['menu']),
+                            success=r['error'] is None, error=r['error'])
+            for school_id, r in resolutions.items()
+        },
+    })
+
+
+# Most results one /api/search request returns
+MAX_SEARCH_LIMIT = 200
+
+
+@app.route('/api/search')
+def search_menu():
+    """API endpoint to find the days serving a dish (?q=pica[&from=YYYY-MM-DD])
+
+    Answered from the archive's search index only, never from the school site.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'error': 'Missing search query (?q=)'}), 400
+    if menu_archive is None:
+        return jsonify({'success': False, 'error': 'Menu archive is disabled'}), 503
+
+    since = request.args.get('from')
+    try:
+        if since:
+            datetime.strptime(since, '%Y-%m-%d')
+        limit = int(request.args.get('limit', '50'))
+        if limit < 1:
+            raise ValueError(limit)
+    except ValueError:
+        error = 'Invalid from or limit parameter'
+        return jsonify({'success': False, 'error': error}), 400
+    limit = min(limit, MAX_SEARCH_LIMIT)
+
+    with metrics.timer('search'):
+        menu_search.refresh(menu_archive)
+        results = menu_search.search(query, since=since, limit=limit)
+        today = menu_now().date().isoformat()
+        upcoming = menu_search.search(query, since=today, limit=1)
+
+    return jsonify({
+        'success': True,
+        'query': query,
+        'count': len(results),
+        'results': results,
+        'next': upcoming[0] if upcoming else None,
+    })
+
+
+@app.route('/api/menu/safe')
+def safe_menu_days():
+    """API endpoint listing archived days free of some allergens
+
+    ?exclude=G,L[&from=YYYY-MM-DD][&to=YYYY-MM-DD][&section=KOSILO] is
+    answered with a bitmask filter over the archive, never from the school site.
+    Days printed without allergen codes are only listed (flagged
+    ``annotated: false``) with &unannotated=1.
+    """
+    if menu_archive is None:
+        return jsonify({'success': False, 'error': 'Menu archive is disabled'}), 503
+
+    start = request.args.get('from')
+    end = request.args.get('to')
+    section = request.args.get('section')
+    unannotated = request.args.get('unannotated') == '1'
+    try:
+        exclude = allergen_mask(request.args.get('exclude', ''))
+        for value in (start, end):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+        with metrics.timer('safe_days'):
+            days = menu_archive.safe_days(
+                exclude, start, end, section.upper() if section else None, unannotated
+            )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    return jsonify({
+        'success': True,
+        'exclude': allergen_codes(exclude),
+        'section': section.upper() if section else None,
+        'count': len(days),
+        'days': days,
+    })
+
+
+@app.route('/metrics')
+def get_metrics():
+    """Stage timings and cache/upstream counters in Prometheus text format"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
 
 
 if __name__ == '__main__':
@@ -84,5 +559,11 @@ if __name__ == '__main__':
     print("📋 This is a Progressive Web App - can be installed on phones!")
     print("")
     
+    if (
+        os.environ.get('LUNCH_PREFETCH') == '1'
+        and os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    ):
+        start_prefetch_scheduler()
+
     # Run on port 8080 to avoid conflicts
     app.run(host='0.0.0.0', port=8080, debug=True)
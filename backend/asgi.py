@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+ASGI variant of the /api/menu endpoint, on AsyncLunchMenuChecker
+
+Each request waiting on the school site is a suspended coroutine instead of
+a blocked thread, so one process holds thousands of them:
+    cd backend && uvicorn asgi:app --port 8080
+
+It serves /api/menu (same parameters, payload, ETag and Cache-Control
+headers as the Flask app) and /metrics, and shares app.py's configuration:
+the menu archive, the school registry and the cache backend. Menus are
+always built on request (LUNCH_SERVE_MODE does not apply); the page caches
+keep repeated requests off the school site. Needs httpx (pip install httpx).
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as flask_app  # noqa: E402
+from async_checker import AsyncLunchMenuChecker, close_clients  # noqa: E402
+from school_lunch_checker import (  # noqa: E402
+    etag_matches,
+    menu_cache_headers,
+    menu_etag,
+    menu_now,
+    menu_payload,
+    metrics,
+)
+
+
+async def build_menu_payload(test_date_str=None, school=None):
+    """Async app.build_menu_payload: returns ``(payload, error)``"""
+    test_date = datetime.strptime(test_date_str, "%Y-%m-%d") if test_date_str else None
+
+    if school is None:
+        checker = AsyncLunchMenuChecker(archive=flask_app.menu_archive)
+    else:
+        checker = AsyncLunchMenuChecker(
+            archive=flask_app.archive_for(school), school=school
+        )
+    resolution = await checker.resolve_menu(test_date)
+
+    response_data = menu_payload(
+        resolution["menu_info"], resolution["menu"], test_date or menu_now()
+    )
+    response_data["fetched_at"] = datetime.now().isoformat()
+    response_data["test_date"] = test_date_str if test_date_str else None
+    if school is not None:
+        response_data["school"] = school.id
+    return response_data, resolution["error"]
+
+
+async def get_menu(query, request_headers):
+    """/api/menu; returns ``(status, headers, body)``"""
+    try:
+        test_date_str = query.get("test_date")
+        try:
+            school = flask_app.find_school(query.get("school"))
+        except KeyError:
+            return _json(404, {"success": False, "error": "Unknown school"})
+
+        with metrics.timer("api_menu"):
+            payload, error = await build_menu_payload(test_date_str, school)
+
+        response_data = dict(payload, stale=False, timestamp=datetime.now().isoformat())
+        etag = menu_etag(response_data)
+        headers = {"ETag": etag}
+        if error:
+            headers["Cache-Control"] = "no-store"
+        else:
+            headers.update(menu_cache_headers(response_data))
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            return 304, headers, b""
+        return _json(200, response_data, headers)
+    except Exception as e:
+        return _json(500, {"success": False, "error": str(e)})
+
+
+async def get_metrics(query, request_headers):
+    body = metrics.render_prometheus().encode()
+    return 200, {"Content-Type": "text/plain; version=0.0.4"}, body
+
+
+ROUTES = {
+    "/api/menu": get_menu,
+    "/metrics": get_metrics,
+}
+
+
+def _json(status, data, headers=None):
+    headers = dict(headers or {}, **{"Content-Type": "application/json"})
+    return status, headers, json.dumps(data, ensure_ascii=False).encode()
+
+
+async def app(scope, receive, send):
+    """The ASGI application"""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    handler = ROUTES.get(scope["path"])
+    if handler is None:
+        status, headers, body = _json(404, {"success": False, "error": "Not found"})
+    elif scope["method"] not in ("GET", "HEAD"):
+        status, headers, body = _json(
+            405, {"success": False, "error": "Method not allowed"}
+        )
+    else:
+        query = {
+            name: values[-1]
+            for name, values in parse_qs(
+                scope["query_string"].decode("latin-1")
+            ).items()
+        }
+        request_headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        status, headers, body = await handler(query, request_headers)
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in headers.items()
+            ]
+            + [(b"content-length", str(len(body)).encode())],
+        }
+    )
+    await send(
+        {
+            "type": "http.response.body",
+            "body": b"" if scope["method"] == "HEAD" else body,
+        }
+    )
+
+
+async def _lifespan(receive, send):
+    """Close the shared upstream clients on shutdown"""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_clients()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -0,0 +1,283 @@
+"""
+asyncio version of LunchMenuChecker on httpx
+
+AsyncLunchMenuChecker resolves menus exactly like LunchMenuChecker: it
+inherits the listing and week-page parsers, the menu selection (including
+the Friday rules), the formatting and the archive lookups, and it shares
+the process-wide page caches, metrics, rate limits and circuit breakers.
+Only the waits differ: network requests are awaited, and the calls that
+block on a shared cache backend (Redis, locked files) or on the SQLite
+archive run in worker threads, so one event loop can hold thousands of
+requests waiting on the school site without a thread each (see asgi.py).
+
+httpx is optional; it is only needed when this module is used:
+
+    pip install httpx
+"""
+
+import asyncio
+from urllib.parse import urlparse
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - exercised only without httpx
+    httpx = None
+
+from school_lunch_checker import (
+    BASE_URL,
+    HOST_POOL_SIZE,
+    TRANSIENT_STATUSES,
+    USER_AGENT,
+    CircuitOpenError,
+    LunchMenuChecker,
+    menu_now,
+)
+
+_clients = {}
+
+
+def shared_client(base_url=None):
+    """The process-wide httpx.AsyncClient used to talk to a school site
+
+    Like school_lunch_checker.shared_session, every host gets its own client
+    whose pool holds at most HOST_POOL_SIZE connections. Clients belong to
+    the event loop that first uses them; close them with close_clients().
+    """
+    host = urlparse(base_url or BASE_URL).netloc
+    client = _clients.get(host)
+    if client is None or client.is_closed:
+        client = _clients[host] = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=HOST_POOL_SIZE, max_keepalive_connections=HOST_POOL_SIZE
+            ),
+        )
+    return client
+
+
+async def close_clients():
+    """Close every shared client (on application shutdown)"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: concurrent calls for a key share one task
+
+    A waiter being cancelled does not cancel the shared task.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+
+async def _run(blocking, fn, *args):
+    """fn(*args), in a worker thread when it blocks on I/O"""
+    if blocking:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+class AsyncLunchMenuChecker(LunchMenuChecker):
+    """LunchMenuChecker whose upstream requests are awaited
+
+    Call ``await checker.resolve_menu(date)``; the parsing, selection and
+    formatting helpers are the synchronous ones it inherits.
+    """
+
+    upstream_flight = AsyncSingleFlight()
+
+    def __init__(
+        self, archive=None, base_url=None, menu_url=None, school=None, client=None
+    ):
+        if httpx is None:
+            raise RuntimeError("AsyncLunchMenuChecker needs httpx (pip install httpx)")
+        super().__init__(archive, base_url, menu_url, school)
+        self.client = client or shared_client(self.base_url)
+
+    def _open_session(self):
+        """Requests go through self.client; no requests.Session is needed"""
+        return None
+
+    async def _fetch_cached(self, cache, url, parse, revalidate=False):
+        """Async _fetch_cached; concurrent misses share one upstream request
+
+        The cache's cross-worker lock is not taken, so a shared cache backend
+        may see one fetch per process instead of one in total.
+        """
+        key = f"{self.namespace}:{url}" if self.namespace else url
+        entry = await _run(cache.shared is not None, cache.get, key)
+        if entry and not revalidate and cache.is_fresh(entry):
+            self.metrics.inc(
+                "lunch_cache_requests_total", cache=cache.name, result="hit"
+            )
+            return entry["data"]
+
+        return await self.upstream_flight.do(
+            key, lambda: self._refresh_cached(cache, url, parse, revalidate, key)
+        )
+
+    async def _refresh_cached(self, cache, url, parse, revalidate, key=None):
+        key = key or url
+        entry = await _run(cache.shared is not None, cache.get, key)
+        if entry and not revalidate and cache.is_fresh(entry):
+            self.metrics.inc(
+                "lunch_cache_requests_total", cache=cache.name, result="hit"
+            )
+            return entry["data"]
+
+        headers = cache.conditional_headers(entry)
+        try:
+            with self.metrics.timer(f"{cache.name}_fetch"):
+                response = await self.fetch(url, headers)
+        except CircuitOpenError:
+            if entry is None:
+                raise
+            self.metrics.inc(
+                "lunch_cache_requests_total", cache=cache.name, result="stale"
+            )
+            return entry["data"]
+        except Exception:
+            self.metrics.inc("lunch_upstream_errors_total", cache=cache.name)
+            raise
+        return await _run(
+            cache.shared is not None,
+            self._update_cached,
+            cache,
+            key,
+            entry,
+            response,
+            parse,
+        )
+
+    async def fetch(self, url, headers=None):
+        """GET url through the shared rate limits, retries and circuit breakers
+
+        Mirrors UpstreamFetcher.get with the waits awaited.
+        """
+        upstream = self.upstream
+        host = urlparse(url).netloc
+        breaker = upstream.breaker(host)
+        started = upstream._clock()
+        attempt = 0
+        while True:
+            upstream._admit(host, breaker, self.metrics)
+            if upstream.rate:
+                bucket = upstream.bucket(host)
+                waited = 0.0
+                while delay := bucket.try_acquire():
+                    await asyncio.sleep(delay)
+                    waited += delay
+                if waited:
+                    self.metrics.observe("rate_limit", waited)
+
+            retry_after = None
+            timeout = upstream._attempt_timeout(started)
+            try:
+                response = await self.client.get(
+                    url, headers=headers or None, timeout=timeout
+                )
+                if response.status_code in TRANSIENT_STATUSES:
+                    retry_after = response.headers.get("Retry-After")
+                    response.raise_for_status()
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                delay = upstream._retry_delay(
+                    host, breaker, attempt, retry_after, started, self.metrics
+                )
+                if delay is None:
+                    raise e
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                breaker.cancel_trial()
+                raise
+            upstream._record_response(host, breaker, response, self.metrics)
+            return response
+
+    async def _fetch_menu_links(self, revalidate=False):
+        return await self._fetch_cached(
+            self.listing_cache, self.menu_url, self._parse_menu_links, revalidate
+        )
+
+    async def get_week_menu(self, url, revalidate=False):
+        return await self._fetch_cached(
+            self.week_cache,
+            url,
+            lambda content: self._parse_week_menu(url, content),
+            revalidate,
+        )
+
+    async def _day_menu(self, menu_info, day):
+        try:
+            week = await self.get_week_menu(menu_info["url"])
+            await _run(self.archive is not None, self._archive_week, week, menu_info)
+            with self.metrics.timer("format"):
+                return self._format_day_menu(week, menu_info, day), None
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            return f"Napaka pri pridobivanju jedilnika: {e}", str(e)
+        except Exception as e:
+            return f"Napaka pri obdelavi jedilnika: {e}", str(e)
+
+    async def resolve_menu(self, target_date=None):
+        """Async resolve_menu: same result dict, same selection rules"""
+        with self.metrics.timer("resolve"):
+            return await self._resolve_menu(target_date)
+
+    async def _resolve_menu(self, target_date):
+        archived = await _run(
+            self.archive is not None, self._archived_resolution, target_date
+        )
+        if archived:
+            return archived
+
+        menu_info = None
+        error = None
+        try:
+            menu_info = self.select_menu(*await self._fetch_menu_links(), target_date)
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            print(f"Error fetching menu page: {e}")
+            error = str(e)
+        except Exception as e:
+            print(f"Error parsing menu page: {e}")
+            error = str(e)
+
+        if not menu_info:
+            return self._menu_not_found(target_date, error)
+
+        print(f"📋 Našel jedilnik: {menu_info['text']}")
+
+        menu, error = await self._day_menu(menu_info, target_date or menu_now())
+        return {"menu_info": menu_info, "menu": menu, "error": error}
+
+    async def prefetch(self):
+        """Async prefetch: revalidate the listing and the current and next week"""
+        all_menus, fallback_links = await self._fetch_menu_links(revalidate=True)
+
+        today = menu_now().replace(hour=0, minute=0, second=0, microsecond=0)
+        current = self._select_current_menu(all_menus, fallback_links)
+        upcoming = sorted(
+            (m for m in all_menus if m["start_date"] > today),
+            key=lambda x: x["start_date"],
+        )
+
+        warmed = []
+        for menu_info in [current] + upcoming[:1]:
+            if menu_info and menu_info["url"] not in warmed:
+                week = await self.get_week_menu(menu_info["url"], revalidate=True)
+                await _run(
+                    self.archive is not None, self._archive_week, week, menu_info
+                )
+                warmed.append(menu_info["url"])
+        return warmed
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Historical backfill of every published Jedilnik page into the menu archive
+
+Discovers every Jedilnik link on the prehrana listing and fetches the week
+pages concurrently through a bounded worker pool, never exceeding a
+per-host request rate. Each page is parsed and written to the archive as
+soon as it arrives, so an interrupted run loses nothing: running it again
+skips the weeks already archived and retries only the missing or failed
+ones. Re-running over a complete archive makes no week requests at all.
+
+Usage:
+    python backend/backfill.py                         # 4 workers, 2 requests/s
+    python backend/backfill.py --workers 8 --rate 5
+    python backend/backfill.py --refresh               # re-fetch archived weeks too
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from crawler import DEFAULT_ARCHIVE  # noqa: E402
+from menu_archive import MenuArchive  # noqa: E402
+from school_lunch_checker import (  # noqa: E402
+    LunchMenuChecker,
+    Metrics,
+    UpstreamFetcher,
+    content_hash,
+)
+
+
+@dataclass
+class BackfillReport:
+    """Outcome and throughput of one backfill run"""
+
+    discovered: int = 0
+    skipped: int = 0
+    stored: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    requests: int = 0
+    bytes_downloaded: int = 0
+    throttled_seconds: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def pages_per_second(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def kib_per_second(self):
+        return self.bytes_downloaded / 1024 / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (
+            f"{self.discovered} weeks linked: {len(self.stored)} stored, "
+            f"{len(self.unchanged)} unchanged, {self.skipped} already archived, "
+            f"{len(self.failed)} failed; "
+            f"{self.requests} requests in {self.elapsed:.1f}s "
+            f"({self.pages_per_second:.1f} pages/s, {self.kib_per_second:.1f} KiB/s, "
+            f"{self.throttled_seconds:.1f}s throttled)"
+        )
+
+
+class MenuBackfill:
+    """Fetch every linked week page into a MenuArchive
+
+    The checker is given its own fetch layer (UpstreamFetcher) limited to
+    ``rate`` requests per second per host, and its own metrics, from which
+    the time spent throttled is reported.
+    """
+
+    def __init__(
+        self, archive, checker=None, workers=4, rate=2.0, burst=1, refresh=False
+    ):
+        self.archive = archive
+        self.checker = checker or LunchMenuChecker()
+        self.checker.upstream = UpstreamFetcher(rate=rate, burst=burst)
+        self.checker.metrics = Metrics()
+        self.workers = workers
+        self.refresh = refresh
+        self._lock = threading.Lock()
+
+    def discover(self):
+        """Every Jedilnik link on the listing, in page order and deduplicated
+
+        Links carrying a parsable date range come with their start and end
+        dates, so the archive can index their days.
+        """
+        return self.checker.week_links(*self.checker.menu_links())
+
+    def run(self):
+        """Backfill the archive; returns a BackfillReport"""
+        report = BackfillReport()
+        started = time.perf_counter()
+
+        links = self.discover()
+        report.discovered = len(links)
+        if self.refresh:
+            pending = links
+        else:
+            pending = [
+                link for link in links if self.archive.week_hash(link["url"]) is None
+            ]
+        report.skipped = len(links) - len(pending)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            futures = {
+                pool.submit(self._backfill_week, report, link): link for link in pending
+            }
+            for future in as_completed(futures):
+                url = futures[future]["url"]
+                try:
+                    stored = future.result()
+                except Exception as e:
+                    report.failed[url] = str(e)
+                    continue
+                (report.stored if stored else report.unchanged).append(url)
+
+        report.elapsed = time.perf_counter() - started
+        stages = self.checker.metrics.snapshot()["stages"]
+        report.throttled_seconds = stages.get("rate_limit", {}).get("seconds", 0.0)
+        return report
+
+    def _backfill_week(self, report, link):
+        """Fetch, parse and archive one week; returns whether it was written"""
+        url = link["url"]
+        response = self.checker.fetch(url)
+        with self._lock:
+            report.requests += 1
+        response.raise_for_status()
+        with self._lock:
+            report.bytes_downloaded += len(response.content)
+
+        digest = content_hash(response.content)
+        # Keep the validators so the incremental crawler can revalidate it;
+        # they are written with the week, so a failed write is retried
+        page = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        if self.archive.has_week(url, digest):
+            self.archive.record_page(url, page["etag"], page["last_modified"], digest)
+            return False
+        week = self.checker.parse_week(url, response.content)
+        return self.archive.record_week(week, link, page)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--archive",
+        default=os.environ.get("LUNCH_MENU_ARCHIVE") or DEFAULT_ARCHIVE,
+        help="SQLite archive to fill",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="concurrent fetches")
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=2.0,
+        help="requests per second per host (0 for unlimited)",
+    )
+    parser.add_argument(
+        "--burst", type=int, default=1, help="requests allowed back to back per host"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="re-fetch weeks that are already archived",
+    )
+    args = parser.parse_args(argv)
+
+    archive = MenuArchive(args.archive)
+    try:
+        backfill = MenuBackfill(
+            archive,
+            workers=args.workers,
+            rate=args.rate,
+            burst=args.burst,
+            refresh=args.refresh,
+        )
+        report = backfill.run()
+    finally:
+        archive.close()
+
+    print(f"📚 {report.summary()}")
+    for url, error in report.failed.items():
+        print(f"   ❌ {url}: {error}")
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
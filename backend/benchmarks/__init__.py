@@ -0,0 +1 @@
+# Offline performance tooling for the school lunch checker
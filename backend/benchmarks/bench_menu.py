@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the menu hot paths
+
+Times every stage of answering /api/menu against the recorded page corpus
+(benchmarks/corpus/, no network access) and reports ops/sec and memory
+allocated per operation, so regressions are visible.
+
+Usage (from backend/):
+    python -m benchmarks.bench_menu                      # all stages
+    python -m benchmarks.bench_menu --stage week_table   # one stage
+    python -m benchmarks.bench_menu --json results.json  # save results
+    python -m benchmarks.bench_menu --baseline results.json
+    python -m benchmarks.bench_menu --record             # re-record corpus
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+
+# Allow running as a script from backend/benchmarks as well
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The Flask app must not write the on-disk archive while benchmarking
+os.environ.setdefault("LUNCH_MENU_ARCHIVE", "")
+
+import school_lunch_checker  # noqa: E402
+from benchmarks.corpus import (  # noqa: E402
+    CORPUS_DIR,
+    MANIFEST_PATH,
+    LISTING_PATH,
+    CorpusSession,
+    load_pages,
+    week_paths,
+)
+
+BASE_URL = "https://ostrbovlje.si"
+# A Wednesday inside the recorded "Jedilnik 12.1.–16.1. 2026" week
+BENCH_DATE = datetime(2026, 1, 14)
+BENCH_WEEK_PATH = "/prehrana/jedilnik/jedilnik-431/"
+
+# Relative slowdown against a baseline that gets flagged as a regression
+REGRESSION_THRESHOLD = 0.2
+
+
+@contextmanager
+def corpus_session():
+    """Route every LunchMenuChecker to the recorded corpus"""
+    session = CorpusSession(BASE_URL)
+    original = school_lunch_checker.shared_session
+    school_lunch_checker.shared_session = lambda base_url=None: session
+    try:
+        yield session
+    finally:
+        school_lunch_checker.shared_session = original
+        school_lunch_checker.clear_caches()
+
+
+def build_stages():
+    """Return {stage_name: zero-argument callable} for every benchmarked stage"""
+    pages = load_pages()
+    listing = pages[LISTING_PATH]
+    week_url = BASE_URL + BENCH_WEEK_PATH
+    week_page = pages[BENCH_WEEK_PATH]
+
+    checker = school_lunch_checker.LunchMenuChecker()
+    soup = school_lunch_checker.bs4.BeautifulSoup(week_page, "html.parser")
+    week = checker.parse_week(week_url, week_page)
+    all_menus, _ = checker.parse_listing(listing)
+    menu_info = checker.select_menu(all_menus, [], BENCH_DATE)
+
+    def format_response():
+        menu = checker._format_day_menu(week, menu_info, BENCH_DATE)
+        payload = school_lunch_checker.menu_payload(menu_info, menu)
+        school_lunch_checker.menu_etag(payload)
+        return json.dumps(payload, ensure_ascii=False)
+
+    import app
+
+    app.SERVE_MODE = "direct"
+    client = app.app.test_client()
+    api_url = f"/api/menu?test_date={BENCH_DATE.strftime('%Y-%m-%d')}"
+
+    def api_cold():
+        school_lunch_checker.clear_caches()
+        return client.get(api_url)
+
+    def api_warm():
+        return client.get(api_url)
+
+    return {
+        "listing_links": lambda: checker.parse_listing(listing),
+        "week_table": lambda: checker.parse_week(week_url, week_page),
+        "allergens": lambda: checker.extract_allergen_info(soup),
+        "format_response": format_response,
+        "api_cold": api_cold,
+        "api_warm": api_warm,
+    }
+
+
+def measure(fn, iterations, min_time=0.2):
+    """Time fn and sample its allocations
+
+    Runs at least ``iterations`` times and at least ``min_time`` seconds, then
+    traces a few extra calls for peak memory and allocated blocks per op.
+    """
+    fn()  # warm-up: imports, lazy caches
+
+    ops = 0
+    start = time.perf_counter()
+    while ops < iterations or time.perf_counter() - start < min_time:
+        fn()
+        ops += 1
+    elapsed = time.perf_counter() - start
+
+    samples = min(ops, 5)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        for _ in range(samples):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    net_blocks = sum(stat.count_diff for stat in stats)
+
+    return {
+        "ops": ops,
+        "ops_per_sec": ops / elapsed,
+        "us_per_op": elapsed / ops * 1e6,
+        "peak_kib": peak / 1024,
+        "net_blocks_per_op": net_blocks / samples,
+    }
+
+
+def run_benchmarks(iterations=200, stages=None, min_time=0.2):
+    """Run the selected stages against the corpus; returns {stage: result}"""
+    results = {}
+    # The checker's progress messages would drown the report
+    with corpus_session(), redirect_stdout(io.StringIO()):
+        available = build_stages()
+        for name in stages or available:
+            results[name] = measure(available[name], iterations, min_time)
+    return results
+
+
+def print_results(results, baseline=None):
+    print(
+        f"{'stage':<18}{'ops/sec':>12}{'µs/op':>12}{'peak KiB':>11}"
+        f"{'blocks/op':>11}  vs baseline"
+    )
+    for name, result in results.items():
+        change = ""
+        if baseline and name in baseline:
+            ratio = baseline[name]["ops_per_sec"] / result["ops_per_sec"] - 1
+            change = f"{ratio:+.0%} time"
+            if ratio > REGRESSION_THRESHOLD:
+                change += "  ⚠️ REGRESSION"
+        print(
+            f"{name:<18}{result['ops_per_sec']:>12.1f}{result['us_per_op']:>12.1f}"
+            f"{result['peak_kib']:>11.1f}{result['net_blocks_per_op']:>11.1f}  {change}"
+        )
+
+
+def record_corpus():
+    """Re-record the listing and every linked weekly page from the live site"""
+    checker = school_lunch_checker.LunchMenuChecker()
+    response = checker.session.get(checker.menu_url, timeout=10)
+    response.raise_for_status()
+    manifest = {LISTING_PATH: "prehrana.html"}
+    with open(os.path.join(CORPUS_DIR, "prehrana.html"), "wb") as f:
+        f.write(response.content)
+
+    _, links = checker.parse_listing(response.content)
+    for link in links:
+        if not link["url"].startswith(checker.base_url):
+            continue
+        path = link["url"][len(checker.base_url) :]
+        filename = path.strip("/").split("/")[-1] + ".html"
+        page = checker.session.get(link["url"], timeout=10)
+        page.raise_for_status()
+        with open(os.path.join(CORPUS_DIR, filename), "wb") as f:
+            f.write(page.content)
+        manifest[path] = filename
+        print(f"📥 {link['text']} -> {filename}")
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--iterations", type=int, default=200, help="minimum ops per stage"
+    )
+    parser.add_argument(
+        "--stage", action="append", help="run only this stage (repeatable)"
+    )
+    parser.add_argument("--json", metavar="FILE", help="write results as JSON")
+    parser.add_argument(
+        "--baseline", metavar="FILE", help="compare against saved results"
+    )
+    parser.add_argument(
+        "--record", action="store_true", help="re-record the corpus from ostrbovlje.si"
+    )
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_corpus()
+        return
+
+    print(f"📊 Benchmarking {len(week_paths())} recorded week pages from {CORPUS_DIR}")
+    results = run_benchmarks(args.iterations, args.stage)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
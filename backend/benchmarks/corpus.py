@@ -0,0 +1,66 @@
+"""
+Recorded ostrbovlje.si pages used by the offline benchmarks and tools
+
+``corpus/manifest.json`` maps URL paths on the school site to the recorded
+HTML files next to it.
+"""
+
+import json
+import os
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+MANIFEST_PATH = os.path.join(CORPUS_DIR, "manifest.json")
+
+LISTING_PATH = "/prehrana/"
+
+
+def load_manifest():
+    """Return the {url_path: filename} manifest"""
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_pages():
+    """Return {url_path: page_bytes} for every recorded page"""
+    pages = {}
+    for path, filename in load_manifest().items():
+        with open(os.path.join(CORPUS_DIR, filename), "rb") as f:
+            pages[path] = f.read()
+    return pages
+
+
+def week_paths():
+    """URL paths of the recorded weekly menu pages"""
+    return sorted(path for path in load_manifest() if path != LISTING_PATH)
+
+
+class CorpusResponse:
+    """Just enough of requests.Response for LunchMenuChecker"""
+
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+
+            raise requests.HTTPError(f"{self.status_code} for recorded page")
+
+
+class CorpusSession:
+    """Session stand-in that answers from the corpus instead of the network"""
+
+    def __init__(self, base_url="https://ostrbovlje.si"):
+        self.base_url = base_url
+        self.pages = load_pages()
+        self.requests = 0
+
+    def get(self, url, timeout=None, headers=None):
+        self.requests += 1
+        path = url[len(self.base_url) :] if url.startswith(self.base_url) else url
+        content = self.pages.get(path)
+        if content is None:
+            return CorpusResponse(b"", status_code=404)
+        return CorpusResponse(content)
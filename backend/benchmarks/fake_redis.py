@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Minimal in-memory Redis-protocol server
+
+Understands the commands cache_backends.RedisCacheBackend sends (PING, GET,
+SET with EX/PX/NX/XX, DEL, EXISTS, SCAN, KEYS, SELECT, AUTH, FLUSHDB,
+DBSIZE, and EVAL of its unlock script), enough to run the shared cache
+across several local servers in tests and load tests without a real Redis.
+
+Usage (from backend/):
+    python -m benchmarks.fake_redis --port 6380
+    LUNCH_CACHE_BACKEND=redis://127.0.0.1:6380/0 python wsgi.py
+"""
+
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+from collections import Counter
+
+from cache_backends import RedisCacheBackend
+
+
+class FakeRedis:
+    """Threaded RESP server keeping its keys in a dict
+
+    ``commands`` counts the commands received by name.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.data = {}
+        self.commands = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.server = socketserver.ThreadingTCPServer(
+            (host, port), self._handler_class()
+        )
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.server.serve_forever,
+            args=(0.05,),
+            name="fake-redis",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _live(self, key):
+        """The value of key, dropping it if expired (call with the lock held)"""
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args):
+        """Run one command; returns the reply (an Exception for errors)"""
+        name = args[0].decode().upper()
+        args = args[1:]
+        self.commands[name] += 1
+        with self._lock:
+            if name == "PING":
+                return "PONG"
+            if name in ("SELECT", "AUTH"):
+                return "OK"
+            if name == "GET":
+                return self._live(args[0])
+            if name == "SET":
+                return self._set(args)
+            if name == "DEL":
+                removed = 0
+                for key in args:
+                    if self._live(key) is not None:
+                        removed += 1
+                    self.data.pop(key, None)
+                return removed
+            if name == "EVAL":
+                return self._eval(args)
+            if name == "EXISTS":
+                return sum(self._live(key) is not None for key in args)
+            if name in ("KEYS", "SCAN"):
+                pattern = args[0] if name == "KEYS" else b"*"
+                options = [arg.decode().upper() for arg in args]
+                if name == "SCAN" and "MATCH" in options:
+                    pattern = args[options.index("MATCH") + 1]
+                keys = [
+                    key
+                    for key in list(self.data)
+                    if self._live(key) is not None
+                    and fnmatch.fnmatchcase(key.decode(), pattern.decode())
+                ]
+                # One SCAN call returns everything, with the final cursor
+                return keys if name == "KEYS" else [b"0", keys]
+            if name == "FLUSHDB":
+                self.data.clear()
+                return "OK"
+            if name == "DBSIZE":
+                return sum(self._live(key) is not None for key in list(self.data))
+        return Exception(f"ERR unknown command '{name}'")
+
+    def _eval(self, args):
+        """EVAL, for RedisCacheBackend.UNLOCK_SCRIPT only"""
+        if args[0].decode() != RedisCacheBackend.UNLOCK_SCRIPT:
+            return Exception("ERR only the unlock script is supported")
+        key, token = args[2], args[3]
+        if self._live(key) != token:
+            return 0
+        del self.data[key]
+        return 1
+
+    def _set(self, args):
+        key, value = args[0], args[1]
+        options = [arg.decode().upper() for arg in args[2:]]
+        expires_at = None
+        if "EX" in options:
+            expires_at = time.monotonic() + int(options[options.index("EX") + 1])
+        if "PX" in options:
+            expires_at = time.monotonic() + int(options[options.index("PX") + 1]) / 1000
+        exists = self._live(key) is not None
+        if ("NX" in options and exists) or ("XX" in options and not exists):
+            return None
+        self.data[key] = (value, expires_at)
+        return "OK"
+
+    def _handler_class(self):
+        redis = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        args = self._read_command()
+                    except (ConnectionError, ValueError):
+                        return
+                    if args is None:
+                        return
+                    self.wfile.write(self._encode(redis.execute(args)))
+
+            def _read_command(self):
+                line = self.rfile.readline()
+                if not line:
+                    return None
+                if not line.startswith(b"*"):
+                    # Inline command, e.g. from telnet
+                    return line.split()
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int(self.rfile.readline()[1:-2])
+                    args.append(self.rfile.read(length + 2)[:-2])
+                return args
+
+            def _encode(self, reply):
+                if reply is None:
+                    return b"$-1\r\n"
+                if isinstance(reply, Exception):
+                    return f"-{reply}\r\n".encode()
+                if isinstance(reply, str):
+                    return f"+{reply}\r\n".encode()
+                if isinstance(reply, int):
+                    return f":{reply}\r\n".encode()
+                if isinstance(reply, bytes):
+                    return f"${len(reply)}\r\n".encode() + reply + b"\r\n"
+                return f"*{len(reply)}\r\n".encode() + b"".join(
+                    self._encode(item) for item in reply
+                )
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args(argv)
+
+    redis = FakeRedis(args.host, args.port)
+    print(f"🧰 Fake Redis listening on {redis.url}")
+    try:
+        redis.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        redis.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
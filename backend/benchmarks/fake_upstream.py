@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for ostrbovlje.si
+
+Replays the recorded /prehrana/ listing and Jedilnik pages from the corpus
+with configurable latency, jitter, 5xx failures, slow (dribbled) bodies and
+ETag revalidation, so caching, timeouts and request coalescing can be
+exercised without touching the school's site.
+
+Usage (from backend/):
+    python -m benchmarks.fake_upstream --port 8001 --latency 0.3 --jitter 0.1 \
+        --error-rate 0.05
+    LUNCH_BASE_URL=http://127.0.0.1:8001 python app.py
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Allow running as a script from backend/benchmarks as well
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import load_pages  # noqa: E402
+
+
+class FakeUpstream:
+    """Threaded HTTP server replaying recorded pages
+
+    ``latency`` and ``jitter`` (seconds) delay every response, ``error_rate``
+    is the share of requests answered with ``error_status``, and
+    ``slow_body`` spreads the body over that many seconds. Every request is
+    counted per path and per status in ``hits`` and ``statuses``.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        pages=None,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=503,
+        slow_body=0.0,
+        etags=True,
+        seed=None,
+    ):
+        self.pages = dict(pages if pages is not None else load_pages())
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_body = slow_body
+        self.etags = etags
+        self.hits = Counter()
+        self.statuses = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        """Total number of requests received"""
+        return sum(self.hits.values())
+
+    def set_page(self, path, content):
+        """Replace (or add) a page, e.g. to simulate a menu being edited"""
+        with self._lock:
+            self.pages[path] = content
+
+    def reset_counts(self):
+        with self._lock:
+            self.hits.clear()
+            self.statuses.clear()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.server.serve_forever,
+            args=(0.05,),
+            name="fake-upstream",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _plan(self, path):
+        """Decide (delay, status, body) for one request under the lock"""
+        with self._lock:
+            self.hits[path] += 1
+            delay = self.latency
+            if self.jitter:
+                delay += self._random.uniform(0, self.jitter)
+            failed = self.error_rate and self._random.random() < self.error_rate
+            content = self.pages.get(path)
+        if failed:
+            return delay, self.error_status, b"Service Unavailable"
+        if content is None:
+            return delay, 404, b"Not Found"
+        return delay, 200, content
+
+    def _count_status(self, status):
+        with self._lock:
+            self.statuses[status] += 1
+
+    def _handler_class(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                delay, status, body = upstream._plan(path)
+                if delay > 0:
+                    time.sleep(delay)
+
+                etag = None
+                if status == 200 and upstream.etags:
+                    etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                    if self.headers.get("If-None-Match") == etag:
+                        status, body = 304, b""
+
+                upstream._count_status(status)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=UTF-8")
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self._write_body(body)
+
+            def _write_body(self, body):
+                if not upstream.slow_body or not body:
+                    self.wfile.write(body)
+                    return
+                # Dribble the body out in ten chunks over slow_body seconds
+                chunk = max(1, len(body) // 10)
+                pause = upstream.slow_body / 10
+                for offset in range(0, len(body), chunk):
+                    self.wfile.write(body[offset : offset + chunk])
+                    self.wfile.flush()
+                    time.sleep(pause)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every response"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.0,
+        help="extra random delay, up to this many seconds",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="share of requests answered with a 5xx",
+    )
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument(
+        "--slow-body", type=float, default=0.0, help="seconds to stream each body over"
+    )
+    parser.add_argument(
+        "--no-etags", action="store_true", help="never send ETags or 304s"
+    )
+    args = parser.parse_args(argv)
+
+    upstream = FakeUpstream(
+        args.host,
+        args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        slow_body=args.slow_body,
+        etags=not args.no_etags,
+    )
+    print(
+        f"🏫 Fake ostrbovlje.si serving {len(upstream.pages)} pages on {upstream.url}"
+    )
+    print(f"   export LUNCH_BASE_URL={upstream.url}")
+    try:
+        upstream.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        upstream.server.server_close()
+        print(f"📈 {upstream.requests} requests, statuses: {dict(upstream.statuses)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Load test for the Flask /api/menu endpoint
+
+Serves backend/app.py on a local port, points it at the fake upstream
+(benchmarks/fake_upstream.py) and drives it with concurrent clients, once per
+serving mode:
+
+    nocache  page caches disabled (TTL 0), every request goes upstream
+    cache    page caches with their configured TTLs
+    swr      stale-while-revalidate on top of the page caches
+
+For each mode it reports throughput, p50/p95/p99 latency, failed responses
+and how many requests reached the upstream.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest
+    python -m benchmarks.loadtest --clients 32 --duration 20 \
+        --latency 0.3 --error-rate 0.05
+    python -m benchmarks.loadtest --mode cache --mode swr --json results.json
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+
+# Allow running as a script from backend/benchmarks as well
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The Flask app must not write the on-disk archive while load testing
+os.environ.setdefault("LUNCH_MENU_ARCHIVE", "")
+
+import requests  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+import school_lunch_checker  # noqa: E402
+from benchmarks.fake_upstream import FakeUpstream  # noqa: E402
+
+MODES = ("nocache", "cache", "swr")
+# A Wednesday inside the recorded corpus
+DEFAULT_DATE = "2026-01-14"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@contextmanager
+def serving(mode, upstream, swr_soft_ttl=None):
+    """Serve app.py in a background thread configured for one mode
+
+    Yields the server's base URL. Caches are emptied before and after, and
+    every setting touched here is restored afterwards.
+    """
+    import app
+
+    listing_ttl = school_lunch_checker.listing_cache.ttl
+    week_ttl = school_lunch_checker.week_cache.ttl
+    saved = (
+        school_lunch_checker.BASE_URL,
+        school_lunch_checker.MENU_URL,
+        app.SERVE_MODE,
+        app.menu_responses.soft_ttl,
+        school_lunch_checker.upstream.rate,
+    )
+
+    school_lunch_checker.BASE_URL = upstream.url
+    school_lunch_checker.MENU_URL = upstream.url + "/prehrana/"
+    if mode == "nocache":
+        school_lunch_checker.listing_cache.ttl = 0
+        school_lunch_checker.week_cache.ttl = 0
+    # The stand-in is the only upstream: measure it, not the per-host limiter
+    school_lunch_checker.upstream.rate = 0
+    app.SERVE_MODE = "swr" if mode == "swr" else "direct"
+    if swr_soft_ttl is not None:
+        app.menu_responses.soft_ttl = swr_soft_ttl
+    school_lunch_checker.clear_caches()
+    school_lunch_checker.upstream.reset()
+    app.menu_responses.clear()
+
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    thread = threading.Thread(
+        target=server.serve_forever, name="loadtest-server", daemon=True
+    )
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+        school_lunch_checker.listing_cache.ttl = listing_ttl
+        school_lunch_checker.week_cache.ttl = week_ttl
+        (
+            school_lunch_checker.BASE_URL,
+            school_lunch_checker.MENU_URL,
+            app.SERVE_MODE,
+            app.menu_responses.soft_ttl,
+            school_lunch_checker.upstream.rate,
+        ) = saved
+        school_lunch_checker.clear_caches()
+        school_lunch_checker.upstream.reset()
+        app.menu_responses.clear()
+
+
+def drive(url, clients, duration=None, requests_per_client=None):
+    """Hit url from concurrent clients; returns (latencies, failures, elapsed)
+
+    Each client stops after ``requests_per_client`` requests or once
+    ``duration`` seconds have passed. A response counts as failed when it is
+    not a 200 or carries ``Cache-Control: no-store`` (the upstream failed).
+    """
+    latencies = []
+    failures = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def client():
+        session = requests.Session()
+        sent = 0
+        while True:
+            if requests_per_client is not None and sent >= requests_per_client:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            start = time.perf_counter()
+            try:
+                response = session.get(url, timeout=30)
+                failed = (
+                    response.status_code != 200
+                    or response.headers.get("Cache-Control") == "no-store"
+                )
+            except requests.RequestException:
+                failed = True
+            elapsed = time.perf_counter() - start
+            sent += 1
+            with lock:
+                latencies.append(elapsed)
+                failures[0] += failed
+        session.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for future in [pool.submit(client) for _ in range(clients)]:
+            future.result()
+    return latencies, failures[0], time.perf_counter() - start
+
+
+def run_mode(
+    mode,
+    upstream,
+    clients=16,
+    duration=10.0,
+    requests_per_client=None,
+    test_date=DEFAULT_DATE,
+    swr_soft_ttl=None,
+):
+    """Load-test one serving mode; returns a result dict"""
+    upstream.reset_counts()
+    with serving(mode, upstream, swr_soft_ttl) as base_url:
+        url = f"{base_url}/api/menu?test_date={test_date}"
+        latencies, failures, elapsed = drive(
+            url, clients, duration, requests_per_client
+        )
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "failures": failures,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "upstream_requests": upstream.requests,
+        "upstream_statuses": dict(upstream.statuses),
+    }
+
+
+def run_loadtest(modes=MODES, quiet=True, upstream_options=None, **kwargs):
+    """Run every mode against one fake upstream; returns {mode: result}"""
+    # Request logging and the checker's progress messages would drown the report
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    results = {}
+    with FakeUpstream(**(upstream_options or {})) as upstream:
+        for mode in modes:
+            if quiet:
+                with redirect_stdout(io.StringIO()):
+                    results[mode] = run_mode(mode, upstream, **kwargs)
+            else:
+                results[mode] = run_mode(mode, upstream, **kwargs)
+    return results
+
+
+def print_results(results):
+    print(
+        f"{'mode':<9}{'requests':>10}{'failed':>8}{'req/s':>10}{'p50 ms':>9}"
+        f"{'p95 ms':>9}{'p99 ms':>9}{'upstream':>10}"
+    )
+    for mode, result in results.items():
+        print(
+            f"{mode:<9}{result['requests']:>10}{result['failures']:>8}"
+            f"{result['throughput']:>10.1f}"
+            f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+            f"{result['upstream_requests']:>10}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--mode", action="append", choices=MODES, help="run only this mode (repeatable)"
+    )
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument(
+        "--date",
+        default=DEFAULT_DATE,
+        help="test_date to request (must be in the corpus)",
+    )
+    parser.add_argument(
+        "--swr-soft-ttl",
+        type=float,
+        help="override LUNCH_SWR_SOFT_TTL for the swr mode",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="fake upstream latency (seconds)"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.1, help="fake upstream jitter (seconds)"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fake upstream 5xx rate"
+    )
+    parser.add_argument(
+        "--slow-body", type=float, default=0.0, help="fake upstream body streaming time"
+    )
+    parser.add_argument("--json", metavar="FILE", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    modes = args.mode or MODES
+    print(
+        f"🔥 {args.clients} clients x {args.duration:g}s per mode "
+        f"against a fake upstream "
+        f"({args.latency:g}s ± {args.jitter:g}s, {args.error_rate:.0%} errors)"
+    )
+    results = run_loadtest(
+        modes,
+        upstream_options={
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "slow_body": args.slow_body,
+        },
+        clients=args.clients,
+        duration=args.duration,
+        test_date=args.date,
+        swr_soft_ttl=args.swr_soft_ttl,
+    )
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+"""
+Cache stores for parsed pages and rendered responses
+
+Each worker keeps its own in-memory page caches (see school_lunch_checker)
+and response cache (see app.py). A backend from this module sits behind them
+as a second tier, so the first worker - or node - that fetches and parses a
+page hands the result to the others: N workers cost one upstream fetch per
+refresh window instead of N.
+
+Every backend implements the CacheBackend interface and stores JSON
+documents; ``cache_backend_from_url`` builds one from a URL:
+
+    memory://?max_entries=256     bounded in-process LRU
+    file:///var/cache/lunch       one JSON file per key (all workers on a host)
+    redis://localhost:6379/0      any Redis-protocol server (all nodes)
+"""
+
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import parse_qs, unquote, urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class CacheBackend(ABC):
+    """Interface of the cache stores
+
+    Values are JSON-serialisable documents. ``ttl`` is in seconds; None keeps
+    the document until it is evicted or deleted. ``lock(key)`` is held by the
+    one process refreshing key, so the others wait for its result instead of
+    going upstream themselves.
+    """
+
+    @abstractmethod
+    def get(self, key):
+        """Return the document stored under key, or None"""
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        """Store a document under key"""
+
+    @abstractmethod
+    def delete(self, key):
+        """Drop the document stored under key"""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every stored document"""
+
+    @abstractmethod
+    def lock(self, key):
+        """Context manager excluding other holders of the same key"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Bounded in-process LRU; shares documents between threads only"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> [lock, holders and waiters]; dropped when nobody needs it
+        self._key_locks = {}
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            # Callers get their own copy, as they would from the other stores
+            return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._entries[key] = (encoded, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @contextmanager
+    def lock(self, key):
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+        try:
+            with key_lock[0]:
+                yield
+        finally:
+            with self._lock:
+                key_lock[1] -= 1
+                if not key_lock[1]:
+                    del self._key_locks[key]
+
+
+class FileCacheBackend(CacheBackend):
+    """JSON documents in a directory, one file per key
+
+    Writes go through a temporary file and an atomic rename, so readers in
+    other processes never see a half-written document. ``lock(key)`` is an
+    advisory cross-process lock (flock); on platforms without fcntl it only
+    excludes threads of the same process. Expired files are ignored by
+    ``get`` and replaced by the next ``set``.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._thread_locks = MemoryCacheBackend()
+
+    def _path(self, key, suffix=".json"):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, digest + suffix)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return None
+        expires_at = document.get("expires_at")
+        if expires_at is not None and time.time() >= expires_at:
+            return None
+        return document.get("value")
+
+    def set(self, key, value, ttl=None):
+        document = {
+            "key": key,
+            "expires_at": time.time() + ttl if ttl is not None else None,
+            "value": value,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(document, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    @contextmanager
+    def lock(self, key):
+        # The thread lock keeps this process's threads apart even where
+        # flock is unavailable; flock then excludes the other processes
+        with self._thread_locks.lock(key):
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(key, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class RedisCacheBackend(CacheBackend):
+    """Documents in a Redis-protocol server, shared by every node
+
+    Speaks RESP over one socket (serialised by a lock) with only the commands
+    it needs: GET, SET (PX, NX), DEL, SCAN, EVAL and SELECT, so it works
+    against Redis, Valkey, KeyDB or a local fake. Keys are namespaced by
+    ``prefix``. ``lock(key)`` is a ``SET NX PX`` lease that expires after
+    ``lock_timeout`` seconds, so a crashed holder cannot block the others.
+    """
+
+    # Deletes the lock only if it still holds our token: once our lease has
+    # expired another worker may hold it
+    UNLOCK_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(
+        self,
+        host="localhost",
+        port=6379,
+        db=0,
+        password=None,
+        prefix="school-lunch:",
+        timeout=2.0,
+        lock_timeout=30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.execute("GET", self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        args = ["SET", self.prefix + key, json.dumps(value, ensure_ascii=False)]
+        if ttl is not None:
+            args += ["PX", max(1, int(ttl * 1000))]
+        self.execute(*args)
+
+    def delete(self, key):
+        self.execute("DEL", self.prefix + key)
+
+    def clear(self):
+        cursor = "0"
+        while True:
+            cursor, keys = self.execute(
+                "SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 100
+            )
+            if keys:
+                self.execute("DEL", *keys)
+            if cursor in ("0", b"0"):
+                break
+
+    @contextmanager
+    def lock(self, key):
+        lock_key = f"{self.prefix}lock:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        acquired = False
+        while time.monotonic() < deadline:
+            if self.execute(
+                "SET", lock_key, token, "NX", "PX", int(self.lock_timeout * 1000)
+            ):
+                acquired = True
+                break
+            time.sleep(0.05)
+        # After lock_timeout the holder's lease has expired anyway; go ahead
+        try:
+            yield
+        finally:
+            if acquired:
+                try:
+                    self.execute("EVAL", self.UNLOCK_SCRIPT, 1, lock_key, token)
+                except (OSError, RedisError) as e:
+                    # The lease expires on its own
+                    print(f"Error releasing Redis lock {lock_key}: {e}")
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+    def execute(self, *args):
+        """Send one command and return its decoded reply"""
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(self._encode(args))
+                    return self._read_reply()
+                except (OSError, ConnectionError):
+                    # Stale pooled connection: reconnect once
+                    self._disconnect()
+                    if attempt == 2:
+                        raise
+
+    def _connect(self):
+        self._sock = socket.create_connection(
+            (self.host, self.port), timeout=self.timeout
+        )
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._sock.sendall(self._encode(("AUTH", self.password)))
+            self._read_reply()
+        if self.db:
+            self._sock.sendall(self._encode(("SELECT", self.db)))
+            self._read_reply()
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    @staticmethod
+    def _encode(args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis server closed the connection")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise RedisError(payload.decode("utf-8"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)[:-2]
+            return data.decode("utf-8")
+        if kind == b"*":
+            count = int(payload)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+
+def private_temp_dir(name):
+    """A directory under the system temp dir that only this user can use
+
+    The directory is named after the user (``name-<uid>``) and created with
+    mode 0700. Cached documents are trusted, so one that another user owns
+    or may write to (planted there first) is refused with PermissionError.
+    """
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    path = os.path.join(tempfile.gettempdir(), f"{name}-{user}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    if hasattr(os, "getuid"):
+        info = os.lstat(path)
+        if (
+            not os.path.isdir(path)
+            or os.path.islink(path)
+            or info.st_uid != os.getuid()
+            or info.st_mode & 0o077
+        ):
+            raise PermissionError(f"{path} is not a private directory of this user")
+    return path
+
+
+def cache_backend_from_url(url):
+    """Build a backend from a memory://, file:// or redis:// URL
+
+    A bare path is treated as a file:// directory.
+    """
+    parsed = urlparse(url)
+    query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+    if parsed.scheme == "memory":
+        return MemoryCacheBackend(int(query.get("max_entries", 256)))
+    if parsed.scheme in ("", "file"):
+        return FileCacheBackend(unquote(parsed.path) if parsed.scheme else url)
+    if parsed.scheme == "redis":
+        db = parsed.path.lstrip("/")
+        return RedisCacheBackend(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parsed.password) if parsed.password else None,
+            prefix=query.get("prefix", "school-lunch:"),
+        )
+    raise ValueError(f"Unsupported cache backend URL: {url}")
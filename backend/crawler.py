@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Incremental crawler keeping the menu archive in sync with the school site
+
+Each run parses the prehrana listing, diffs its Jedilnik links against the
+ones seen last time and fetches only what changed: new week pages are
+fetched and parsed, known ones are revalidated with a conditional GET
+(ETag / If-Modified-Since) and only re-parsed when their content hash
+differs. An unchanged site costs one conditional GET per page and no parsing.
+
+Usage:
+    python backend/crawler.py                    # one pass
+    python backend/crawler.py --loop 900         # keep the mirror fresh
+"""
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from menu_archive import MenuArchive  # noqa: E402
+from school_lunch_checker import LunchMenuChecker, content_hash  # noqa: E402
+
+DEFAULT_ARCHIVE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "menu_archive.sqlite3"
+)
+
+
+@dataclass
+class CrawlReport:
+    """What one crawl pass found and how much it cost"""
+
+    listing_changed: bool = False
+    new: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    requests: int = 0
+    not_modified: int = 0
+    parsed: int = 0
+    bytes_downloaded: int = 0
+
+    def summary(self):
+        return (
+            f"{len(self.new)} new, {len(self.changed)} changed, "
+            f"{len(self.unchanged)} unchanged, "
+            f"{len(self.removed)} removed, {len(self.failed)} failed weeks; "
+            f"{self.requests} requests ({self.not_modified} not modified), "
+            f"{self.parsed} parsed, {self.bytes_downloaded / 1024:.1f} KiB"
+        )
+
+
+class MenuCrawler:
+    """Mirror the listing and every linked week page into a MenuArchive"""
+
+    def __init__(self, archive, checker=None):
+        self.archive = archive
+        self.checker = checker or LunchMenuChecker()
+
+    def crawl(self):
+        """Run one incremental pass; returns a CrawlReport"""
+        report = CrawlReport()
+        known = self.archive.known_links()
+        links = self._crawl_listing(report, known)
+
+        current_urls = {link["url"] for link in links}
+        report.removed = [
+            link["url"] for link in known if link["url"] not in current_urls
+        ]
+
+        for link in links:
+            try:
+                status = self._crawl_week(report, link)
+            except Exception as e:
+                report.failed[link["url"]] = str(e)
+                continue
+            getattr(report, status).append(link["url"])
+        return report
+
+    def _conditional_get(self, report, url, state):
+        """GET url, revalidating against a stored page state if given"""
+        state = state or {}
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        report.requests += 1
+        response = self.checker.fetch(url, headers)
+        if response.status_code == 304:
+            report.not_modified += 1
+            return response
+        response.raise_for_status()
+        report.bytes_downloaded += len(response.content)
+        return response
+
+    @staticmethod
+    def _page(response, digest):
+        """The page state to store once the response has been archived"""
+        return {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": digest,
+        }
+
+    def _remember(self, url, page):
+        self.archive.record_page(
+            url, page["etag"], page["last_modified"], page["content_hash"]
+        )
+
+    def _crawl_listing(self, report, known):
+        """Return the listing's Jedilnik links, re-parsing only when it changed"""
+        url = self.checker.menu_url
+        # Without known links a 304 would leave nothing to crawl
+        state = self.archive.page_state(url) if known else None
+        response = self._conditional_get(report, url, state)
+        if response.status_code == 304:
+            return known
+
+        # The validators are only stored together with what they describe:
+        # after a failed write the next crawl must not get a 304
+        digest = content_hash(response.content)
+        page = self._page(response, digest)
+        if state and state["content_hash"] == digest:
+            self._remember(url, page)
+            return known
+
+        links = self.checker.week_links(*self.checker.parse_listing(response.content))
+        report.parsed += 1
+        report.listing_changed = True
+        self.archive.replace_links(links, url, page)
+        return links
+
+    def _crawl_week(self, report, link):
+        """Bring one week page up to date; returns 'new', 'changed' or 'unchanged'"""
+        url = link["url"]
+        archived_hash = self.archive.week_hash(url)
+        # Only revalidate weeks that are archived, otherwise a 304 leaves
+        # nothing to serve
+        state = self.archive.page_state(url) if archived_hash else None
+        response = self._conditional_get(report, url, state)
+        if response.status_code == 304:
+            return "unchanged"
+
+        digest = content_hash(response.content)
+        page = self._page(response, digest)
+        if digest == archived_hash:
+            self._remember(url, page)
+            return "unchanged"
+
+        week = self.checker.parse_week(url, response.content)
+        report.parsed += 1
+        self.archive.record_week(week, link, page)
+        return "new" if archived_hash is None else "changed"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--archive",
+        default=os.environ.get("LUNCH_MENU_ARCHIVE") or DEFAULT_ARCHIVE,
+        help="SQLite archive to keep in sync",
+    )
+    parser.add_argument(
+        "--loop",
+        type=float,
+        metavar="SECONDS",
+        help="crawl again every SECONDS until interrupted",
+    )
+    args = parser.parse_args(argv)
+
+    archive = MenuArchive(args.archive)
+    crawler = MenuCrawler(archive)
+    report = None
+    try:
+        while True:
+            report = crawler.crawl()
+            print(f"🕷️ {report.summary()}")
+            for url, error in report.failed.items():
+                print(f"   ❌ {url}: {error}")
+            if not args.loop:
+                break
+            time.sleep(args.loop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        archive.close()
+    return 1 if report is None or report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+gunicorn settings for the School Lunch Menu Web App
+
+    cd backend && gunicorn -c gunicorn.conf.py wsgi:application
+
+Every setting can be overridden with the usual gunicorn environment variables
+or command line flags.
+"""
+
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '8080')}"
+
+# Requests mostly wait on the school site, so a few threads per worker go a
+# long way; the parsed pages are shared between workers (wsgi.py)
+workers = int(
+    os.environ.get("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count() * 2))
+)
+worker_class = "gthread"
+threads = int(os.environ.get("LUNCH_WORKER_THREADS", "4"))
+
+# Leave room for a slow school site (LUNCH_UPSTREAM_DEADLINE) on both pages
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Each worker opens its own menu archive connection and HTTP session after
+# forking, so the app is not preloaded in the master
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
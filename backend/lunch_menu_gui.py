@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tkinter desktop GUI for the School Lunch Menu Checker
+"""
+
+import threading
+
+from school_lunch_checker import LunchMenuChecker
+
+# Import tkinter only when needed (for GUI mode)
+try:
+    import tkinter as tk
+    from tkinter import scrolledtext
+
+    TKINTER_AVAILABLE = True
+except ImportError:
+    TKINTER_AVAILABLE = False
+
+
+class LunchMenuGUI:
+    def __init__(self):
+        if not TKINTER_AVAILABLE:
+            raise ImportError("Tkinter is not available. Cannot create GUI.")
+        self.checker = LunchMenuChecker()
+        self.setup_gui()
+
+    def setup_gui(self):
+        """Setup the GUI interface"""
+        self.root = tk.Tk()
+        self.root.title("🍽️ Šolski Jedilnik - Osnovna šola Trbovlje")
+        self.root.geometry("600x500")
+        self.root.configure(bg="#f0f0f0")
+
+        # Title
+        title_label = tk.Label(
+            self.root,
+            text="🍽️ Šolski Jedilnik",
+            font=("Arial", 16, "bold"),
+            bg="#f0f0f0",
+            fg="#2c3e50",
+        )
+        title_label.pack(pady=10)
+
+        # Subtitle
+        subtitle_label = tk.Label(
+            self.root,
+            text="Osnovna šola Trbovlje",
+            font=("Arial", 12),
+            bg="#f0f0f0",
+            fg="#7f8c8d",
+        )
+        subtitle_label.pack(pady=(0, 20))
+
+        # Check button
+        self.check_button = tk.Button(
+            self.root,
+            text="🔍 Preveri današnji jedilnik",
+            font=("Arial", 14, "bold"),
+            bg="#3498db",
+            fg="white",
+            relief="raised",
+            borderwidth=2,
+            padx=20,
+            pady=10,
+            command=self.check_menu_threaded,
+        )
+        self.check_button.pack(pady=10)
+
+        # Result text area
+        self.result_text = scrolledtext.ScrolledText(
+            self.root,
+            wrap=tk.WORD,
+            width=70,
+            height=20,
+            font=("Arial", 10),
+            bg="white",
+            fg="#2c3e50",
+            relief="sunken",
+            borderwidth=2,
+        )
+        self.result_text.pack(pady=20, padx=20, fill="both", expand=True)
+
+        # Initial message
+        initial_message = (
+            "👋 Dobrodošli v aplikaciji za preverjanje šolskega jedilnika!\n"
+            "\n"
+            '🔹 Kliknite na gumb "Preveri današnji jedilnik" '
+            "za prikaz današnjega kosila\n"
+            "🔹 Aplikacija avtomatsko poišče najnovejši jedilnik "
+            "na spletni strani šole\n"
+            "🔹 Prikazan bo jedilnik za današnji dan\n"
+            "\n"
+            "📍 Osnovna šola Trbovlje\n"
+            "🌐 https://ostrbovlje.si/prehrana/"
+        )
+
+        self.result_text.insert("1.0", initial_message)
+        self.result_text.config(state="disabled")
+
+    def check_menu_threaded(self):
+        """Check menu in a separate thread to avoid GUI freezing"""
+        self.check_button.config(state="disabled", text="⏳ Preverjam...")
+        self.result_text.config(state="normal")
+        self.result_text.delete("1.0", tk.END)
+        self.result_text.insert(
+            "1.0", "🔍 Pridobivam podatke o jedilniku...\nProsimo počakajte..."
+        )
+        self.result_text.config(state="disabled")
+
+        def check_menu():
+            try:
+                result = self.checker.check_lunch_menu()
+
+                # Update GUI in main thread
+                self.root.after(0, lambda: self.update_result(result))
+            except Exception as e:
+                error_msg = f"❌ Napaka: {str(e)}"
+                self.root.after(0, lambda: self.update_result(error_msg))
+
+        thread = threading.Thread(target=check_menu)
+        thread.daemon = True
+        thread.start()
+
+    def update_result(self, result):
+        """Update the result text area"""
+        self.result_text.config(state="normal")
+        self.result_text.delete("1.0", tk.END)
+        self.result_text.insert("1.0", result)
+        self.result_text.config(state="disabled")
+
+        self.check_button.config(state="normal", text="🔍 Preveri današnji jedilnik")
+
+    def run(self):
+        """Run the GUI application"""
+        self.root.mainloop()
@@ -6,19 +6,23 @@ Netlify serverless function for School Lunch Menu API
 import json
 import sys
 import os
+import threading
+import time
 from datetime import datetime
-import re
 
 # Add the current directory to Python path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
 # Import from same directory
 try:
-    from school_lunch_checker import LunchMenuChecker
+    from school_lunch_checker import (
+        LunchMenuChecker, cache_headers, etag_matches, menu_etag, menu_payload, metrics
+    )
     IMPORT_SUCCESS = True
 except ImportError as e:
     IMPORT_SUCCESS = False
     IMPORT_ERROR = str(e)
+    metrics = None
     # Fallback error handling
     class LunchMenuChecker:
         def check_lunch_menu(self):
@@ -26,6 +30,72 @@ except ImportError as e:
         def get_current_week_menu_url(self):
             return None
 
+        def resolve_menu(self, target_date=None):
+            menu = self.check_lunch_menu()
+            return {'menu_info': None, 'menu': menu, 'error': IMPORT_ERROR}
+
+# Everything below module level survives between warm invocations of the
+# function: the checker (with the shared HTTP session and page caches in
+# school_lunch_checker) and the last good response, reused for RESPONSE_TTL
+# seconds on the same day without resolving or parsing anything.
+RESPONSE_TTL = int(os.environ.get('LUNCH_RESPONSE_TTL', '300'))
+
+_checker = None
+_warm_lock = threading.Lock()
+_warm_response = {'day': None, 'stored_at': 0.0, 'data': None}
+
+
+def get_checker():
+    """The LunchMenuChecker reused across warm invocations"""
+    global _checker
+    if _checker is None:
+        _checker = LunchMenuChecker()
+    return _checker
+
+
+def build_response_data():
+    """Resolve today's menu into the API payload
+
+    Returns ``(response_data, error)``; a warm, fresh payload for today is
+    reused without touching the checker.
+    """
+    today = datetime.now().date()
+    with _warm_lock:
+        if (_warm_response['day'] == today
+                and time.monotonic() - _warm_response['stored_at'] < RESPONSE_TTL):
+            return dict(_warm_response['data']), None
+
+    # Resolve today's menu link and content in one pass
+    resolution = get_checker().resolve_menu()
+
+    response_data = menu_payload(resolution['menu_info'], resolution['menu'])
+    response_data['fetched_at'] = datetime.now().isoformat()
+
+    if not resolution['error']:
+        with _warm_lock:
+            _warm_response.update(
+                day=today, stored_at=time.monotonic(), data=dict(response_data)
+            )
+    return response_data, resolution['error']
+
+
+def log_metrics(status_code, started):
+    """Log this invocation's stage timings and counters as one JSON line
+
+    Netlify keeps function stdout, so the line can be searched and charted
+    from the function log. The totals are reset after every invocation.
+    """
+    if metrics is None:
+        return
+    record = {
+        'event': 'menu_metrics',
+        'status': status_code,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+    record.update(metrics.snapshot(reset=True))
+    print(json.dumps(record, ensure_ascii=False))
+
+
 def handler(event, context):
     """
     Netlify function handler for menu API
@@ -47,6 +117,7 @@ def handler(event, context):
             'body': ''
         }
     
+    started = time.perf_counter()
     try:
         # Check if import was successful
         if not IMPORT_SUCCESS:
@@ -64,31 +135,29 @@ def handler(event, context):
                 }, ensure_ascii=False)
             }
         
-        # Get today's menu
-        checker = LunchMenuChecker()
-        
-        # Get menu info (includes URL and date range)
-        menu_info = checker.get_current_week_menu_url()
-        
-        # Get today's menu content
-        menu_result = checker.check_lunch_menu()
-        
-        response_data = {
-            'success': True,
-            'menu': menu_result,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Add menu URL and date range if available
-        if menu_info:
-            response_data['source_url'] = menu_info['url']
-            response_data['menu_title'] = menu_info['text']
-            
-            # Extract date range from menu title
-            date_match = re.search(r'(\d{1,2}\.\s*\d{1,2}\.\s*–\s*\d{1,2}\.\s*\d{1,2}\.\s*\d{4})', menu_info['text'])
-            if date_match:
-                response_data['date_range'] = date_match.group(1)
-        
+        response_data, error = build_response_data()
+        response_data['timestamp'] = datetime.now().isoformat()
+
+        # Strong ETag over the menu content; good menus stay valid until the
+        # next Ljubljana midnight, failed lookups must not be cached
+        etag = menu_etag(response_data)
+        headers['ETag'] = etag
+        if error:
+            headers['Cache-Control'] = 'no-store'
+        else:
+            headers.update(cache_headers())
+
+        headers_in = event.get('headers') or {}
+        request_headers = {k.lower(): v for k, v in headers_in.items()}
+        if etag_matches(request_headers.get('if-none-match'), etag):
+            log_metrics(304, started)
+            return {
+                'statusCode': 304,
+                'headers': headers,
+                'body': ''
+            }
+
+        log_metrics(200, started)
         return {
             'statusCode': 200,
             'headers': headers,
@@ -102,6 +171,7 @@ def handler(event, context):
             'error': str(e),
             'traceback': traceback.format_exc()
         }
+        log_metrics(500, started)
         
         return {
             'statusCode': 500,
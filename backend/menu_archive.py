@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Persistent SQLite archive of parsed school lunch menus
+
+Every parsed week is recorded with its URL, title, date range and content
+hash, and every day row is indexed by its ISO date, so date lookups are
+answered locally and survive process restarts. Days and their dishes also
+carry allergen bitmasks (see school_lunch_checker.ALLERGENS), so "days
+without gluten" is a bitwise filter in SQL. The crawler (crawler.py) also
+keeps each page's HTTP validators and the last seen listing links here.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from school_lunch_checker import MENU_SECTIONS, DayMenu, WeekMenu, allergen_codes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS weeks (
+    url TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT,
+    content_hash TEXT NOT NULL,
+    allergen_info TEXT,
+    fetched_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS weeks_content_hash ON weeks (content_hash);
+
+CREATE TABLE IF NOT EXISTS days (
+    date TEXT PRIMARY KEY,
+    week_url TEXT NOT NULL REFERENCES weeks (url) ON DELETE CASCADE,
+    weekday INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    sections TEXT NOT NULL,
+    allergens INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS days_week_url ON days (week_url);
+
+CREATE TABLE IF NOT EXISTS dishes (
+    date TEXT NOT NULL,
+    section TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    dish TEXT NOT NULL,
+    allergens INTEGER NOT NULL,
+    PRIMARY KEY (date, section, position)
+);
+
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    checked_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS listing_links (
+    url TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT,
+    position INTEGER NOT NULL
+);
+"""
+
+
+class MenuArchive:
+    """SQLite store of parsed weeks and days, keyed by ISO date"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._migrate()
+        self._conn.executescript(SCHEMA)
+        # (url -> content_hash) of weeks already written, so unchanged weeks
+        # seen again on later requests cost no database write
+        self._recorded = dict(self._conn.execute("SELECT url, content_hash FROM weeks"))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _migrate(self):
+        """Add the allergen columns to archives written before they existed"""
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(days)")]
+        if not columns or "allergens" in columns:
+            return
+        with self._conn:
+            self._conn.execute(
+                "ALTER TABLE days ADD COLUMN allergens INTEGER NOT NULL DEFAULT 0"
+            )
+            self._conn.executescript(SCHEMA)
+            rows = self._conn.execute(
+                "SELECT date, weekday, label, sections FROM days"
+            ).fetchall()
+            for date, weekday, label, sections in rows:
+                day = DayMenu(
+                    weekday=weekday, label=label, sections=json.loads(sections)
+                )
+                self._conn.execute(
+                    "UPDATE days SET allergens = ? WHERE date = ?",
+                    (day.allergen_mask, date),
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO dishes VALUES (?, ?, ?, ?, ?)",
+                    self._dish_rows(date, day),
+                )
+
+    @staticmethod
+    def _dish_rows(date, day):
+        return [
+            (date, section, position, dish, day.allergens[section][position])
+            for section, items in day.sections.items()
+            for position, dish in enumerate(items)
+        ]
+
+    def has_week(self, url, digest):
+        """Whether this exact version of a week is already archived"""
+        return self._recorded.get(url) == digest
+
+    def week_hash(self, url):
+        """Content hash of the archived version of a week, or None"""
+        return self._recorded.get(url)
+
+    def record_week(self, week, menu_info, page=None):
+        """Store a parsed WeekMenu and index its day rows by date
+
+        Days can only be dated when the menu link carried a date range
+        (``menu_info['start_date']``); otherwise only the week is recorded.
+        ``page`` (``{etag, last_modified}`` of the fetched week page) is
+        stored in the same transaction, so a failed write never leaves
+        validators claiming a version the archive does not hold.
+        """
+        if self.has_week(week.url, week.content_hash):
+            if page:
+                self.record_page(
+                    week.url,
+                    page.get("etag"),
+                    page.get("last_modified"),
+                    week.content_hash,
+                )
+            return False
+
+        start_date = menu_info.get("start_date")
+        end_date = menu_info.get("end_date")
+        day_rows = []
+        dish_rows = []
+        if start_date and end_date:
+            for weekday, day in week.days.items():
+                if not day.has_items():
+                    continue
+                date = start_date.date() + timedelta(
+                    days=weekday - start_date.weekday()
+                )
+                if start_date.date() <= date <= end_date.date():
+                    day_rows.append(
+                        (
+                            date.isoformat(),
+                            week.url,
+                            weekday,
+                            day.label,
+                            json.dumps(day.sections, ensure_ascii=False),
+                            day.allergen_mask,
+                        )
+                    )
+                    dish_rows.extend(self._dish_rows(date.isoformat(), day))
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO weeks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    week.url,
+                    menu_info.get("text", ""),
+                    start_date.date().isoformat() if start_date else None,
+                    end_date.date().isoformat() if end_date else None,
+                    week.content_hash,
+                    week.allergen_info,
+                    datetime.now().isoformat(),
+                ),
+            )
+            self._conn.execute(
+                "DELETE FROM dishes"
+                " WHERE date IN (SELECT date FROM days WHERE week_url = ?)",
+                (week.url,),
+            )
+            self._conn.execute("DELETE FROM days WHERE week_url = ?", (week.url,))
+            self._conn.executemany(
+                "DELETE FROM dishes WHERE date = ?", [(row[0],) for row in day_rows]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO days VALUES (?, ?, ?, ?, ?, ?)", day_rows
+            )
+            self._conn.executemany(
+                "INSERT INTO dishes VALUES (?, ?, ?, ?, ?)", dish_rows
+            )
+            if page:
+                self._write_page(
+                    week.url,
+                    page.get("etag"),
+                    page.get("last_modified"),
+                    week.content_hash,
+                )
+            self._recorded[week.url] = week.content_hash
+        return True
+
+    def lookup(self, date):
+        """Return ``(menu_info, week)`` for the week holding date, or None
+
+        The returned WeekMenu only carries the requested day.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT d.weekday, d.label, d.sections,
+                       w.url, w.title, w.start_date, w.end_date,
+                       w.content_hash, w.allergen_info
+                FROM days d JOIN weeks w ON w.url = d.week_url
+                WHERE d.date = ?
+                """,
+                (date.isoformat(),),
+            ).fetchone()
+        if row is None:
+            return None
+
+        weekday, label, sections, url, title, start, end, digest, allergen_info = row
+        menu_info = {
+            "url": url,
+            "text": title,
+            "start_date": datetime.strptime(start, "%Y-%m-%d"),
+            "end_date": datetime.strptime(end, "%Y-%m-%d"),
+        }
+        day = DayMenu(weekday=weekday, label=label, sections=json.loads(sections))
+        week = WeekMenu(
+            url=url,
+            content_hash=digest,
+            days={weekday: day},
+            allergen_info=allergen_info,
+        )
+        return menu_info, week
+
+    def page_state(self, url):
+        """Return a page's stored ``{etag, last_modified, content_hash}``, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "content_hash": row[2]}
+
+    def record_page(self, url, etag, last_modified, content_hash):
+        """Remember a page's validators and content hash for the next crawl"""
+        with self._lock, self._conn:
+            self._write_page(url, etag, last_modified, content_hash)
+
+    def _write_page(self, url, etag, last_modified, content_hash):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+            (url, etag, last_modified, content_hash, datetime.now().isoformat()),
+        )
+
+    def known_links(self):
+        """The Jedilnik links of the last crawled listing, in page order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, text, start_date, end_date"
+                " FROM listing_links ORDER BY position"
+            ).fetchall()
+        links = []
+        for url, text, start, end in rows:
+            link = {"url": url, "text": text}
+            if start and end:
+                link["start_date"] = datetime.strptime(start, "%Y-%m-%d")
+                link["end_date"] = datetime.strptime(end, "%Y-%m-%d")
+            links.append(link)
+        return links
+
+    def replace_links(self, links, url=None, page=None):
+        """Store the Jedilnik links of a freshly parsed listing
+
+        ``page`` (``{etag, last_modified, content_hash}`` of the listing at
+        ``url``) is stored in the same transaction.
+        """
+        rows = [
+            (
+                link["url"],
+                link["text"],
+                (
+                    link["start_date"].date().isoformat()
+                    if link.get("start_date")
+                    else None
+                ),
+                link["end_date"].date().isoformat() if link.get("end_date") else None,
+                position,
+            )
+            for position, link in enumerate(links)
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM listing_links")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO listing_links VALUES (?, ?, ?, ?, ?)", rows
+            )
+            if page:
+                self._write_page(
+                    url,
+                    page.get("etag"),
+                    page.get("last_modified"),
+                    page.get("content_hash"),
+                )
+
+    def dates(self):
+        """All archived ISO dates, oldest first"""
+        with self._lock:
+            return [
+                row[0]
+                for row in self._conn.execute("SELECT date FROM days ORDER BY date")
+            ]
+
+    def days(self):
+        """Every archived day as ``(iso_date, label, sections)``, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, label, sections FROM days ORDER BY date"
+            ).fetchall()
+        return [(date, label, json.loads(sections)) for date, label, sections in rows]
+
+    def safe_days(self, exclude, start=None, end=None, section=None, unannotated=False):
+        """Days serving none of the allergens in the ``exclude`` bitmask
+
+        With ``section`` only that meal has to be free of them (and has to
+        be served). ``start`` and ``end`` are inclusive ISO dates. Days
+        without any allergen codes (a day mask of 0) were most likely printed
+        in a format the parser does not read, so they cannot be vouched for
+        and are left out, unless ``unannotated`` is set. Returns
+        ``{date, label, sections, allergens, annotated}`` dicts, oldest
+        first, with ``allergens`` the day's codes.
+        """
+        query = (
+            "SELECT d.date, d.label, d.sections, d.allergens FROM days d WHERE 1 = 1"
+        )
+        params = []
+        if not unannotated:
+            # A day's mask is 0 exactly when none of its dishes had codes
+            query += " AND d.allergens != 0"
+        if start:
+            query += " AND d.date >= ?"
+            params.append(start)
+        if end:
+            query += " AND d.date <= ?"
+            params.append(end)
+        if section is None:
+            query += " AND d.allergens & ? = 0"
+            params.append(exclude)
+        else:
+            if section not in MENU_SECTIONS:
+                raise ValueError(f"Unknown menu section: {section}")
+            query += """
+                AND EXISTS (SELECT 1 FROM dishes x
+                            WHERE x.date = d.date AND x.section = ?)
+                AND NOT EXISTS (SELECT 1 FROM dishes x
+                                WHERE x.date = d.date AND x.section = ?
+                                  AND x.allergens & ? != 0)
+            """
+            params += [section, section, exclude]
+        query += " ORDER BY d.date"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {
+                "date": date,
+                "label": label,
+                "sections": json.loads(sections),
+                "allergens": allergen_codes(mask),
+                "annotated": mask != 0,
+            }
+            for date, label, sections, mask in rows
+        ]
+
+    def signature(self):
+        """Cheap token that changes whenever a week is written, by any process"""
+        with self._lock:
+            return tuple(
+                self._conn.execute(
+                    "SELECT COUNT(*), MAX(fetched_at) FROM weeks"
+                ).fetchone()
+            )
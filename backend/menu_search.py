@@ -0,0 +1,111 @@
+"""
+Full-text search over the dishes in the menu archive
+
+An inverted index maps every normalised word of every MALICA, KOSILO and
+POP. MALICA item to the days serving it, so "when is pica next?" is answered
+from memory without reading week pages. Normalisation folds case, Slovene
+diacritics (č/š/ž, and ć/đ) and whitespace, so "CEVAPCICI" finds
+"čevapčiči". Query words match as prefixes and must all occur in the dish.
+"""
+
+import bisect
+import re
+import threading
+import unicodedata
+
+from school_lunch_checker import MENU_SECTIONS
+
+# đ has no Unicode decomposition; everything else folds through NFKD
+_EXTRA_FOLDS = str.maketrans({"đ": "d", "Đ": "d"})
+_WORD = re.compile(r"\w+")
+
+
+def fold(text):
+    """Lowercase text, strip diacritics (č -> c) and collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text.translate(_EXTRA_FOLDS))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.casefold().split())
+
+
+def tokenize(text):
+    """The folded words of text"""
+    return _WORD.findall(fold(text))
+
+
+class MenuSearchIndex:
+    """Inverted index of archived dishes, rebuilt when the archive changes
+
+    Each entry is one dish on one day: ``{date, label, section, dish}``.
+    ``search`` intersects the postings of every query word, so a lookup
+    costs a few set operations regardless of how many weeks are archived.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._postings = {}
+        self._vocabulary = []
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def build(self, days):
+        """Index ``(iso_date, label, sections)`` day rows, replacing the index"""
+        entries = []
+        postings = {}
+        for date, label, sections in days:
+            for section in MENU_SECTIONS:
+                for dish in sections.get(section) or ():
+                    entry_id = len(entries)
+                    entries.append(
+                        {"date": date, "label": label, "section": section, "dish": dish}
+                    )
+                    for word in set(tokenize(dish)):
+                        postings.setdefault(word, set()).add(entry_id)
+        with self._lock:
+            self.entries = entries
+            self._postings = postings
+            self._vocabulary = sorted(postings)
+
+    def refresh(self, archive):
+        """Rebuild from archive if any week was written since the last build"""
+        signature = archive.signature()
+        if signature == self._signature:
+            return False
+        self.build(archive.days())
+        self._signature = signature
+        return True
+
+    def _matching(self, word):
+        """Ids of the entries holding a word starting with word"""
+        matched = set()
+        start = bisect.bisect_left(self._vocabulary, word)
+        for candidate in self._vocabulary[start:]:
+            if not candidate.startswith(word):
+                break
+            matched |= self._postings[candidate]
+        return matched
+
+    def search(self, query, since=None, limit=50):
+        """Dishes matching every word of query, oldest first
+
+        ``since`` (an ISO date) drops earlier days; ``limit`` caps the results
+        (None: all of them) and must otherwise be a positive integer.
+        """
+        if limit is not None and limit < 1:
+            raise ValueError(f"limit must be a positive integer, not {limit}")
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            entries = self.entries
+            # Rarest word first keeps the intersection small
+            matches = sorted((self._matching(word) for word in words), key=len)
+            ids = set.intersection(*matches)
+        results = sorted(
+            (entries[i] for i in ids), key=lambda e: (e["date"], e["section"])
+        )
+        if since:
+            results = [entry for entry in results if entry["date"] >= since]
+        return results if limit is None else results[:limit]
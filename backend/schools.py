@@ -0,0 +1,177 @@
+"""
+Registry of the schools served by one deployment
+
+Schools whose sites use the same WordPress "Jedilnik" layout as Osnovna
+šola Trbovlje can be served side by side. Each entry names the school's
+URLs, the parser profile to read them with (see
+school_lunch_checker.PARSER_PROFILES) and the namespace its cached pages
+and archive are kept under. The registry is a JSON file named by
+LUNCH_SCHOOLS_FILE (see schools.example.json); without one, the deployment
+serves the single school configured by LUNCH_BASE_URL / LUNCH_MENU_URL.
+
+    {
+        "default": "os-trbovlje",
+        "schools": [
+            {"id": "os-trbovlje", "name": "OŠ Trbovlje",
+             "base_url": "https://ostrbovlje.si"},
+            {"id": "os-zagorje", "name": "OŠ Zagorje",
+             "base_url": "https://example.si",
+             "menu_url": "https://example.si/jedilnik/"}
+        ]
+    }
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import school_lunch_checker
+from school_lunch_checker import (
+    DEFAULT_PARSER_PROFILE,
+    PARSER_PROFILES,
+    LunchMenuChecker,
+)
+
+DEFAULT_SCHOOL_ID = "os-trbovlje"
+
+
+@dataclass
+class School:
+    """One school site: where its menus are and how to read them
+
+    ``menu_url`` defaults to the site's /prehrana/ listing and ``namespace``
+    to the school id.
+    """
+
+    id: str
+    name: str
+    base_url: str
+    menu_url: str = None
+    profile: str = DEFAULT_PARSER_PROFILE
+    namespace: str = None
+
+    def __post_init__(self):
+        self.base_url = self.base_url.rstrip("/")
+        if not self.menu_url:
+            self.menu_url = self.base_url + "/prehrana/"
+        if self.namespace is None:
+            self.namespace = self.id
+        if self.profile not in PARSER_PROFILES:
+            raise ValueError(
+                f"School {self.id}: unknown parser profile {self.profile!r}"
+            )
+
+    def checker(self, archive=None):
+        """A LunchMenuChecker reading this school's site"""
+        return LunchMenuChecker(archive=archive, school=self)
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "menu_url": self.menu_url}
+
+
+class SchoolRegistry:
+    """The configured schools by id, in file order"""
+
+    def __init__(self, schools, default=None):
+        if not schools:
+            raise ValueError("The school registry is empty")
+        self._schools = {}
+        for school in schools:
+            if school.id in self._schools:
+                raise ValueError(f"Duplicate school id {school.id!r}")
+            self._schools[school.id] = school
+        self.default = self._schools[default] if default else schools[0]
+
+    def __iter__(self):
+        return iter(self._schools.values())
+
+    def __len__(self):
+        return len(self._schools)
+
+    def get(self, school_id=None):
+        """The school with this id (the default one for None); KeyError if unknown"""
+        if school_id is None:
+            return self.default
+        return self._schools[school_id]
+
+
+def default_registry():
+    """The single school configured by LUNCH_BASE_URL / LUNCH_MENU_URL
+
+    Its empty namespace keeps the cache keys of a single-school deployment.
+    """
+    school = School(
+        id=DEFAULT_SCHOOL_ID,
+        name="Osnovna šola Trbovlje",
+        base_url=school_lunch_checker.BASE_URL,
+        menu_url=school_lunch_checker.MENU_URL,
+        namespace="",
+    )
+    return SchoolRegistry([school])
+
+
+def load_registry(path=None):
+    """Load the registry from path (default: LUNCH_SCHOOLS_FILE)"""
+    path = path or os.environ.get("LUNCH_SCHOOLS_FILE")
+    if not path:
+        return default_registry()
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    schools = [School(**entry) for entry in config["schools"]]
+    return SchoolRegistry(schools, config.get("default"))
+
+
+def _map_schools(registry, fn, max_workers=None):
+    """Run fn(school) for every school concurrently; returns {id: (result, error)}"""
+
+    def run(school):
+        try:
+            return fn(school), None
+        except Exception as e:
+            return None, str(e)
+
+    schools = list(registry)
+    with ThreadPoolExecutor(max_workers=max_workers or len(schools)) as pool:
+        return dict(zip((school.id for school in schools), pool.map(run, schools)))
+
+
+def resolve_all(registry, target_date=None, archive_for=None, max_workers=None):
+    """Resolve every school's menu concurrently
+
+    Returns ``{school_id: resolution}`` with LunchMenuChecker.resolve_menu
+    results; ``archive_for(school)`` picks each school's MenuArchive.
+    """
+
+    def resolve(school):
+        archive = archive_for(school) if archive_for else None
+        return school.checker(archive).resolve_menu(target_date)
+
+    resolutions = {}
+    for school_id, (resolution, error) in _map_schools(
+        registry, resolve, max_workers
+    ).items():
+        resolutions[school_id] = resolution or {
+            "menu_info": None,
+            "menu": None,
+            "error": error,
+        }
+    return resolutions
+
+
+def prefetch_all(registry, archive_for=None, max_workers=None):
+    """Warm every school's caches concurrently
+
+    Returns {school_id: warmed URLs or error}.
+    """
+
+    def prefetch(school):
+        archive = archive_for(school) if archive_for else None
+        return school.checker(archive).prefetch()
+
+    return {
+        school_id: warmed if error is None else error
+        for school_id, (warmed, error) in _map_schools(
+            registry, prefetch, max_workers
+        ).items()
+    }
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Pre-render /api/menu responses as static files
+
+Renders the API JSON for every school day of every week currently published
+on the prehrana page into ``frontend/snapshots/YYYY-MM-DD.json``, plus an
+``index.json`` listing them. The frontend reads today's snapshot straight
+from the CDN and only calls the function when there is none.
+
+Usage:
+    python backend/snapshot.py                      # write frontend/snapshots/
+    python backend/snapshot.py --out /tmp/snapshots --keep-days 7
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from school_lunch_checker import LunchMenuChecker, menu_payload  # noqa: E402
+
+DEFAULT_OUT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend", "snapshots"
+)
+INDEX_NAME = "index.json"
+
+
+def school_days(start_date, end_date):
+    """Monday-to-Friday dates from start_date to end_date inclusive"""
+    day = start_date
+    while day <= end_date:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+def render_snapshots(checker, generated_at=None):
+    """Return ``{'YYYY-MM-DD': payload}`` for every school day in the published weeks
+
+    Each day is resolved with the same week selection as ``/api/menu?test_date=``,
+    and every week page is fetched and parsed once.
+    """
+    generated_at = generated_at or datetime.now()
+    all_menus, fallback_links = checker.menu_links()
+
+    snapshots = {}
+    for listed in all_menus:
+        for day in school_days(listed["start_date"], listed["end_date"]):
+            key = day.strftime("%Y-%m-%d")
+            if key in snapshots:
+                continue
+            menu_info = checker.select_menu(all_menus, fallback_links, day)
+            menu, error = checker.day_menu(menu_info, day)
+            if error:
+                print(f"⚠️ Skipping {key}: {error}")
+                continue
+            payload = menu_payload(menu_info, menu, day)
+            payload["fetched_at"] = generated_at.isoformat()
+            payload["snapshot_date"] = key
+            snapshots[key] = payload
+    return dict(sorted(snapshots.items()))
+
+
+def _write_json(path, data):
+    """Write JSON atomically so the CDN never serves a half-written file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def write_snapshots(snapshots, out_dir, keep_days=14, today=None):
+    """Write the snapshot files and index, dropping days older than keep_days
+
+    Returns the names of the old snapshot files that were removed.
+    """
+    today = today or datetime.now()
+    cutoff = (today - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+
+    os.makedirs(out_dir, exist_ok=True)
+    for key, payload in snapshots.items():
+        if key >= cutoff:
+            _write_json(os.path.join(out_dir, f"{key}.json"), payload)
+
+    pruned = []
+    available = []
+    for name in sorted(os.listdir(out_dir)):
+        if not name.endswith(".json") or name == INDEX_NAME:
+            continue
+        key = name[: -len(".json")]
+        if key < cutoff:
+            os.unlink(os.path.join(out_dir, name))
+            pruned.append(name)
+        else:
+            available.append(key)
+
+    _write_json(
+        os.path.join(out_dir, INDEX_NAME),
+        {
+            "generated_at": today.isoformat(),
+            "dates": available,
+        },
+    )
+    return pruned
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default=DEFAULT_OUT_DIR, help="output directory")
+    parser.add_argument(
+        "--keep-days",
+        type=int,
+        default=14,
+        help="delete snapshots older than this many days",
+    )
+    args = parser.parse_args(argv)
+
+    checker = LunchMenuChecker()
+    snapshots = render_snapshots(checker)
+    if not snapshots:
+        print("❌ No menus rendered - leaving existing snapshots untouched")
+        return 1
+
+    pruned = write_snapshots(snapshots, args.out, args.keep_days)
+    print(
+        f"📸 Wrote {len(snapshots)} snapshots "
+        f"({min(snapshots)} – {max(snapshots)}) to {args.out}"
+    )
+    if pruned:
+        print(f"🧹 Removed {len(pruned)} old snapshots")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
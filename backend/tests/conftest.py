@@ -0,0 +1,83 @@
+"""
+Shared pytest fixtures for the backend tests.
+"""
+
+import importlib
+import os
+import sys
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+# Ensure both backend and repository root are on sys.path so we can import
+# both the desktop (backend) and Netlify function implementations.
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+for path in (str(BACKEND_ROOT), str(PROJECT_ROOT)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Importing app.py must not create the default on-disk menu archive
+os.environ.setdefault("LUNCH_MENU_ARCHIVE", "")
+
+MODULE_PATHS = [
+    ("backend", "school_lunch_checker"),
+    ("netlify", "netlify.functions.school_lunch_checker"),
+]
+
+
+@pytest.fixture(params=MODULE_PATHS, ids=[name for name, _ in MODULE_PATHS])
+def menu_module(request):
+    """Provide each LunchMenuChecker implementation for parametrized tests."""
+    _, module_path = request.param
+    return importlib.import_module(module_path)
+
+
+@pytest.fixture(autouse=True)
+def clear_menu_caches():
+    """Keep process-wide caches, metrics and breakers from leaking between tests"""
+    modules = [importlib.import_module(path) for _, path in MODULE_PATHS]
+    for module in modules:
+        module.clear_caches()
+        module.metrics.reset()
+        module.upstream.reset()
+    yield
+    for module in modules:
+        module.clear_caches()
+        module.metrics.reset()
+        module.upstream.reset()
+
+
+@pytest.fixture
+def checker(menu_module):
+    """A LunchMenuChecker with __init__ bypassed and a mocked session."""
+    with patch.object(menu_module.LunchMenuChecker, "__init__", lambda self: None):
+        checker = menu_module.LunchMenuChecker()
+    checker.base_url = "https://ostrbovlje.si"
+    checker.menu_url = "https://ostrbovlje.si/prehrana/"
+    checker.session = Mock()
+    return checker
+
+
+def mock_response(html, status_code=200, headers=None):
+    """Build a mocked requests response carrying the given HTML."""
+    response = Mock()
+    response.content = html.encode()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.raise_for_status = Mock()
+    return response
+
+
+@pytest.fixture
+def serve_pages(checker):
+    """Route the checker's session.get calls to a {url: html} mapping."""
+
+    def install(pages):
+        checker.session.get = Mock(
+            side_effect=lambda url, **kwargs: mock_response(pages[url])
+        )
+        return checker.session.get
+
+    return install
@@ -0,0 +1,296 @@
+"""
+Tests for the allergen bitmasks and /api/menu/safe.
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+import app
+from menu_archive import MenuArchive
+from school_lunch_checker import (
+    ALLERGEN_BITS,
+    DayMenu,
+    WeekMenu,
+    _decode_week,
+    _encode_week,
+    allergen_codes,
+    allergen_mask,
+    dish_allergens,
+    format_allergens,
+    scan_allergens,
+)
+
+WEEK_URL = "https://ostrbovlje.si/jedilnik-16-12-20-12-2024/"
+MENU_INFO = {
+    "url": WEEK_URL,
+    "text": "Jedilnik 16.12.–20.12. 2024",
+    "start_date": datetime(2024, 12, 16),
+    "end_date": datetime(2024, 12, 20),
+}
+SECTIONS = {
+    0: {
+        "MALICA": ["polnozrnat kruh–G", "čaj"],
+        "KOSILO": ["ribji file–R, G, J", "voda"],
+        "POP. MALICA": ["jabolko"],
+    },
+    1: {
+        "MALICA": ["banana"],
+        "KOSILO": ["ričet (svinjina)–Z", "sok"],
+        "POP. MALICA": ["sadni jogurt–L"],
+    },
+    2: {
+        "MALICA": ["mlečni zdrob–G, L"],
+        "KOSILO": ["pečen piščanec", "riž"],
+        "POP. MALICA": ["grozdje"],
+    },
+}
+
+
+def _week():
+    return WeekMenu(
+        url=WEEK_URL,
+        content_hash="abc",
+        days={
+            weekday: DayMenu(weekday, label, SECTIONS[weekday])
+            for weekday, label in ((0, "PON"), (1, "TOR"), (2, "SRE"))
+        },
+    )
+
+
+def test_dish_allergens_reads_trailing_codes():
+    assert dish_allergens("ribji file–R, G, J") == allergen_mask("R,G,J")
+    assert dish_allergens("kruh - GS, ŽD") == ALLERGEN_BITS["GS"] | ALLERGEN_BITS["ŽD"]
+    assert dish_allergens("pol-beli kruh") == 0
+    assert dish_allergens("čaj") == 0
+
+
+def test_mask_round_trips_codes():
+    assert allergen_codes(allergen_mask("l, g")) == ["G", "L"]
+    assert (
+        allergen_mask(["SE", "RA", "V"])
+        == ALLERGEN_BITS["SE"] | ALLERGEN_BITS["RA"] | ALLERGEN_BITS["V"]
+    )
+    with pytest.raises(ValueError):
+        allergen_mask("G,X")
+
+
+def test_day_menu_carries_dish_and_day_masks():
+    day = DayMenu(0, "PON", SECTIONS[0])
+
+    assert day.allergens["MALICA"] == [ALLERGEN_BITS["G"], 0]
+    assert allergen_codes(day.allergen_mask) == ["G", "J", "R"]
+
+
+def test_week_codec_keeps_masks():
+    week = _week()
+
+    decoded = _decode_week(json.loads(json.dumps(_encode_week(week))))
+
+    assert decoded.day(0).allergens == week.day(0).allergens
+
+
+def test_parsed_week_page_has_masks(menu_module, checker):
+    html = """
+    <table>
+        <tr><td>PON</td><td>kruh–G</td><td>ribji file–R, G</td><td>jogurt–L</td></tr>
+    </table>
+    """
+    week = checker._parse_week_menu(WEEK_URL, html.encode())
+
+    assert week.day(0).allergens["KOSILO"] == [allergen_mask("R,G")]
+    assert allergen_codes(week.day(0).allergen_mask) == ["G", "L", "R"]
+
+
+def test_scan_stops_at_the_legend():
+    text = (
+        "PON kruh–GS, L\nribji file–R\nSEZAM sir G\n"
+        "Alergeni: G – gluten, GS – gorčično seme\nTa teden: L – laktoza"
+    )
+
+    assert scan_allergens(text) == ([("G", "gluten"), ("GS", "gorčično seme")], [])
+    assert scan_allergens(text, codes=False) == scan_allergens(text)
+
+
+def test_scan_without_a_legend_lists_the_page_codes():
+    pairs, used = scan_allergens("PON kruh–GS, L\nribji file–R\nSEZAM sir G\nAlergeni:")
+
+    assert pairs == []
+    assert used == ["G", "L", "GS", "R"]
+    assert scan_allergens("kruh–G", codes=False) == ([], [])
+
+
+def test_format_allergens_puts_three_per_line():
+    pairs = [("G", "gluten"), ("J", "jajce"), ("S", "soja"), ("L", "laktoza")]
+
+    assert format_allergens(pairs) == "G = gluten, J = jajce, S = soja\nL = laktoza"
+    assert format_allergens([]) is None
+
+
+def test_codes_are_listed_without_a_legend(menu_module, checker):
+    soup = Mock(get_text=Mock(return_value="PON kruh–G, SE\njogurt–L"))
+
+    assert checker.extract_allergen_info(soup) == "G = gluten, L = laktoza, SE = sezam"
+
+
+def test_dish_codes_are_not_scanned_again(menu_module, checker):
+    soup = Mock(get_text=Mock(return_value="PON kruh–G, SE\njogurt–L\nV šoli"))
+
+    info = checker.extract_allergen_info(soup, mask=allergen_mask("G,L"))
+
+    # V (volčji bob) on the page is not a dish code, and is not listed
+    assert info == "G = gluten, L = laktoza"
+
+
+def test_parsed_week_lists_the_dish_codes(menu_module, checker):
+    html = """
+    <table><tr>
+      <td>PON</td><td>kruh–G</td><td>ribji file–R</td><td>jogurt</td>
+    </tr></table>
+    <p>V jedilnik so vključeni ...</p>
+    """
+
+    week = checker._parse_week_menu(WEEK_URL, html.encode())
+
+    assert week.allergen_info == "G = gluten, R = ribe"
+
+
+def test_allergen_info_is_memoized_by_content_hash(menu_module, checker):
+    soup = Mock(get_text=Mock(return_value="Alergeni: G – gluten"))
+
+    assert checker.extract_allergen_info(soup, "abc") == "G = gluten"
+    assert checker.extract_allergen_info(soup, "abc") == "G = gluten"
+    assert soup.get_text.call_count == 1
+    checker.extract_allergen_info(soup, "def")
+    assert soup.get_text.call_count == 2
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MenuArchive(str(tmp_path / "menus.sqlite3"))
+    archive.record_week(_week(), MENU_INFO)
+    yield archive
+    archive.close()
+
+
+def test_safe_days_filters_whole_days(archive):
+    assert [d["date"] for d in archive.safe_days(allergen_mask("G"))] == ["2024-12-17"]
+    assert [d["date"] for d in archive.safe_days(allergen_mask("R"))] == [
+        "2024-12-17",
+        "2024-12-18",
+    ]
+    assert [
+        d["date"] for d in archive.safe_days(0, start="2024-12-17", end="2024-12-17")
+    ] == ["2024-12-17"]
+    assert archive.safe_days(allergen_mask("L"))[0]["allergens"] == ["G", "J", "R"]
+
+
+def test_safe_days_can_filter_one_meal(archive):
+    safe = archive.safe_days(allergen_mask("G,L"), section="KOSILO")
+
+    assert [d["date"] for d in safe] == ["2024-12-17", "2024-12-18"]
+    with pytest.raises(ValueError):
+        archive.safe_days(0, section="VEČERJA")
+
+
+def test_rewritten_week_replaces_dish_rows(archive):
+    week = _week()
+    week.content_hash = "changed"
+    week.days[0] = DayMenu(0, "PON", {"KOSILO": ["golaž–Z"]})
+
+    archive.record_week(week, MENU_INFO)
+
+    assert "2024-12-16" in [d["date"] for d in archive.safe_days(allergen_mask("G"))]
+
+
+def test_days_without_codes_are_not_reported_safe(archive):
+    week = _week()
+    week.content_hash = "changed"
+    week.days[0] = DayMenu(0, "PON", {"KOSILO": ["golaž (G, L)", "kruh"]})
+
+    archive.record_week(week, MENU_INFO)
+
+    assert "2024-12-16" not in [
+        d["date"] for d in archive.safe_days(allergen_mask("G"))
+    ]
+    flagged = archive.safe_days(allergen_mask("G"), unannotated=True)
+    assert flagged[0] == {
+        "date": "2024-12-16",
+        "label": "PON",
+        "sections": {"KOSILO": ["golaž (G, L)", "kruh"]},
+        "allergens": [],
+        "annotated": False,
+    }
+    assert all(day["annotated"] for day in flagged[1:])
+
+
+def test_old_archives_are_migrated(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE weeks (url TEXT PRIMARY KEY, title TEXT NOT NULL,
+                            start_date TEXT, end_date TEXT,
+                            content_hash TEXT NOT NULL, allergen_info TEXT,
+                            fetched_at TEXT NOT NULL);
+        CREATE TABLE days (date TEXT PRIMARY KEY, week_url TEXT NOT NULL,
+                           weekday INTEGER NOT NULL, label TEXT NOT NULL,
+                           sections TEXT NOT NULL);
+    """)
+    conn.execute(
+        "INSERT INTO weeks VALUES "
+        "(?, 't', '2024-12-16', '2024-12-20', 'abc', NULL, 'x')",
+        (WEEK_URL,),
+    )
+    conn.execute(
+        "INSERT INTO days VALUES ('2024-12-16', ?, 0, 'PON', ?)",
+        (WEEK_URL, json.dumps(SECTIONS[0])),
+    )
+    conn.commit()
+    conn.close()
+
+    archive = MenuArchive(path)
+
+    assert archive.safe_days(allergen_mask("G")) == []
+    assert [d["date"] for d in archive.safe_days(allergen_mask("L"))] == ["2024-12-16"]
+    archive.close()
+
+
+@pytest.fixture
+def client(archive, monkeypatch):
+    monkeypatch.setattr(app, "menu_archive", archive)
+    return app.app.test_client()
+
+
+def test_safe_endpoint(client):
+    data = client.get(
+        "/api/menu/safe?exclude=g,R&from=2024-12-01&to=2024-12-31"
+    ).get_json()
+
+    assert data["exclude"] == ["G", "R"]
+    assert [d["date"] for d in data["days"]] == ["2024-12-17"]
+
+    data = client.get("/api/menu/safe?exclude=G&section=kosilo").get_json()
+    assert data["section"] == "KOSILO"
+    assert data["count"] == 2
+    assert all(day["annotated"] for day in data["days"])
+
+
+def test_safe_endpoint_rejects_bad_requests(client, monkeypatch):
+    assert client.get("/api/menu/safe?exclude=X").status_code == 400
+    assert client.get("/api/menu/safe?exclude=G&from=soon").status_code == 400
+    assert client.get("/api/menu/safe?exclude=G&section=zajtrk").status_code == 400
+    monkeypatch.setattr(app, "menu_archive", None)
+    assert client.get("/api/menu/safe?exclude=G").status_code == 503
+
+
+def test_allergen_memo_depends_on_the_dish_codes(menu_module, checker):
+    soup = Mock(get_text=Mock(return_value="PON kruh–G, SE\njogurt–L\nV šoli"))
+
+    assert (
+        checker.extract_allergen_info(soup, "abc", allergen_mask("G")) == "G = gluten"
+    )
+    # Without dish codes the page itself is scanned, whoever asked first
+    assert "SE = sezam" in checker.extract_allergen_info(soup, "abc")
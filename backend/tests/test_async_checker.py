@@ -0,0 +1,258 @@
+"""
+Tests for AsyncLunchMenuChecker and the ASGI /api/menu app.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+import async_checker  # noqa: E402
+import school_lunch_checker  # noqa: E402
+from async_checker import AsyncLunchMenuChecker  # noqa: E402
+from benchmarks.fake_upstream import FakeUpstream  # noqa: E402
+from cache_backends import MemoryCacheBackend  # noqa: E402
+from menu_archive import MenuArchive  # noqa: E402
+from school_lunch_checker import LunchMenuChecker  # noqa: E402
+
+TEST_DATE = datetime(2026, 1, 14)
+
+LISTING_HTML = """
+<a href="/jedilnik-23-12-27-12-2024/">Jedilnik 23.12.–27.12. 2024</a>
+<a href="/jedilnik-16-12-20-12-2024/">Jedilnik 16.12.–20.12. 2024</a>
+"""
+
+WEEK_HTML = """
+<table>
+    <tr><td>PET</td><td>kruh</td><td>{lunch}</td><td>jabolko</td></tr>
+</table>
+"""
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    """Shared clients belong to one event loop; every test runs its own"""
+    monkeypatch.setattr(async_checker, "_clients", {})
+
+
+@pytest.fixture
+def fake_upstream(monkeypatch):
+    server = FakeUpstream(latency=0.2).start()
+    monkeypatch.setattr(school_lunch_checker, "BASE_URL", server.url)
+    monkeypatch.setattr(school_lunch_checker, "MENU_URL", server.url + "/prehrana/")
+    yield server
+    server.stop()
+
+
+def _mock_client(pages, requests=None):
+    def handler(request):
+        if requests is not None:
+            requests.append(request)
+        if request.url.path not in pages:
+            return httpx.Response(404)
+        return httpx.Response(200, content=pages[request.url.path].encode())
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_resolves_the_same_menu_as_the_sync_checker(fake_upstream):
+    expected = LunchMenuChecker().resolve_menu(TEST_DATE)
+    school_lunch_checker.clear_caches()
+
+    resolution = asyncio.run(AsyncLunchMenuChecker().resolve_menu(TEST_DATE))
+
+    assert resolution == expected
+    assert resolution["error"] is None
+    assert "KOSILO" in resolution["menu"]
+
+
+def test_friday_keeps_the_current_week(monkeypatch):
+    pages = {
+        "/prehrana/": LISTING_HTML,
+        "/jedilnik-16-12-20-12-2024/": WEEK_HTML.format(lunch="ribji file"),
+        "/jedilnik-23-12-27-12-2024/": WEEK_HTML.format(lunch="pica"),
+    }
+    friday = datetime(2024, 12, 20, 12, 0)
+
+    async def resolve():
+        async with _mock_client(pages) as client:
+            checker = AsyncLunchMenuChecker(
+                base_url="https://ostrbovlje.si", client=client
+            )
+            return await checker.resolve_menu()
+
+    with patch("school_lunch_checker.datetime") as mock_datetime:
+        mock_datetime.now.return_value = friday
+        mock_datetime.side_effect = lambda *args, **kwargs: datetime(*args, **kwargs)
+        resolution = asyncio.run(resolve())
+
+    assert (
+        resolution["menu_info"]["url"]
+        == "https://ostrbovlje.si/jedilnik-16-12-20-12-2024/"
+    )
+    assert "ribji file" in resolution["menu"]
+
+
+def test_concurrent_requests_share_one_upstream_fetch(fake_upstream):
+    async def resolve_many():
+        return await asyncio.gather(
+            *(AsyncLunchMenuChecker().resolve_menu(TEST_DATE) for _ in range(200))
+        )
+
+    started = time.perf_counter()
+    resolutions = asyncio.run(resolve_many())
+    elapsed = time.perf_counter() - started
+
+    assert all(resolution["error"] is None for resolution in resolutions)
+    # The listing and the week page, each fetched once (2 x 0.2s)
+    assert fake_upstream.requests == 2
+    assert elapsed < 1.5
+
+
+def test_transient_failures_are_retried(monkeypatch):
+    monkeypatch.setattr(school_lunch_checker.upstream, "backoff", 0.001)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, content=LISTING_HTML.encode())
+
+    async def fetch_links():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            checker = AsyncLunchMenuChecker(
+                base_url="https://ostrbovlje.si", client=client
+            )
+            return await checker._fetch_menu_links()
+
+    all_menus, _ = asyncio.run(fetch_links())
+
+    assert len(all_menus) == 2
+    assert len(calls) == 2
+
+
+def test_open_circuit_is_reported_without_going_upstream():
+    breaker = school_lunch_checker.upstream.breaker("ostrbovlje.si")
+    for _ in range(breaker.failures):
+        breaker.record_failure()
+    requests = []
+
+    async def resolve():
+        async with _mock_client({}, requests) as client:
+            checker = AsyncLunchMenuChecker(
+                base_url="https://ostrbovlje.si", client=client
+            )
+            return await checker.resolve_menu(TEST_DATE)
+
+    resolution = asyncio.run(resolve())
+
+    assert resolution["menu_info"] is None
+    assert "Circuit open" in resolution["error"]
+    assert requests == []
+
+
+def test_no_requests_session_is_opened(monkeypatch):
+    monkeypatch.setattr(school_lunch_checker, "shared_session", None)
+
+    async def create():
+        async with _mock_client({}) as client:
+            return AsyncLunchMenuChecker(
+                base_url="https://ostrbovlje.si", client=client
+            )
+
+    assert asyncio.run(create()).session is None
+
+
+def test_shared_cache_and_archive_calls_run_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+
+    class RecordingBackend(MemoryCacheBackend):
+        def get(self, key):
+            threads.append(("cache", threading.get_ident()))
+            return super().get(key)
+
+        def set(self, key, value, ttl=None):
+            threads.append(("cache", threading.get_ident()))
+            return super().set(key, value, ttl)
+
+    class RecordingArchive(MenuArchive):
+        def lookup(self, day):
+            threads.append(("archive", threading.get_ident()))
+            return super().lookup(day)
+
+        def record_week(self, week, menu_info, page=None):
+            threads.append(("archive", threading.get_ident()))
+            return super().record_week(week, menu_info, page)
+
+    monkeypatch.setattr(
+        school_lunch_checker.listing_cache, "shared", RecordingBackend()
+    )
+    monkeypatch.setattr(school_lunch_checker.week_cache, "shared", RecordingBackend())
+    archive = RecordingArchive(str(tmp_path / "menus.sqlite3"))
+    pages = {
+        "/prehrana/": LISTING_HTML,
+        "/jedilnik-16-12-20-12-2024/": WEEK_HTML.format(lunch="ribji file"),
+    }
+
+    async def resolve():
+        async with _mock_client(pages) as client:
+            checker = AsyncLunchMenuChecker(
+                archive=archive, base_url="https://ostrbovlje.si", client=client
+            )
+            return (
+                await checker.resolve_menu(datetime(2024, 12, 20)),
+                threading.get_ident(),
+            )
+
+    resolution, loop_thread = asyncio.run(resolve())
+
+    assert "ribji file" in resolution["menu"]
+    assert {kind for kind, _ in threads} == {"cache", "archive"}
+    assert all(thread != loop_thread for _, thread in threads)
+
+
+def _asgi_get(path, headers=None):
+    import asgi
+
+    async def get():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            return await client.get(path, headers=headers)
+
+    return asyncio.run(get())
+
+
+def test_asgi_menu_endpoint(fake_upstream):
+    response = _asgi_get("/api/menu?test_date=2026-01-14")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["success"] and data["test_date"] == "2026-01-14"
+    assert data["source_url"].startswith(fake_upstream.url)
+    assert "KOSILO" in data["menu"]
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
+
+    revalidated = _asgi_get(
+        "/api/menu?test_date=2026-01-14",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert revalidated.status_code == 304
+
+
+def test_asgi_errors_and_metrics(fake_upstream):
+    assert _asgi_get("/api/menu?school=os-9").status_code == 404
+    assert _asgi_get("/api/menu?test_date=soon").status_code == 500
+    assert _asgi_get("/nowhere").status_code == 404
+
+    _asgi_get("/api/menu?test_date=2026-01-14")
+    metrics = _asgi_get("/metrics")
+    assert metrics.status_code == 200
+    assert 'lunch_stage_seconds_count{stage="api_menu"}' in metrics.text
@@ -0,0 +1,165 @@
+"""
+Tests for the rate-limited historical backfill.
+"""
+
+import sqlite3
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+import school_lunch_checker
+from backfill import MenuBackfill
+from benchmarks.corpus import week_paths
+from benchmarks.fake_upstream import FakeUpstream
+from crawler import MenuCrawler
+from menu_archive import MenuArchive
+from school_lunch_checker import TokenBucket
+
+WEEK_PATH = "/prehrana/jedilnik/jedilnik-431/"
+WEEKS = len(week_paths())
+
+
+@pytest.fixture
+def upstream():
+    with FakeUpstream() as server:
+        yield server
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MenuArchive(str(tmp_path / "menus.sqlite3"))
+    yield archive
+    archive.close()
+
+
+def make_backfill(archive, upstream, **kwargs):
+    kwargs.setdefault("rate", 0)
+    checker = school_lunch_checker.LunchMenuChecker(base_url=upstream.url)
+    return MenuBackfill(archive, checker, **kwargs)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_spaces_requests_after_the_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=4, burst=2, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.25)
+    assert waits[3] == pytest.approx(0.25)
+    assert clock.now == pytest.approx(0.5)
+
+
+def test_backfill_limits_its_own_fetch_layer(archive, upstream):
+    backfill = make_backfill(archive, upstream, rate=5, burst=3)
+
+    assert backfill.checker.upstream is not school_lunch_checker.upstream
+    bucket = backfill.checker.upstream.bucket("a.example")
+    assert (bucket.rate, bucket.burst) == (5, 3)
+    assert backfill.checker.upstream.bucket("b.example") is not bucket
+
+
+def test_backfill_archives_every_linked_week(archive, upstream):
+    report = make_backfill(archive, upstream, workers=4).run()
+
+    assert report.discovered == WEEKS
+    assert len(report.stored) == WEEKS
+    assert report.failed == {}
+    assert report.requests == WEEKS
+    assert report.bytes_downloaded > 0
+    assert report.pages_per_second > 0
+    menu_info, week = archive.lookup(date(2026, 1, 14))
+    assert menu_info["text"] == "Jedilnik 12.1.–16.1. 2026"
+    assert week.day(2).sections["KOSILO"]
+
+
+def test_rerun_is_idempotent_and_skips_archived_weeks(archive, upstream):
+    make_backfill(archive, upstream).run()
+    dates = archive.dates()
+    upstream.reset_counts()
+
+    report = make_backfill(archive, upstream).run()
+
+    assert report.skipped == WEEKS
+    assert report.requests == 0
+    assert report.stored == []
+    assert archive.dates() == dates
+    # Only the listing was asked for
+    assert upstream.requests <= 1
+
+
+def test_interrupted_backfill_resumes_with_the_failed_weeks(archive, upstream):
+    page = upstream.pages.pop(WEEK_PATH)
+
+    first = make_backfill(archive, upstream).run()
+    assert list(first.failed) == [upstream.url + WEEK_PATH]
+    assert len(first.stored) == WEEKS - 1
+
+    upstream.set_page(WEEK_PATH, page)
+    school_lunch_checker.clear_caches()
+    second = make_backfill(archive, upstream).run()
+
+    assert second.stored == [upstream.url + WEEK_PATH]
+    assert second.skipped == WEEKS - 1
+    assert archive.lookup(date(2026, 1, 14)) is not None
+
+
+def test_failed_archive_write_keeps_no_page_state(archive, upstream):
+    record_week = archive.record_week
+
+    def flaky(week, link, page=None):
+        if week.url.endswith(WEEK_PATH):
+            raise sqlite3.OperationalError("disk full")
+        return record_week(week, link, page)
+
+    with patch.object(archive, "record_week", side_effect=flaky):
+        first = make_backfill(archive, upstream).run()
+
+    assert list(first.failed) == [upstream.url + WEEK_PATH]
+    assert archive.page_state(upstream.url + WEEK_PATH) is None
+    assert archive.page_state(upstream.url + "/prehrana/jedilnik/jedilnik-430/")["etag"]
+    school_lunch_checker.clear_caches()
+    assert make_backfill(archive, upstream).run().stored == [upstream.url + WEEK_PATH]
+
+
+def test_refresh_refetches_without_rewriting_unchanged_weeks(archive, upstream):
+    make_backfill(archive, upstream).run()
+
+    report = make_backfill(archive, upstream, refresh=True).run()
+
+    assert report.requests == WEEKS
+    assert len(report.unchanged) == WEEKS
+    assert report.stored == []
+
+
+def test_rate_limit_bounds_request_rate(archive, upstream):
+    report = make_backfill(archive, upstream, workers=8, rate=50, burst=1).run()
+
+    assert report.failed == {}
+    # WEEKS requests at 50/s from a single token need (WEEKS - 1) / 50 seconds
+    assert report.elapsed >= (WEEKS - 1) / 50 * 0.9
+    assert report.throttled_seconds > 0
+
+
+def test_backfilled_weeks_are_revalidated_by_the_crawler(archive, upstream):
+    make_backfill(archive, upstream).run()
+    upstream.reset_counts()
+
+    checker = school_lunch_checker.LunchMenuChecker(base_url=upstream.url)
+    report = MenuCrawler(archive, checker).crawl()
+
+    assert report.new == []
+    assert len(report.unchanged) == WEEKS
+    assert report.not_modified == WEEKS
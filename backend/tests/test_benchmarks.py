@@ -0,0 +1,54 @@
+"""
+Tests for the recorded page corpus and the offline benchmark suite.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from benchmarks import bench_menu
+from benchmarks.corpus import LISTING_PATH, CorpusSession, load_pages, week_paths
+
+BASE_URL = "https://ostrbovlje.si"
+
+
+def test_listing_links_every_recorded_week(checker):
+    all_menus, _ = checker._parse_menu_links(load_pages()[LISTING_PATH])
+
+    linked = {menu["url"][len(BASE_URL) :] for menu in all_menus}
+    assert linked == set(week_paths())
+
+
+@pytest.mark.parametrize("path", week_paths())
+def test_recorded_weeks_parse_into_five_days(checker, path):
+    week = checker._parse_week_menu(BASE_URL + path, load_pages()[path])
+
+    assert sorted(week.days) == [0, 1, 2, 3, 4]
+    assert all(day.has_items() for day in week.days.values())
+    assert week.allergen_info.startswith("G = gluten")
+
+
+def test_corpus_session_serves_the_corpus(menu_module, checker):
+    checker.session = CorpusSession(BASE_URL)
+
+    result = checker.resolve_menu(datetime(2026, 1, 14))
+
+    assert result["menu_info"]["text"] == "Jedilnik 12.1.–16.1. 2026"
+    assert "SRE, 14.01" in result["menu"]
+    assert checker.session.requests == 2
+
+
+def test_benchmark_suite_runs_every_stage():
+    results = bench_menu.run_benchmarks(iterations=1, min_time=0)
+
+    assert set(results) == {
+        "listing_links",
+        "week_table",
+        "allergens",
+        "format_response",
+        "api_cold",
+        "api_warm",
+    }
+    for result in results.values():
+        assert result["ops_per_sec"] > 0
+        assert result["peak_kib"] >= 0
@@ -0,0 +1,244 @@
+"""
+Tests for the interchangeable cache backends.
+"""
+
+import socket
+import threading
+import time
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+from benchmarks.fake_redis import FakeRedis
+from cache_backends import (
+    CacheBackend,
+    FileCacheBackend,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    cache_backend_from_url,
+)
+from tests.test_menu_resolution import _pages
+from tests.test_shared_cache import _worker_caches
+
+BACKENDS = ["memory", "file", "redis"]
+
+
+@pytest.fixture(scope="module")
+def fake_redis():
+    with FakeRedis() as server:
+        yield server
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, tmp_path, fake_redis):
+    if request.param == "memory":
+        yield MemoryCacheBackend()
+    elif request.param == "file":
+        yield FileCacheBackend(str(tmp_path / "cache"))
+    else:
+        fake_redis.data.clear()
+        backend = RedisCacheBackend(port=fake_redis.server.server_address[1])
+        yield backend
+        backend.close()
+
+
+def test_round_trips_documents(backend):
+    backend.set("week:a", {"menu": "čevapčiči", "days": [1, 2]})
+
+    assert backend.get("week:a") == {"menu": "čevapčiči", "days": [1, 2]}
+    assert backend.get("week:b") is None
+
+
+def test_delete_and_clear(backend):
+    backend.set("week:a", 1)
+    backend.set("week:b", 2)
+
+    backend.delete("week:a")
+    assert backend.get("week:a") is None
+    assert backend.get("week:b") == 2
+
+    backend.clear()
+    assert backend.get("week:b") is None
+
+
+def test_expires_documents_after_ttl(backend):
+    backend.set("week:a", "pica", ttl=0.05)
+    backend.set("week:b", "golaž")
+
+    time.sleep(0.1)
+
+    assert backend.get("week:a") is None
+    assert backend.get("week:b") == "golaž"
+
+
+def test_lock_is_exclusive(backend):
+    inside = []
+    overlaps = []
+
+    def worker():
+        with backend.lock("week:a"):
+            inside.append(1)
+            if len(inside) > 1:
+                overlaps.append(1)
+            time.sleep(0.01)
+            inside.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlaps == []
+
+
+def test_backends_implement_the_whole_interface():
+    class Partial(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_redis_lock_is_not_released_once_taken_over(fake_redis):
+    port = fake_redis.server.server_address[1]
+    slow = RedisCacheBackend(port=port)
+    other = RedisCacheBackend(port=port)
+    lock_key = "school-lunch:lock:week:a"
+    execute = slow.execute
+
+    def take_over():
+        other.execute("SET", lock_key, "other", "PX", 30000)
+
+    def expiring_execute(*args):
+        # slow's lease expires while it releases the lock and another
+        # worker takes it: right after a GET check, or before a script runs
+        if args[0] == "EVAL":
+            take_over()
+        reply = execute(*args)
+        if args[:2] == ("GET", lock_key):
+            take_over()
+        return reply
+
+    slow.execute = expiring_execute
+    with slow.lock("week:a"):
+        pass
+
+    assert other.execute("GET", lock_key) == "other"
+    other.execute("DEL", lock_key)
+
+
+def test_menus_resolve_while_the_shared_backend_is_down(
+    menu_module, checker, serve_pages
+):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    store = RedisCacheBackend(port=port)
+    get = serve_pages(_pages())
+    checker.listing_cache, checker.week_cache = _worker_caches(menu_module, store)
+
+    resolution = checker.resolve_menu(datetime(2024, 12, 18))
+
+    assert resolution["error"] is None
+    assert resolution["menu_info"] is not None
+    assert get.call_count == 2
+
+
+def test_memory_backend_drops_released_key_locks():
+    backend = MemoryCacheBackend()
+    for day in range(100):
+        with backend.lock(f"today:{day}"):
+            assert len(backend._key_locks) == 1
+
+    assert backend._key_locks == {}
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+
+    backend.set("c", 3)
+
+    assert backend.get("a") == 1
+    assert backend.get("b") is None
+    assert backend.get("c") == 3
+
+
+def test_redis_backend_namespaces_keys(fake_redis):
+    port = fake_redis.server.server_address[1]
+    first = RedisCacheBackend(port=port, prefix="school-a:")
+    second = RedisCacheBackend(port=port, prefix="school-b:")
+    first.set("week", "a")
+    second.set("week", "b")
+
+    first.clear()
+
+    assert first.get("week") is None
+    assert second.get("week") == "b"
+    assert b"school-b:week" in fake_redis.data
+
+
+def test_redis_backend_reconnects_after_a_dropped_connection(fake_redis):
+    backend = RedisCacheBackend(port=fake_redis.server.server_address[1])
+    backend.set("week", "pica")
+    backend._sock.close()
+
+    assert backend.get("week") == "pica"
+
+
+def test_backend_from_url(tmp_path):
+    memory = cache_backend_from_url("memory://?max_entries=8")
+    files = cache_backend_from_url(f"file://{tmp_path}/cache")
+    bare = cache_backend_from_url(str(tmp_path / "other"))
+    redis = cache_backend_from_url("redis://:s3cret@cache.local:6390/2?prefix=lunch:")
+
+    assert isinstance(memory, MemoryCacheBackend) and memory.max_entries == 8
+    assert (
+        isinstance(files, FileCacheBackend) and files.directory == f"{tmp_path}/cache"
+    )
+    assert isinstance(bare, FileCacheBackend)
+    assert (redis.host, redis.port, redis.db, redis.password, redis.prefix) == (
+        "cache.local",
+        6390,
+        2,
+        "s3cret",
+        "lunch:",
+    )
+    with pytest.raises(ValueError):
+        cache_backend_from_url("memcached://localhost")
+
+
+def test_nodes_share_parsed_pages_through_redis(
+    menu_module, checker, serve_pages, fake_redis
+):
+    store = RedisCacheBackend(port=fake_redis.server.server_address[1], prefix="nodes:")
+    get = serve_pages(_pages())
+    checker.listing_cache, checker.week_cache = _worker_caches(menu_module, store)
+    first = checker.resolve_menu(datetime(2024, 12, 18))
+
+    checker.listing_cache, checker.week_cache = _worker_caches(menu_module, store)
+    checker.session.get = Mock(side_effect=AssertionError("went upstream"))
+
+    assert checker.resolve_menu(datetime(2024, 12, 18)) == first
+    assert get.call_count == 2
+    store.clear()
+
+
+def test_workers_share_rendered_responses():
+    import app
+
+    store = MemoryCacheBackend()
+    first = app.StaleWhileRevalidateCache(300, store)
+    second = app.StaleWhileRevalidateCache(300, store)
+    first.get("2024-12-18", lambda: ({"menu": "pica"}, None))
+
+    payload, stale, error = second.get(
+        "2024-12-18", Mock(side_effect=AssertionError("rebuilt"))
+    )
+
+    assert (payload, stale, error) == ({"menu": "pica"}, False, None)
@@ -0,0 +1,173 @@
+"""
+Tests for the incremental crawler keeping the menu archive in sync.
+"""
+
+import sqlite3
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+import school_lunch_checker
+from benchmarks.corpus import LISTING_PATH, load_pages, week_paths
+from benchmarks.fake_upstream import FakeUpstream
+from crawler import MenuCrawler
+from menu_archive import MenuArchive
+
+WEEK_PATH = "/prehrana/jedilnik/jedilnik-431/"
+WEEKS = len(week_paths())
+
+
+@pytest.fixture
+def upstream():
+    with FakeUpstream() as server:
+        yield server
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MenuArchive(str(tmp_path / "menus.sqlite3"))
+    yield archive
+    archive.close()
+
+
+@pytest.fixture
+def crawler(archive, upstream):
+    return MenuCrawler(
+        archive, school_lunch_checker.LunchMenuChecker(base_url=upstream.url)
+    )
+
+
+def test_first_crawl_archives_every_week(crawler, archive, upstream):
+    report = crawler.crawl()
+
+    assert len(report.new) == WEEKS
+    assert report.failed == {}
+    assert report.listing_changed
+    assert report.requests == WEEKS + 1
+    assert report.parsed == WEEKS + 1
+    menu_info, week = archive.lookup(date(2026, 1, 14))
+    assert menu_info["text"] == "Jedilnik 12.1.–16.1. 2026"
+    assert week.day(2).sections["KOSILO"]
+
+
+def test_unchanged_site_costs_only_conditional_gets(crawler, upstream):
+    crawler.crawl()
+    upstream.reset_counts()
+
+    with patch.object(crawler.checker, "parse_week") as parse_week:
+        report = crawler.crawl()
+
+    assert len(report.unchanged) == WEEKS
+    assert not report.listing_changed
+    assert report.parsed == 0
+    assert parse_week.call_count == 0
+    assert report.not_modified == WEEKS + 1
+    assert upstream.statuses == {304: WEEKS + 1}
+    assert report.bytes_downloaded == 0
+
+
+def test_edited_week_is_reparsed(crawler, archive, upstream):
+    crawler.crawl()
+    page = load_pages()[WEEK_PATH]
+    upstream.set_page(
+        WEEK_PATH, page.replace("ribji file".encode(), "lazanja".encode())
+    )
+
+    report = crawler.crawl()
+
+    assert report.changed == [upstream.url + WEEK_PATH]
+    assert report.parsed == 1
+    _, week = archive.lookup(date(2026, 1, 14))
+    assert any("lazanja" in item for item in week.day(2).sections["KOSILO"])
+
+
+def test_newly_linked_week_is_fetched(crawler, upstream):
+    crawler.crawl()
+    pages = load_pages()
+    listing = pages[LISTING_PATH]
+    upstream.set_page("/prehrana/jedilnik/jedilnik-436/", pages[WEEK_PATH])
+    upstream.set_page(
+        LISTING_PATH,
+        listing.replace(
+            b'<ul class="jedilniki">',
+            '<ul class="jedilniki">\n'
+            '<li><a href="/prehrana/jedilnik/jedilnik-436/">'
+            "Jedilnik 16.2.–20.2. 2026</a></li>".encode(),
+        ),
+    )
+
+    report = crawler.crawl()
+
+    assert report.listing_changed
+    assert report.new == [upstream.url + "/prehrana/jedilnik/jedilnik-436/"]
+    assert len(report.unchanged) == WEEKS
+    assert report.parsed == 2
+
+
+def test_unchanged_content_without_etags_is_not_reparsed(archive):
+    with FakeUpstream(etags=False) as upstream:
+        crawler = MenuCrawler(
+            archive, school_lunch_checker.LunchMenuChecker(base_url=upstream.url)
+        )
+        crawler.crawl()
+        report = crawler.crawl()
+
+    assert len(report.unchanged) == WEEKS
+    assert report.parsed == 0
+    assert report.not_modified == 0
+
+
+def test_failed_week_is_reported_and_retried(crawler, upstream):
+    missing = upstream.pages.pop(WEEK_PATH)
+    first = crawler.crawl()
+    upstream.set_page(WEEK_PATH, missing)
+
+    second = crawler.crawl()
+
+    assert list(first.failed) == [upstream.url + WEEK_PATH]
+    assert second.new == [upstream.url + WEEK_PATH]
+
+
+def test_failed_archive_write_is_retried_on_the_next_crawl(crawler, archive, upstream):
+    crawler.crawl()
+    page = load_pages()[WEEK_PATH]
+    upstream.set_page(
+        WEEK_PATH, page.replace("ribji file".encode(), "lazanja".encode())
+    )
+
+    with patch.object(
+        archive, "record_week", side_effect=sqlite3.OperationalError("disk full")
+    ):
+        first = crawler.crawl()
+    second = crawler.crawl()
+
+    assert list(first.failed) == [upstream.url + WEEK_PATH]
+    assert second.changed == [upstream.url + WEEK_PATH]
+    _, week = archive.lookup(date(2026, 1, 14))
+    assert any("lazanja" in item for item in week.day(2).sections["KOSILO"])
+
+
+def test_failed_listing_write_is_retried_on_the_next_crawl(crawler, archive, upstream):
+    crawler.crawl()
+    pages = load_pages()
+    upstream.set_page("/prehrana/jedilnik/jedilnik-436/", pages[WEEK_PATH])
+    upstream.set_page(
+        LISTING_PATH,
+        pages[LISTING_PATH].replace(
+            b'<ul class="jedilniki">',
+            '<ul class="jedilniki">\n'
+            '<li><a href="/prehrana/jedilnik/jedilnik-436/">'
+            "Jedilnik 16.2.–20.2. 2026</a></li>".encode(),
+        ),
+    )
+
+    with patch.object(
+        archive, "replace_links", side_effect=sqlite3.OperationalError("disk full")
+    ):
+        with pytest.raises(sqlite3.OperationalError):
+            crawler.crawl()
+    report = crawler.crawl()
+
+    assert report.listing_changed
+    assert report.new == [upstream.url + "/prehrana/jedilnik/jedilnik-436/"]
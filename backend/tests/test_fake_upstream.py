@@ -0,0 +1,106 @@
+"""
+Tests for the local ostrbovlje.si stand-in and pointing the checker at it.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+import requests
+
+from benchmarks.corpus import LISTING_PATH, load_pages
+from benchmarks.fake_upstream import FakeUpstream
+
+WEEK_PATH = "/prehrana/jedilnik/jedilnik-431/"
+TARGET_DATE = datetime(2026, 1, 14)
+
+
+@pytest.fixture
+def upstream():
+    with FakeUpstream() as server:
+        yield server
+
+
+def test_replays_recorded_pages(upstream):
+    response = requests.get(upstream.url + WEEK_PATH, timeout=5)
+
+    assert response.status_code == 200
+    assert response.content == load_pages()[WEEK_PATH]
+    assert requests.get(upstream.url + "/missing/", timeout=5).status_code == 404
+    assert upstream.hits[WEEK_PATH] == 1
+    assert upstream.statuses == {200: 1, 404: 1}
+
+
+def test_answers_matching_etag_with_304(upstream):
+    etag = requests.get(upstream.url + LISTING_PATH, timeout=5).headers["ETag"]
+
+    response = requests.get(
+        upstream.url + LISTING_PATH, headers={"If-None-Match": etag}, timeout=5
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_injects_failures_and_latency():
+    with FakeUpstream(latency=0.1, error_rate=1.0, error_status=502) as upstream:
+        start = time.perf_counter()
+        response = requests.get(upstream.url + LISTING_PATH, timeout=5)
+
+    assert response.status_code == 502
+    assert time.perf_counter() - start >= 0.1
+
+
+def test_slow_body_is_streamed_over_time():
+    with FakeUpstream(slow_body=0.3) as upstream:
+        start = time.perf_counter()
+        response = requests.get(upstream.url + WEEK_PATH, timeout=5)
+
+    assert response.content == load_pages()[WEEK_PATH]
+    assert time.perf_counter() - start >= 0.3
+
+
+def test_stalled_body_trips_the_read_timeout():
+    with FakeUpstream(slow_body=3.0) as upstream:
+        with pytest.raises(requests.exceptions.ConnectionError):
+            requests.get(upstream.url + WEEK_PATH, timeout=0.1).content
+
+
+def test_checker_resolves_menu_from_fake_upstream(menu_module, upstream):
+    checker = menu_module.LunchMenuChecker(base_url=upstream.url)
+
+    result = checker.resolve_menu(TARGET_DATE)
+
+    assert checker.menu_url == upstream.url + "/prehrana/"
+    assert result["menu_info"]["url"] == upstream.url + WEEK_PATH
+    assert "SRE, 14.01" in result["menu"]
+    assert upstream.hits == {LISTING_PATH: 1, WEEK_PATH: 1}
+
+
+def test_concurrent_checkers_coalesce_upstream_requests(menu_module):
+    with FakeUpstream(latency=0.2) as upstream:
+
+        def resolve():
+            return menu_module.LunchMenuChecker(base_url=upstream.url).resolve_menu(
+                TARGET_DATE
+            )
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(lambda _: resolve(), range(6)))
+
+    assert all(result["error"] is None for result in results)
+    assert upstream.hits == {LISTING_PATH: 1, WEEK_PATH: 1}
+
+
+def test_default_urls_come_from_environment(menu_module, monkeypatch):
+    monkeypatch.setattr(menu_module, "BASE_URL", "http://127.0.0.1:8001")
+    monkeypatch.setattr(menu_module, "MENU_URL", "http://127.0.0.1:8001/prehrana/")
+
+    checker = menu_module.LunchMenuChecker()
+
+    assert (
+        checker._absolute_url("/prehrana/jedilnik/")
+        == "http://127.0.0.1:8001/prehrana/jedilnik/"
+    )
+    assert checker.menu_url == "http://127.0.0.1:8001/prehrana/"
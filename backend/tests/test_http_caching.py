@@ -0,0 +1,148 @@
+"""
+Tests for ETag / 304 handling and the week-aware Cache-Control headers.
+"""
+
+import importlib
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+
+import app
+from school_lunch_checker import (
+    cache_headers,
+    etag_matches,
+    menu_cache_headers,
+    menu_etag,
+    menu_payload,
+)
+
+PAYLOAD = {
+    "success": True,
+    "menu": "pica",
+    "covers_day": True,
+    "fetched_at": "2024-12-18T07:00:00",
+    "test_date": None,
+}
+
+
+def test_cache_headers_expire_at_ljubljana_midnight():
+    # 21:30 UTC is 22:30 in Ljubljana (CET), 90 minutes before midnight
+    headers = cache_headers(datetime(2024, 12, 18, 21, 30, tzinfo=timezone.utc))
+
+    assert headers["Cache-Control"] == "public, max-age=5400"
+    assert headers["Expires"] == "Wed, 18 Dec 2024 23:00:00 GMT"
+
+
+def test_cache_headers_across_dst_change():
+    # Sunday 30 March 2025 (clocks go forward to CEST) is only 23 hours long
+    headers = cache_headers(datetime(2025, 3, 29, 23, 0, tzinfo=timezone.utc))
+
+    assert headers["Cache-Control"] == "public, max-age=82800"
+    assert headers["Expires"] == "Sun, 30 Mar 2025 22:00:00 GMT"
+
+
+def test_menu_day_is_the_ljubljana_day(menu_module):
+    # 23:30 UTC on the 18th is already the 19th in Ljubljana
+    utc_now = datetime(2024, 12, 18, 23, 30, tzinfo=timezone.utc)
+
+    with patch(f"{menu_module.__name__}.datetime") as mock_datetime:
+        mock_datetime.now.side_effect = lambda tz=None: utc_now.astimezone(tz)
+        assert menu_module.menu_now() == datetime(2024, 12, 19, 0, 30)
+
+
+def test_only_menus_covering_the_day_are_cached():
+    week = {
+        "url": "https://ostrbovlje.si/jedilnik/",
+        "text": "Jedilnik 16.12.–20.12. 2024",
+        "start_date": datetime(2024, 12, 16),
+        "end_date": datetime(2024, 12, 20),
+    }
+
+    assert menu_payload(week, "pica", datetime(2024, 12, 20, 9))["covers_day"]
+    # The last listed week as a fallback, an undated link, no menu at all
+    for menu_info in (week, {"url": week["url"], "text": week["text"]}, None):
+        payload = menu_payload(menu_info, "pica", datetime(2024, 12, 23))
+        assert menu_cache_headers(payload) == {"Cache-Control": "no-cache"}
+    assert menu_cache_headers(PAYLOAD)["Cache-Control"].startswith("public, max-age=")
+
+
+def test_menu_etag_ignores_volatile_fields():
+    other = dict(PAYLOAD, fetched_at="2024-12-18T09:00:00", timestamp="now", stale=True)
+
+    assert menu_etag(PAYLOAD) == menu_etag(other)
+    assert menu_etag(PAYLOAD) != menu_etag(dict(PAYLOAD, menu="golaž"))
+    assert menu_etag(PAYLOAD).startswith('"')
+
+
+def test_etag_matches():
+    etag = menu_etag(PAYLOAD)
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, "SERVE_MODE", "direct")
+    monkeypatch.setattr(
+        app, "build_menu_payload", Mock(return_value=(dict(PAYLOAD), None))
+    )
+    return app.app.test_client()
+
+
+def test_flask_revalidates_with_304(client):
+    first = client.get("/api/menu")
+    etag = first.headers["ETag"]
+
+    second = client.get("/api/menu", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"].startswith("public, max-age=")
+    assert "Expires" in first.headers
+    assert second.status_code == 304
+    assert second.data == b""
+
+
+def test_flask_failed_lookup_is_not_cached(client):
+    app.build_menu_payload.return_value = (dict(PAYLOAD, menu="Napaka"), "timed out")
+
+    response = client.get("/api/menu")
+
+    assert response.headers["Cache-Control"] == "no-store"
+
+
+def test_netlify_handler_revalidates_with_304(monkeypatch):
+    function = importlib.import_module("netlify.functions.menu")
+    checker = Mock()
+    checker.resolve_menu.return_value = {
+        "menu_info": {
+            "url": "https://ostrbovlje.si/jedilnik/",
+            "text": "Jedilnik 16.12.–20.12. 2024",
+            "start_date": datetime(2024, 12, 16),
+            "end_date": datetime(2024, 12, 20),
+        },
+        "menu": "pica",
+        "error": None,
+    }
+    monkeypatch.setattr(function, "get_checker", Mock(return_value=checker))
+    monkeypatch.setattr(
+        function, "menu_now", Mock(return_value=datetime(2024, 12, 18, 7))
+    )
+    monkeypatch.setattr(
+        function, "_warm_response", {"day": None, "stored_at": 0.0, "data": None}
+    )
+
+    first = function.handler({"httpMethod": "GET", "headers": {}}, None)
+    etag = first["headers"]["ETag"]
+    second = function.handler(
+        {"httpMethod": "GET", "headers": {"If-None-Match": etag}}, None
+    )
+
+    assert first["statusCode"] == 200
+    assert first["headers"]["Cache-Control"].startswith("public, max-age=")
+    assert second["statusCode"] == 304
+    assert second["body"] == ""
@@ -0,0 +1,62 @@
+"""
+Import-time benchmark for the server entry points.
+
+Runs ``python -X importtime`` in a fresh interpreter so the numbers reflect a
+real cold start, prints the cumulative import time and checks that the GUI and
+the heavy HTTP/parser dependencies are not loaded at import.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+DEFERRED_MODULES = {"tkinter", "requests", "bs4", "urllib3", "lunch_menu_gui"}
+
+
+def _import_profile(module, cwd):
+    """Return {module_name: cumulative_microseconds} for importing module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+@pytest.mark.parametrize(
+    "module, cwd",
+    [
+        ("school_lunch_checker", BACKEND_ROOT),
+        ("netlify.functions.school_lunch_checker", PROJECT_ROOT),
+    ],
+    ids=["backend", "netlify"],
+)
+def test_checker_import_is_light(module, cwd):
+    profile = _import_profile(module, cwd)
+
+    top_level = {name.split(".")[0] for name in profile}
+    assert not DEFERRED_MODULES & top_level
+    print(f"\n{module}: {profile[module] / 1000:.1f} ms cumulative import time")
+
+
+def test_heavy_modules_load_on_first_use():
+    code = (
+        "import sys, school_lunch_checker as s; "
+        'assert "bs4" not in sys.modules; '
+        's.LunchMenuChecker()._parse_menu_links(b"<a href=/x>Jedilnik</a>"); '
+        'assert "bs4" in sys.modules and "requests" in sys.modules'
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=BACKEND_ROOT, check=True)
@@ -0,0 +1,84 @@
+"""
+Tests for the process-wide /prehrana/ listing cache.
+"""
+
+from datetime import datetime
+from unittest.mock import Mock
+
+from tests.conftest import mock_response
+
+LISTING_URL = "https://ostrbovlje.si/prehrana/"
+
+LISTING_HTML = """
+<html>
+<body>
+    <a href="/jedilnik-16-12-20-12-2024/">Jedilnik 16.12.–20.12. 2024</a>
+</body>
+</html>
+"""
+
+TARGET_DATE = datetime(2024, 12, 18)
+
+
+def _expire(menu_module):
+    for entry in menu_module.listing_cache._entries.values():
+        entry["fetched_at"] -= menu_module.listing_cache.ttl + 1
+
+
+def test_fresh_listing_is_served_from_memory(menu_module, checker):
+    checker.session.get = Mock(return_value=mock_response(LISTING_HTML))
+
+    first = checker.get_current_week_menu_url_for_date(TARGET_DATE)
+    second = checker.get_current_week_menu_url_for_date(TARGET_DATE)
+
+    assert checker.session.get.call_count == 1
+    assert first == second
+    assert first["url"] == "https://ostrbovlje.si/jedilnik-16-12-20-12-2024/"
+
+
+def test_cache_is_shared_between_checkers(menu_module, checker):
+    checker.session.get = Mock(return_value=mock_response(LISTING_HTML))
+    checker.get_current_week_menu_url_for_date(TARGET_DATE)
+
+    other = menu_module.LunchMenuChecker()
+    other.session = Mock()
+
+    assert other.get_current_week_menu_url_for_date(TARGET_DATE) is not None
+    other.session.get.assert_not_called()
+
+
+def test_expired_listing_is_revalidated_with_304(menu_module, checker, monkeypatch):
+    validators = {"ETag": '"abc"', "Last-Modified": "Mon, 16 Dec 2024 08:00:00 GMT"}
+    checker.session.get = Mock(
+        return_value=mock_response(LISTING_HTML, headers=validators)
+    )
+    checker.get_current_week_menu_url_for_date(TARGET_DATE)
+    _expire(menu_module)
+
+    parse = Mock(side_effect=AssertionError("304 must not re-parse"))
+    monkeypatch.setattr(checker, "_parse_menu_links", parse)
+    checker.session.get = Mock(return_value=mock_response("", status_code=304))
+
+    result = checker.get_current_week_menu_url_for_date(TARGET_DATE)
+
+    assert result["text"] == "Jedilnik 16.12.–20.12. 2024"
+    assert checker.session.get.call_args.kwargs["headers"] == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Mon, 16 Dec 2024 08:00:00 GMT",
+    }
+    # The 304 refreshed the entry, so the next call stays in memory
+    checker.get_current_week_menu_url_for_date(TARGET_DATE)
+    assert checker.session.get.call_count == 1
+
+
+def test_expired_listing_is_reparsed_when_changed(menu_module, checker):
+    checker.session.get = Mock(return_value=mock_response(LISTING_HTML))
+    checker.get_current_week_menu_url_for_date(TARGET_DATE)
+    _expire(menu_module)
+
+    changed = LISTING_HTML.replace("16.12.–20.12.", "16.12.–19.12.")
+    checker.session.get = Mock(return_value=mock_response(changed))
+
+    result = checker.get_current_week_menu_url_for_date(TARGET_DATE)
+
+    assert result["text"] == "Jedilnik 16.12.–19.12. 2024"
@@ -0,0 +1,67 @@
+"""
+Tests for the /api/menu load generator.
+"""
+
+from unittest.mock import Mock
+
+import school_lunch_checker
+from benchmarks import loadtest
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+
+    assert loadtest.percentile(values, 50) == 50.0
+    assert loadtest.percentile(values, 99) == 99.0
+    assert loadtest.percentile([0.2], 95) == 0.2
+    assert loadtest.percentile([], 50) == 0.0
+
+
+def test_compares_serving_modes():
+    results = loadtest.run_loadtest(clients=2, duration=None, requests_per_client=3)
+
+    assert set(results) == set(loadtest.MODES)
+    for result in results.values():
+        assert result["requests"] == 6
+        assert result["failures"] == 0
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+    # The listing and week page are fetched once while the caches are on
+    assert results["cache"]["upstream_requests"] == 2
+    assert results["swr"]["upstream_requests"] == 2
+    assert results["nocache"]["upstream_requests"] > 2
+
+
+def test_counts_upstream_failures():
+    results = loadtest.run_loadtest(
+        ["nocache"],
+        upstream_options={"error_rate": 1.0},
+        clients=1,
+        duration=None,
+        requests_per_client=2,
+    )
+
+    assert results["nocache"]["failures"] == 2
+    # Each 503 is retried; the host's circuit opens after five failures and
+    # the second request's last attempt is refused without going upstream
+    assert results["nocache"]["upstream_statuses"] == {503: 5}
+
+
+def test_restores_settings_after_a_run():
+    import app
+
+    base_url = school_lunch_checker.BASE_URL
+
+    loadtest.run_loadtest(["nocache"], clients=1, duration=None, requests_per_client=1)
+
+    assert (
+        school_lunch_checker.listing_cache.ttl == school_lunch_checker.LISTING_CACHE_TTL
+    )
+    assert school_lunch_checker.BASE_URL == base_url
+    assert app.SERVE_MODE == "direct"
+
+
+def test_upstream_rate_limit_is_lifted_while_serving():
+    with loadtest.serving("nocache", Mock(url="http://127.0.0.1:9")):
+        assert school_lunch_checker.upstream.rate == 0
+
+    assert school_lunch_checker.upstream.rate == school_lunch_checker.UPSTREAM_RATE
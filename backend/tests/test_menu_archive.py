@@ -0,0 +1,114 @@
+"""
+Tests for the persistent SQLite menu archive.
+"""
+
+from datetime import date, datetime
+from unittest.mock import Mock
+
+import pytest
+
+from menu_archive import MenuArchive
+from school_lunch_checker import DayMenu, WeekMenu
+
+WEEK_URL = "https://ostrbovlje.si/jedilnik-16-12-20-12-2024/"
+MENU_INFO = {
+    "url": WEEK_URL,
+    "text": "Jedilnik 16.12.–20.12. 2024",
+    "start_date": datetime(2024, 12, 16),
+    "end_date": datetime(2024, 12, 20),
+}
+
+
+def _week(digest="abc"):
+    return WeekMenu(
+        url=WEEK_URL,
+        content_hash=digest,
+        days={
+            0: DayMenu(
+                0,
+                "PON",
+                {"MALICA": ["črna žemlja"], "KOSILO": ["golaž"], "POP. MALICA": []},
+            ),
+            2: DayMenu(
+                2,
+                "SRE",
+                {
+                    "MALICA": ["ajdov kruh"],
+                    "KOSILO": ["pica"],
+                    "POP. MALICA": ["jogurt"],
+                },
+            ),
+        },
+        allergen_info="G = gluten",
+    )
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MenuArchive(str(tmp_path / "menus.sqlite3"))
+    yield archive
+    archive.close()
+
+
+def test_days_are_indexed_by_date(archive):
+    assert archive.record_week(_week(), MENU_INFO)
+
+    assert archive.dates() == ["2024-12-16", "2024-12-18"]
+    menu_info, week = archive.lookup(date(2024, 12, 18))
+    assert menu_info["text"] == "Jedilnik 16.12.–20.12. 2024"
+    assert menu_info["start_date"] == datetime(2024, 12, 16)
+    assert week.day(2).sections["KOSILO"] == ["pica"]
+    assert week.allergen_info == "G = gluten"
+    assert archive.lookup(date(2024, 12, 17)) is None
+
+
+def test_unchanged_week_is_not_rewritten(archive):
+    assert archive.record_week(_week(), MENU_INFO)
+    assert not archive.record_week(_week(), MENU_INFO)
+    assert archive.record_week(_week("changed"), MENU_INFO)
+
+
+def test_archive_survives_restart(tmp_path):
+    path = str(tmp_path / "menus.sqlite3")
+    first = MenuArchive(path)
+    first.record_week(_week(), MENU_INFO)
+    first.close()
+
+    second = MenuArchive(path)
+    assert second.has_week(WEEK_URL, "abc")
+    assert second.lookup(date(2024, 12, 16)) is not None
+    second.close()
+
+
+def test_date_lookup_hits_archive_before_upstream(menu_module, checker, archive):
+    archive.record_week(_week(), MENU_INFO)
+    checker.archive = archive
+
+    result = checker.resolve_menu(datetime(2024, 12, 18))
+
+    checker.session.get.assert_not_called()
+    assert result["menu_info"]["url"] == WEEK_URL
+    assert "🍝 KOSILO: pica" in result["menu"]
+    assert "SRE, 18.12" in result["menu"]
+
+
+def test_fetched_weeks_are_archived(menu_module, checker, archive, serve_pages):
+    checker.archive = archive
+    serve_pages(
+        {
+            "https://ostrbovlje.si/prehrana/": (
+                '<a href="/jedilnik-16-12-20-12-2024/">Jedilnik 16.12.–20.12. 2024</a>'
+            ),
+            WEEK_URL: (
+                "<table><tr><td>TOR</td><td>kruh</td><td>pica</td><td>sok</td></tr>"
+                "</table>"
+            ),
+        }
+    )
+
+    checker.resolve_menu(datetime(2024, 12, 17))
+
+    assert archive.dates() == ["2024-12-17"]
+    checker.session.get = Mock()
+    assert "KOSILO: pica" in checker.resolve_menu(datetime(2024, 12, 17))["menu"]
+    checker.session.get.assert_not_called()
@@ -0,0 +1,80 @@
+"""
+Tests for resolving the menu link and the day's menu in a single pass.
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+LISTING_URL = "https://ostrbovlje.si/prehrana/"
+WEEK_URL = "https://ostrbovlje.si/jedilnik-16-12-20-12-2024/"
+
+LISTING_HTML = """
+<html>
+<body>
+    <a href="/jedilnik-23-12-27-12-2024/">Jedilnik 23.12.–27.12. 2024</a>
+    <a href="/jedilnik-16-12-20-12-2024/">Jedilnik 16.12.–20.12. 2024</a>
+</body>
+</html>
+"""
+
+WEEK_HTML = """
+<html>
+<body>
+    <table>
+        <tr><th></th><th>MALICA</th><th>KOSILO</th><th>POP. MALICA</th></tr>
+        <tr><td>PON</td><td>črna žemlja</td><td>golaž</td><td>jabolko</td></tr>
+        <tr><td>SRE</td><td>ajdov kruh
+sir</td><td>pica</td><td>jogurt</td></tr>
+    </table>
+</body>
+</html>
+"""
+
+
+def _pages():
+    return {LISTING_URL: LISTING_HTML, WEEK_URL: WEEK_HTML}
+
+
+def test_resolve_menu_for_today_fetches_each_page_once(
+    menu_module, checker, serve_pages
+):
+    get = serve_pages(_pages())
+
+    with patch(f"{menu_module.__name__}.datetime") as mock_datetime:
+        mock_datetime.now.return_value = datetime(2024, 12, 18, 12, 0, 0)
+        mock_datetime.side_effect = lambda *args, **kwargs: datetime(*args, **kwargs)
+
+        result = checker.resolve_menu()
+
+    assert [call.args[0] for call in get.call_args_list] == [LISTING_URL, WEEK_URL]
+    assert result["menu_info"]["url"] == WEEK_URL
+    assert "🥗 MALICA: ajdov kruh | sir" in result["menu"]
+    assert "🍝 KOSILO: pica" in result["menu"]
+
+
+def test_resolve_menu_for_date_fetches_each_page_once(
+    menu_module, checker, serve_pages
+):
+    get = serve_pages(_pages())
+
+    result = checker.resolve_menu(datetime(2024, 12, 16))
+
+    assert get.call_count == 2
+    assert result["menu_info"]["text"] == "Jedilnik 16.12.–20.12. 2024"
+    assert "KOSILO: golaž" in result["menu"]
+
+
+def test_resolve_menu_without_matching_week(menu_module, checker, serve_pages):
+    get = serve_pages(_pages())
+
+    result = checker.resolve_menu(datetime(2025, 3, 3))
+
+    assert get.call_count == 1
+    assert result["menu_info"] is None
+    assert result["menu"].startswith("❌ Ne morem najti jedilnika za 03.03.2025")
+
+
+def test_extract_date_range(menu_module):
+    title = "Jedilnik 16.12.–20.12. 2024"
+    assert menu_module.extract_date_range(title) == "16.12.–20.12. 2024"
+    assert menu_module.extract_date_range("Jedilnik") is None
@@ -0,0 +1,177 @@
+"""
+Tests for the dish search index and /api/search.
+"""
+
+from datetime import datetime
+
+import pytest
+
+import app
+from menu_archive import MenuArchive
+from menu_search import MenuSearchIndex, fold, tokenize
+from school_lunch_checker import DayMenu, WeekMenu
+
+DAYS = [
+    (
+        "2024-12-16",
+        "PON",
+        {
+            "MALICA": ["Črna žemlja, čaj"],
+            "KOSILO": ["Goveji golaž, polenta"],
+            "POP. MALICA": [],
+        },
+    ),
+    (
+        "2024-12-18",
+        "SRE",
+        {
+            "MALICA": ["ajdov kruh"],
+            "KOSILO": ["Pica s šunko in sirom"],
+            "POP. MALICA": ["jogurt"],
+        },
+    ),
+    (
+        "2024-12-20",
+        "PET",
+        {
+            "MALICA": ["sadni   jogurt"],
+            "KOSILO": ["čevapčiči, ajvar"],
+            "POP. MALICA": [],
+        },
+    ),
+]
+
+
+@pytest.fixture
+def index():
+    index = MenuSearchIndex()
+    index.build(DAYS)
+    return index
+
+
+def test_fold_handles_slovene_diacritics_case_and_whitespace():
+    assert fold("  ČEVAPČIČI  s   Šunko ŽGANCI ") == "cevapcici s sunko zganci"
+    assert fold("Đuveč") == "duvec"
+    assert tokenize("Pica s šunko, sir") == ["pica", "s", "sunko", "sir"]
+
+
+def test_search_folds_query_and_dishes(index):
+    results = index.search("CEVAPCICI")
+
+    assert results == [
+        {
+            "date": "2024-12-20",
+            "label": "PET",
+            "section": "KOSILO",
+            "dish": "čevapčiči, ajvar",
+        }
+    ]
+
+
+def test_query_words_match_as_prefixes_and_all_must_occur(index):
+    assert [r["date"] for r in index.search("jog")] == ["2024-12-18", "2024-12-20"]
+    assert [r["date"] for r in index.search("sadni jogurt")] == ["2024-12-20"]
+    assert index.search("pica golaž") == []
+    assert index.search("  ") == []
+
+
+def test_since_and_limit(index):
+    assert [r["date"] for r in index.search("jogurt", since="2024-12-19")] == [
+        "2024-12-20"
+    ]
+    assert len(index.search("jogurt", limit=1)) == 1
+    assert len(index.search("jogurt", limit=None)) == 2
+    with pytest.raises(ValueError):
+        index.search("jogurt", limit=0)
+
+
+def test_refresh_rebuilds_only_when_archive_changes(tmp_path):
+    archive = MenuArchive(str(tmp_path / "menus.sqlite3"))
+    index = MenuSearchIndex()
+    menu_info = {
+        "url": "https://example/w1",
+        "text": "Jedilnik 16.12.–20.12. 2024",
+        "start_date": datetime(2024, 12, 16),
+        "end_date": datetime(2024, 12, 20),
+    }
+    week = WeekMenu(
+        url=menu_info["url"],
+        content_hash="a",
+        days={2: DayMenu(2, "SRE", {"KOSILO": ["pica"]})},
+    )
+
+    assert index.refresh(archive)
+    assert len(index) == 0
+    archive.record_week(week, menu_info)
+
+    assert index.refresh(archive)
+    assert index.search("pica")[0]["date"] == "2024-12-18"
+    assert not index.refresh(archive)
+    archive.close()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    archive = MenuArchive(str(tmp_path / "menus.sqlite3"))
+    for date, label, sections in DAYS + [
+        ("2099-01-07", "SRE", {"KOSILO": ["pica margerita"]})
+    ]:
+        start = datetime.strptime(date, "%Y-%m-%d")
+        week = WeekMenu(
+            url=f"https://example/{date}",
+            content_hash=date,
+            days={start.weekday(): DayMenu(start.weekday(), label, sections)},
+        )
+        archive.record_week(
+            week,
+            {"url": week.url, "text": label, "start_date": start, "end_date": start},
+        )
+    monkeypatch.setattr(app, "menu_archive", archive)
+    monkeypatch.setattr(app, "menu_search", MenuSearchIndex())
+    yield app.app.test_client()
+    archive.close()
+
+
+def test_search_endpoint_returns_matches_and_next_serving(client):
+    response = client.get("/api/search?q=PICA")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["count"] == 2
+    assert [r["date"] for r in data["results"]] == ["2024-12-18", "2099-01-07"]
+    assert data["next"]["date"] == "2099-01-07"
+
+    data = client.get("/api/search?q=pica&from=2025-01-01").get_json()
+    assert [r["date"] for r in data["results"]] == ["2099-01-07"]
+
+
+def test_search_endpoint_caps_the_limit(client, monkeypatch):
+    monkeypatch.setattr(app, "MAX_SEARCH_LIMIT", 1)
+
+    assert client.get("/api/search?q=pica&limit=1000").get_json()["count"] == 1
+
+
+def test_search_endpoint_never_goes_upstream(client, monkeypatch):
+    monkeypatch.setattr(app, "LunchMenuChecker", None)
+
+    assert client.get("/api/search?q=golaz").get_json()["count"] == 1
+
+
+def test_search_endpoint_rejects_bad_requests(client, monkeypatch):
+    assert client.get("/api/search").status_code == 400
+    assert client.get("/api/search?q=pica&from=yesterday").status_code == 400
+    for limit in ("0", "-1", "many", "1.5"):
+        assert client.get(f"/api/search?q=pica&limit={limit}").status_code == 400
+    monkeypatch.setattr(app, "menu_archive", None)
+    assert client.get("/api/search?q=pica").status_code == 503
+
+
+def test_next_serving_starts_from_the_ljubljana_day(client, monkeypatch):
+    # 23:30 UTC on 2024-12-17 is already the 18th in Ljubljana
+    monkeypatch.setattr(app, "menu_now", lambda: datetime(2024, 12, 18, 0, 30))
+
+    assert client.get("/api/search?q=pica").get_json()["next"]["date"] == "2024-12-18"
+
+    monkeypatch.setattr(app, "menu_now", lambda: datetime(2024, 12, 19, 0, 30))
+
+    assert client.get("/api/search?q=pica").get_json()["next"]["date"] == "2099-01-07"
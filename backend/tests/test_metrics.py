@@ -0,0 +1,146 @@
+"""
+Tests for the stage timers, counters and their /metrics and log exports.
+"""
+
+import importlib
+import json
+from datetime import datetime
+from unittest.mock import Mock
+
+from tests.conftest import mock_response
+from tests.test_menu_resolution import WEEK_URL, _pages
+
+TARGET_DATE = datetime(2024, 12, 18)
+
+
+def test_timer_and_counters_accumulate(menu_module):
+    metrics = menu_module.Metrics()
+
+    with metrics.timer("week_fetch"):
+        pass
+    metrics.observe("week_fetch", 0.5)
+    metrics.inc("lunch_cache_requests_total", cache="week", result="hit")
+    metrics.inc("lunch_cache_requests_total", cache="week", result="hit")
+
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["week_fetch"]["count"] == 2
+    assert snapshot["stages"]["week_fetch"]["seconds"] >= 0.5
+    assert snapshot["counters"] == {
+        'lunch_cache_requests_total{cache="week",result="hit"}': 2
+    }
+
+
+def test_snapshot_can_reset_the_totals(menu_module):
+    metrics = menu_module.Metrics()
+    metrics.inc("lunch_fallback_parser_total")
+
+    assert metrics.snapshot(reset=True)["counters"] == {
+        "lunch_fallback_parser_total": 1
+    }
+    assert metrics.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_renders_prometheus_text_format(menu_module):
+    metrics = menu_module.Metrics()
+    metrics.observe("listing_parse", 0.25)
+    metrics.inc("lunch_upstream_errors_total", cache='say "hi"')
+
+    text = metrics.render_prometheus()
+
+    assert "# TYPE lunch_stage_seconds summary" in text
+    assert 'lunch_stage_seconds_sum{stage="listing_parse"} 0.250000' in text
+    assert 'lunch_stage_seconds_count{stage="listing_parse"} 1' in text
+    assert "# TYPE lunch_upstream_errors_total counter" in text
+    assert 'lunch_upstream_errors_total{cache="say \\"hi\\""} 1' in text
+    assert text.endswith("\n")
+
+
+def test_resolve_menu_times_every_stage(menu_module, checker, serve_pages):
+    serve_pages(_pages())
+
+    checker.resolve_menu(TARGET_DATE)
+    checker.resolve_menu(TARGET_DATE)
+
+    snapshot = menu_module.metrics.snapshot()
+    assert set(snapshot["stages"]) == {
+        "resolve",
+        "listing_fetch",
+        "listing_parse",
+        "week_fetch",
+        "week_parse",
+        "week_soup",
+        "week_table",
+        "allergens",
+        "format",
+    }
+    assert snapshot["stages"]["resolve"]["count"] == 2
+    assert snapshot["stages"]["week_parse"]["count"] == 1
+    assert snapshot["counters"] == {
+        'lunch_cache_requests_total{cache="listing",result="hit"}': 1,
+        'lunch_cache_requests_total{cache="listing",result="miss"}': 1,
+        'lunch_cache_requests_total{cache="week",result="hit"}': 1,
+        'lunch_cache_requests_total{cache="week",result="miss"}': 1,
+    }
+
+
+def test_counts_revalidations_and_upstream_errors(menu_module, checker):
+    checker.session.get = Mock(return_value=mock_response(_pages()[WEEK_URL]))
+    checker.get_week_menu(WEEK_URL)
+    checker.get_week_menu(WEEK_URL, revalidate=True)
+
+    checker.session.get = Mock(side_effect=RuntimeError("connection reset"))
+    result = checker.resolve_menu(TARGET_DATE)
+
+    counters = menu_module.metrics.snapshot()["counters"]
+    assert result["error"] == "connection reset"
+    assert (
+        counters['lunch_cache_requests_total{cache="week",result="revalidated"}'] == 1
+    )
+    assert counters['lunch_upstream_errors_total{cache="listing"}'] == 1
+
+
+def test_counts_fallback_parser_use(menu_module, checker, serve_pages):
+    serve_pages(_pages())
+
+    # Thursday has no row in the menu table
+    checker.resolve_menu(datetime(2024, 12, 19))
+
+    snapshot = menu_module.metrics.snapshot()
+    assert snapshot["counters"]["lunch_fallback_parser_total"] == 1
+    assert snapshot["stages"]["fallback_parse"]["count"] == 1
+
+
+def test_flask_exposes_metrics():
+    import app
+
+    app.metrics.observe("api_menu", 0.1)
+    response = app.app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'lunch_stage_seconds_count{stage="api_menu"} 1' in response.get_data(
+        as_text=True
+    )
+
+
+def test_netlify_logs_metrics_as_json(monkeypatch, capsys):
+    function = importlib.import_module("netlify.functions.menu")
+    checker = Mock()
+    checker.resolve_menu.return_value = {
+        "menu_info": None,
+        "menu": "pica",
+        "error": None,
+    }
+    monkeypatch.setattr(function, "_checker", checker)
+    monkeypatch.setattr(
+        function, "_warm_response", {"day": None, "stored_at": 0.0, "data": None}
+    )
+    function.metrics.inc("lunch_archive_hits_total")
+
+    function.handler({"httpMethod": "GET", "headers": {}}, None)
+
+    record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert record["event"] == "menu_metrics"
+    assert record["status"] == 200
+    assert record["counters"] == {"lunch_archive_hits_total": 1}
+    assert function.metrics.snapshot()["counters"] == {}
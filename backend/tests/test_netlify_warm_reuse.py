@@ -0,0 +1,72 @@
+"""
+Tests for reusing state across warm invocations of the Netlify function.
+"""
+
+import importlib
+from unittest.mock import Mock
+
+import pytest
+
+import school_lunch_checker
+
+EVENT = {"httpMethod": "GET", "headers": {}}
+
+
+@pytest.fixture
+def function(monkeypatch):
+    function = importlib.import_module("netlify.functions.menu")
+    checker = Mock()
+    checker.resolve_menu.return_value = {
+        "menu_info": {
+            "url": "https://ostrbovlje.si/jedilnik/",
+            "text": "Jedilnik 16.12.–20.12. 2024",
+        },
+        "menu": "pica",
+        "error": None,
+    }
+    monkeypatch.setattr(function, "_checker", checker)
+    monkeypatch.setattr(
+        function, "_warm_response", {"day": None, "stored_at": 0.0, "data": None}
+    )
+    return function
+
+
+def test_warm_invocation_skips_resolution(function):
+    function.handler(EVENT, None)
+    second = function.handler(EVENT, None)
+
+    assert function._checker.resolve_menu.call_count == 1
+    assert second["statusCode"] == 200
+    assert '"menu": "pica"' in second["body"]
+
+
+def test_expired_response_is_resolved_again(function):
+    function.handler(EVENT, None)
+    function._warm_response["stored_at"] -= function.RESPONSE_TTL + 1
+
+    function.handler(EVENT, None)
+
+    assert function._checker.resolve_menu.call_count == 2
+
+
+def test_failed_resolution_is_not_reused(function):
+    function._checker.resolve_menu.return_value = dict(
+        function._checker.resolve_menu.return_value, error="timed out"
+    )
+
+    function.handler(EVENT, None)
+    function.handler(EVENT, None)
+
+    assert function._checker.resolve_menu.call_count == 2
+
+
+def test_checkers_share_one_session(monkeypatch):
+    monkeypatch.setattr(school_lunch_checker, "_shared_session", None)
+
+    first = school_lunch_checker.LunchMenuChecker()
+    second = school_lunch_checker.LunchMenuChecker()
+
+    assert first.session is second.session
+    monkeypatch.setattr(school_lunch_checker, "_shared_session_created", 0.0)
+    monkeypatch.setattr(school_lunch_checker, "SESSION_TTL", 0)
+    assert school_lunch_checker.LunchMenuChecker().session is not first.session
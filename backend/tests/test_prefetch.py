@@ -0,0 +1,87 @@
+"""
+Tests for warming the menu caches ahead of user requests.
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+
+import app
+
+LISTING_URL = "https://ostrbovlje.si/prehrana/"
+CURRENT_URL = "https://ostrbovlje.si/jedilnik-16-12-20-12-2024/"
+NEXT_URL = "https://ostrbovlje.si/jedilnik-23-12-27-12-2024/"
+
+LISTING_HTML = """
+<a href="/jedilnik-23-12-27-12-2024/">Jedilnik 23.12.–27.12. 2024</a>
+<a href="/jedilnik-16-12-20-12-2024/">Jedilnik 16.12.–20.12. 2024</a>
+<a href="/jedilnik-9-12-13-12-2024/">Jedilnik 9.12.–13.12. 2024</a>
+"""
+
+WEEK_HTML = "<table><tr><td>PET</td><td>kruh</td><td>pica</td><td>sok</td></tr></table>"
+
+
+def test_friday_prefetch_warms_current_and_next_week(menu_module, checker, serve_pages):
+    get = serve_pages(
+        {LISTING_URL: LISTING_HTML, CURRENT_URL: WEEK_HTML, NEXT_URL: WEEK_HTML}
+    )
+
+    with patch(f"{menu_module.__name__}.datetime") as mock_datetime:
+        mock_datetime.now.return_value = datetime(2024, 12, 20, 15, 0, 0)
+        mock_datetime.side_effect = lambda *args, **kwargs: datetime(*args, **kwargs)
+
+        warmed = checker.prefetch()
+        get.reset_mock()
+        result = checker.resolve_menu()
+
+    assert warmed == [CURRENT_URL, NEXT_URL]
+    get.assert_not_called()
+    assert "PET, 20.12" in result["menu"]
+
+
+def test_parse_prefetch_times():
+    schedule = app.parse_prefetch_times("06:30, fri 15:00")
+
+    assert schedule == [((0, 1, 2, 3, 4), 6, 30), ((4,), 15, 0)]
+
+
+def test_next_prefetch_time():
+    schedule = app.parse_prefetch_times("06:30,fri 15:00")
+
+    # Friday lunchtime -> the Friday afternoon run
+    assert app.next_prefetch_time(schedule, datetime(2024, 12, 20, 12, 0)) == datetime(
+        2024, 12, 20, 15, 0
+    )
+    # Friday evening -> skip the weekend to Monday morning
+    assert app.next_prefetch_time(schedule, datetime(2024, 12, 20, 18, 0)) == datetime(
+        2024, 12, 23, 6, 30
+    )
+
+
+def test_schedule_is_in_ljubljana_time():
+    scheduler = app.PrefetchScheduler(app.parse_prefetch_times("fri 15:00"))
+
+    # 10:30 UTC on Friday is 11:30 in Ljubljana (CET)
+    now = datetime(2024, 12, 20, 10, 30, tzinfo=timezone.utc)
+    assert scheduler.seconds_until_next(now) == 3.5 * 3600
+    # Across the switch to summer time on Sunday 30 March 2025
+    now = datetime(2025, 3, 28, 14, 0, tzinfo=timezone.utc)
+    assert scheduler.seconds_until_next(now) == (7 * 24 - 1) * 3600
+
+
+def test_only_one_process_prefetches(tmp_path, monkeypatch):
+    lock_path = str(tmp_path / "prefetch.lock")
+    owner = app.PrefetchScheduler([], lock_path)
+    other = app.PrefetchScheduler([], lock_path)
+    prefetch = Mock(return_value=[])
+    monkeypatch.setattr(app, "schools_file", None)
+    monkeypatch.setattr(app.LunchMenuChecker, "prefetch", prefetch)
+
+    owner.run_once()
+    other.run_once()
+    assert prefetch.call_count == 1
+
+    # The owner exits; the other process takes over at its next run
+    owner.release()
+    other.run_once()
+    assert prefetch.call_count == 2
+    other.release()
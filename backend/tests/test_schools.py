@@ -0,0 +1,206 @@
+"""
+Tests for the multi-school registry and per-host sessions.
+"""
+
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+import app
+import school_lunch_checker
+from benchmarks.fake_upstream import FakeUpstream
+from schools import School, SchoolRegistry, load_registry, prefetch_all, resolve_all
+
+TEST_DATE = datetime(2026, 1, 14)
+
+
+def test_school_defaults():
+    school = School(id="os-a", name="OŠ A", base_url="https://a.example/")
+
+    assert school.menu_url == "https://a.example/prehrana/"
+    assert school.namespace == "os-a"
+    assert school.profile == "wordpress-jedilnik"
+    with pytest.raises(ValueError):
+        School(id="os-b", name="OŠ B", base_url="https://b.example", profile="drupal")
+
+
+def test_registry_file(tmp_path):
+    path = tmp_path / "schools.json"
+    path.write_text(
+        json.dumps(
+            {
+                "default": "os-b",
+                "schools": [
+                    {"id": "os-a", "name": "OŠ A", "base_url": "https://a.example"},
+                    {
+                        "id": "os-b",
+                        "name": "OŠ B",
+                        "base_url": "https://b.example",
+                        "menu_url": "https://b.example/jedilnik/",
+                        "namespace": "b",
+                    },
+                ],
+            }
+        )
+    )
+
+    registry = load_registry(str(path))
+
+    assert [school.id for school in registry] == ["os-a", "os-b"]
+    assert registry.get().id == "os-b"
+    assert registry.get("os-b").menu_url == "https://b.example/jedilnik/"
+    with pytest.raises(KeyError):
+        registry.get("os-c")
+
+
+def test_registry_rejects_duplicates():
+    school = School(id="os-a", name="OŠ A", base_url="https://a.example")
+
+    with pytest.raises(ValueError):
+        SchoolRegistry([school, school])
+
+
+def test_without_a_file_the_checker_urls_are_served(monkeypatch):
+    monkeypatch.delenv("LUNCH_SCHOOLS_FILE", raising=False)
+
+    school = load_registry().get()
+
+    assert school.menu_url == school_lunch_checker.MENU_URL
+    assert school.namespace == ""
+
+
+def test_each_host_gets_its_own_bounded_session():
+    first = school_lunch_checker.shared_session("https://a.example")
+
+    assert school_lunch_checker.shared_session("https://a.example/prehrana/") is first
+    assert school_lunch_checker.shared_session("https://b.example") is not first
+    assert school_lunch_checker.shared_session() is school_lunch_checker.shared_session(
+        school_lunch_checker.BASE_URL
+    )
+    adapter = first.get_adapter("https://a.example")
+    assert adapter._pool_maxsize == school_lunch_checker.HOST_POOL_SIZE
+    assert adapter._pool_block
+
+
+def test_checker_uses_school_profile_and_namespace(monkeypatch):
+    monkeypatch.setitem(
+        school_lunch_checker.PARSER_PROFILES,
+        "lunch-only",
+        {
+            "link_keyword": "meni",
+            "sections": ("KOSILO",),
+        },
+    )
+    school = School(
+        id="os-c", name="OŠ C", base_url="https://c.example", profile="lunch-only"
+    )
+    checker = school.checker()
+
+    all_menus, links = checker._parse_menu_links(
+        b'<a href="/m1">Meni 12.1.\xe2\x80\x9316.1. 2026</a><a href="/j">Jedilnik</a>'
+    )
+    week = checker._parse_week_menu(
+        "https://c.example/m1", b"<table><tr><td>PON</td><td>pica</td></tr></table>"
+    )
+
+    assert [link["url"] for link in links] == ["https://c.example/m1"]
+    assert week.day(0).sections == {"KOSILO": ["pica"]}
+    assert checker.namespace == "os-c"
+
+
+@pytest.fixture
+def upstreams():
+    servers = [FakeUpstream(latency=0.2).start() for _ in range(3)]
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def registry(upstreams):
+    return SchoolRegistry(
+        [
+            School(id=f"os-{i}", name=f"OŠ {i}", base_url=upstream.url)
+            for i, upstream in enumerate(upstreams)
+        ]
+    )
+
+
+def test_schools_are_resolved_concurrently(registry, upstreams):
+    started = time.perf_counter()
+    resolutions = resolve_all(registry, TEST_DATE)
+    elapsed = time.perf_counter() - started
+
+    assert sorted(resolutions) == ["os-0", "os-1", "os-2"]
+    for school_id, resolution in resolutions.items():
+        assert resolution["error"] is None
+        assert resolution["menu_info"]["url"].startswith(
+            registry.get(school_id).base_url
+        )
+        assert "KOSILO" in resolution["menu"]
+    # Each school costs a listing and a week fetch (2 x 0.2s); serially 1.2s
+    assert elapsed < 1.0
+    assert [upstream.requests for upstream in upstreams] == [2, 2, 2]
+
+
+def test_schools_sharing_urls_keep_separate_cache_entries(upstreams):
+    url = upstreams[0].url
+    registry = SchoolRegistry(
+        [
+            School(id="os-a", name="OŠ A", base_url=url),
+            School(id="os-b", name="OŠ B", base_url=url),
+        ]
+    )
+
+    resolve_all(registry, TEST_DATE)
+
+    assert upstreams[0].hits["/prehrana/"] == 2
+    assert f"os-a:{url}/prehrana/" in school_lunch_checker.listing_cache._entries
+
+
+def test_prefetch_all_reports_failures_per_school(registry, upstreams):
+    upstreams[1].pages.clear()
+
+    warmed = prefetch_all(registry)
+
+    assert warmed["os-0"] and warmed["os-2"]
+    assert isinstance(warmed["os-1"], str)
+
+
+@pytest.fixture
+def client(registry, monkeypatch):
+    monkeypatch.setattr(app, "schools_file", "schools.json")
+    monkeypatch.setattr(app, "school_registry", registry)
+    monkeypatch.setattr(app, "SERVE_MODE", "direct")
+    return app.app.test_client()
+
+
+def test_menu_endpoint_selects_school(client, upstreams):
+    response = client.get("/api/menu?school=os-2&test_date=2026-01-14")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["school"] == "os-2"
+    assert data["source_url"].startswith(upstreams[2].url)
+    assert client.get("/api/menu?school=os-9").status_code == 404
+    assert client.get("/api/menu?test_date=2026-01-14").get_json()["school"] == "os-0"
+
+
+def test_schools_and_all_menus_endpoints(client):
+    schools = client.get("/api/schools").get_json()
+    assert schools["default"] == "os-0"
+    assert [school["id"] for school in schools["schools"]] == ["os-0", "os-1", "os-2"]
+
+    menus = client.get("/api/menus?test_date=2026-01-14").get_json()
+    assert menus["success"]
+    assert sorted(menus["menus"]) == ["os-0", "os-1", "os-2"]
+    assert all("KOSILO" in menu["menu"] for menu in menus["menus"].values())
+
+
+def test_all_menus_rejects_an_invalid_date(client):
+    response = client.get("/api/menus?test_date=2026-13-45")
+
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
@@ -0,0 +1,182 @@
+"""
+Tests for sharing parsed pages between worker processes.
+"""
+
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+from benchmarks.corpus import LISTING_PATH
+from benchmarks.fake_upstream import FakeUpstream
+from cache_backends import FileCacheBackend, private_temp_dir
+from tests.test_menu_resolution import WEEK_URL, _pages
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_DATE = datetime(2024, 12, 18)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FileCacheBackend(str(tmp_path / "shared"))
+
+
+def test_file_backend_round_trips_documents(store):
+    store.set("week:a", {"menu": "pica", "n": 1})
+
+    assert store.get("week:a") == {"menu": "pica", "n": 1}
+    assert store.get("week:b") is None
+
+    store.delete("week:a")
+    assert store.get("week:a") is None
+
+
+def test_file_backend_ignores_corrupt_documents(store):
+    store.set("week:a", {"menu": "pica"})
+    with open(store._path("week:a"), "w") as f:
+        f.write('{"menu": ')
+
+    assert store.get("week:a") is None
+
+
+def test_file_backend_lock_is_exclusive(store):
+    inside = []
+
+    def worker():
+        with store.lock("week:a"):
+            inside.append(1)
+            assert len(inside) == 1
+            inside.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_parsed_pages_survive_json_encoding(menu_module, checker):
+    pages = _pages()
+    listing = checker._parse_menu_links(pages[checker.menu_url])
+    week = checker._parse_week_menu(WEEK_URL, pages[WEEK_URL].encode())
+
+    assert menu_module._decode_listing(menu_module._encode_listing(listing)) == listing
+    assert menu_module._decode_week(menu_module._encode_week(week)) == week
+
+
+def _worker_caches(menu_module, store):
+    """Fresh page caches, as another worker process would have, on store"""
+    listing = menu_module.PageCache(
+        60, "listing", menu_module._encode_listing, menu_module._decode_listing
+    )
+    week = menu_module.PageCache(
+        60, "week", menu_module._encode_week, menu_module._decode_week
+    )
+    listing.shared = week.shared = store
+    return listing, week
+
+
+def test_second_worker_reuses_the_first_workers_pages(
+    menu_module, checker, serve_pages, store
+):
+    get = serve_pages(_pages())
+    checker.listing_cache, checker.week_cache = _worker_caches(menu_module, store)
+    first = checker.resolve_menu(TARGET_DATE)
+
+    checker.listing_cache, checker.week_cache = _worker_caches(menu_module, store)
+    checker.session.get = Mock(side_effect=AssertionError("went upstream"))
+    second = checker.resolve_menu(TARGET_DATE)
+
+    assert get.call_count == 2
+    assert second == first
+
+
+def test_expired_shared_page_is_revalidated(menu_module, checker, serve_pages, store):
+    get = serve_pages(_pages())
+    checker.listing_cache, checker.week_cache = _worker_caches(menu_module, store)
+    checker.resolve_menu(TARGET_DATE)
+
+    checker.listing_cache, checker.week_cache = _worker_caches(menu_module, store)
+    checker.listing_cache.ttl = 0
+    checker.resolve_menu(TARGET_DATE)
+
+    assert get.call_count == 3
+
+
+WORKER_SCRIPT = """
+import sys
+from datetime import datetime
+import school_lunch_checker
+from cache_backends import FileCacheBackend
+
+school_lunch_checker.configure_shared_cache(FileCacheBackend(sys.argv[1]))
+checker = school_lunch_checker.LunchMenuChecker(base_url=sys.argv[2])
+result = checker.resolve_menu(datetime(2026, 1, 14))
+sys.exit(0 if result['error'] is None and 'SRE, 14.01' in result['menu'] else 1)
+"""
+
+
+def test_worker_processes_fetch_each_page_once(tmp_path):
+    with FakeUpstream(latency=0.3) as upstream:
+        workers = [
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-c",
+                    WORKER_SCRIPT,
+                    str(tmp_path / "shared"),
+                    upstream.url,
+                ],
+                cwd=BACKEND_ROOT,
+                stdout=subprocess.DEVNULL,
+            )
+            for _ in range(4)
+        ]
+        assert [worker.wait(30) for worker in workers] == [0, 0, 0, 0]
+
+    assert upstream.hits == {LISTING_PATH: 1, "/prehrana/jedilnik/jedilnik-431/": 1}
+
+
+def test_wsgi_entry_point_shares_the_page_caches(tmp_path):
+    env = dict(
+        os.environ,
+        LUNCH_SHARED_CACHE_DIR=str(tmp_path / "shared"),
+        LUNCH_MENU_ARCHIVE="",
+    )
+    script = (
+        "import wsgi, school_lunch_checker; "
+        "shared = school_lunch_checker.week_cache.shared; "
+        "print(wsgi.application.name, type(shared).__name__)"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=BACKEND_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert output.split() == ["app", "FileCacheBackend"]
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_default_cache_dir_is_private_to_the_user(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    path = private_temp_dir("school-lunch-cache")
+
+    assert path == str(tmp_path / f"school-lunch-cache-{os.getuid()}")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+    assert private_temp_dir("school-lunch-cache") == path
+    # A directory others may write to could hold planted documents
+    os.chmod(path, 0o777)
+    with pytest.raises(PermissionError):
+        private_temp_dir("school-lunch-cache")
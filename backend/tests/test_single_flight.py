@@ -0,0 +1,72 @@
+"""
+Tests for coalescing concurrent upstream fetches of the same page.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+
+from tests.conftest import mock_response
+
+WEEK_URL = "https://ostrbovlje.si/jedilnik-16-12-20-12-2024/"
+WEEK_HTML = (
+    "<table><tr><td>PON</td><td>kruh</td><td>golaž</td><td>sok</td></tr></table>"
+)
+CLIENTS = 8
+
+
+def _blocking_get(release, response_factory):
+    """A session.get that blocks until release is set"""
+
+    def get(url, **kwargs):
+        release.wait(5)
+        return response_factory()
+
+    return Mock(side_effect=get)
+
+
+def _run_concurrently(fn, release):
+    """Start CLIENTS calls of fn, releasing upstream once they are all queued"""
+    threading.Timer(0.2, release.set).start()
+    with ThreadPoolExecutor(max_workers=CLIENTS) as pool:
+        return [pool.submit(fn) for _ in range(CLIENTS)]
+
+
+def test_concurrent_misses_share_one_request(menu_module, checker):
+    release = threading.Event()
+    checker.session.get = _blocking_get(release, lambda: mock_response(WEEK_HTML))
+
+    futures = _run_concurrently(lambda: checker.get_week_menu(WEEK_URL), release)
+    weeks = [future.result(5) for future in futures]
+
+    assert checker.session.get.call_count == 1
+    assert all(week is weeks[0] for week in weeks)
+
+
+def test_concurrent_misses_share_the_error(menu_module, checker):
+    release = threading.Event()
+
+    def failing_response():
+        response = mock_response("", status_code=503)
+        response.raise_for_status = Mock(side_effect=RuntimeError("503 upstream"))
+        return response
+
+    checker.session.get = _blocking_get(release, failing_response)
+
+    futures = _run_concurrently(lambda: checker.get_week_menu(WEEK_URL), release)
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="503 upstream"):
+            future.result(5)
+    assert checker.session.get.call_count == 1
+
+
+def test_single_flight_runs_again_after_completion(menu_module):
+    flight = menu_module.SingleFlight()
+    fn = Mock(return_value="menu")
+
+    assert flight.do("key", fn) == "menu"
+    assert flight.do("key", fn) == "menu"
+    assert fn.call_count == 2
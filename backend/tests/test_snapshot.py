@@ -0,0 +1,75 @@
+"""
+Tests for pre-rendering /api/menu responses into static snapshot files.
+"""
+
+import json
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+import school_lunch_checker
+import snapshot
+from benchmarks.bench_menu import corpus_session
+from benchmarks.corpus import CorpusSession
+
+GENERATED_AT = datetime(2026, 1, 12, 5, 0)
+
+
+@pytest.fixture
+def snapshots():
+    checker = school_lunch_checker.LunchMenuChecker()
+    checker.session = CorpusSession()
+    return snapshot.render_snapshots(checker, GENERATED_AT)
+
+
+def test_renders_every_school_day_of_the_published_weeks(snapshots):
+    days = [datetime.strptime(key, "%Y-%m-%d") for key in snapshots]
+
+    assert len(snapshots) == 50
+    assert (min(snapshots), max(snapshots)) == ("2025-12-01", "2026-02-13")
+    assert all(day.weekday() < 5 for day in days)
+    assert all(
+        payload["fetched_at"] == GENERATED_AT.isoformat()
+        for payload in snapshots.values()
+    )
+
+
+def test_snapshot_matches_the_api_response(snapshots):
+    import app
+
+    with corpus_session():
+        api = app.app.test_client().get("/api/menu?test_date=2026-01-14").get_json()
+
+    volatile = ("fetched_at", "timestamp", "stale", "test_date", "snapshot_date")
+    rendered = snapshots["2026-01-14"]
+    assert rendered["snapshot_date"] == "2026-01-14"
+    assert {k: v for k, v in rendered.items() if k not in volatile} == {
+        k: v for k, v in api.items() if k not in volatile
+    }
+
+
+def test_writes_files_and_index_and_prunes_old_days(tmp_path, snapshots):
+    (tmp_path / "2025-11-03.json").write_text("{}")
+
+    pruned = snapshot.write_snapshots(
+        snapshots, str(tmp_path), keep_days=14, today=GENERATED_AT
+    )
+
+    assert pruned == ["2025-11-03.json"]
+    written = json.loads((tmp_path / "2026-01-14.json").read_text(encoding="utf-8"))
+    assert written == snapshots["2026-01-14"]
+    index = json.loads((tmp_path / "index.json").read_text())
+    # No menu is published for the holiday week of 29.12.
+    assert index["dates"][0] == "2026-01-05"
+    assert index["dates"][-1] == "2026-02-13"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_cli_leaves_snapshots_alone_when_nothing_renders(tmp_path, monkeypatch):
+    checker = Mock()
+    checker.menu_links.return_value = ([], [])
+    monkeypatch.setattr(snapshot, "LunchMenuChecker", Mock(return_value=checker))
+
+    assert snapshot.main(["--out", str(tmp_path)]) == 1
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,83 @@
+"""
+Tests for the stale-while-revalidate /api/menu serving mode.
+"""
+
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def swr_client(monkeypatch):
+    monkeypatch.setattr(app, "SERVE_MODE", "swr")
+    app.menu_responses.clear()
+    yield app.app.test_client()
+    app.menu_responses.clear()
+
+
+def _payload(menu):
+    return {
+        "success": True,
+        "menu": menu,
+        "fetched_at": "2024-12-18T07:00:00",
+        "test_date": None,
+    }
+
+
+def _expire():
+    for entry in app.menu_responses._entries.values():
+        entry["stored_at"] -= app.menu_responses.soft_ttl + 1
+
+
+def _wait_for_refresh():
+    for thread in threading.enumerate():
+        if thread.name == "menu-refresh":
+            thread.join(5)
+
+
+def test_fresh_payload_is_reused(swr_client, monkeypatch):
+    build = Mock(return_value=(_payload("pica"), None))
+    monkeypatch.setattr(app, "build_menu_payload", build)
+
+    first = swr_client.get("/api/menu").get_json()
+    second = swr_client.get("/api/menu").get_json()
+
+    assert build.call_count == 1
+    assert first["menu"] == second["menu"] == "pica"
+    assert second["stale"] is False
+    assert second["fetched_at"] == "2024-12-18T07:00:00"
+
+
+def test_stale_payload_is_served_while_refreshing(swr_client, monkeypatch):
+    build = Mock(return_value=(_payload("pica"), None))
+    monkeypatch.setattr(app, "build_menu_payload", build)
+    swr_client.get("/api/menu")
+    _expire()
+
+    build.return_value = (_payload("golaž"), None)
+    stale = swr_client.get("/api/menu").get_json()
+    _wait_for_refresh()
+    fresh = swr_client.get("/api/menu").get_json()
+
+    assert stale["menu"] == "pica"
+    assert stale["stale"] is True
+    assert fresh["menu"] == "golaž"
+    assert fresh["stale"] is False
+
+
+def test_failed_refresh_keeps_last_good_payload(swr_client, monkeypatch):
+    build = Mock(return_value=(_payload("pica"), None))
+    monkeypatch.setattr(app, "build_menu_payload", build)
+    swr_client.get("/api/menu")
+    _expire()
+
+    build.return_value = (_payload("Napaka pri pridobivanju jedilnika"), "timed out")
+    swr_client.get("/api/menu")
+    _wait_for_refresh()
+    response = swr_client.get("/api/menu").get_json()
+
+    assert response["menu"] == "pica"
+    assert response["stale"] is True
@@ -0,0 +1,221 @@
+"""
+Tests for the upstream fetch layer: rate limiting, retries and circuit breakers.
+"""
+
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from tests.conftest import mock_response
+
+LISTING_URL = "https://ostrbovlje.si/prehrana/"
+
+LISTING_HTML = """
+<a href="/jedilnik-16-12-20-12-2024/">Jedilnik 16.12.–20.12. 2024</a>
+"""
+
+TARGET_DATE = datetime(2024, 12, 18)
+
+
+def _failing(status_code, headers=None):
+    """A response whose raise_for_status raises like requests does"""
+    response = mock_response("", status_code=status_code, headers=headers)
+    response.raise_for_status = Mock(side_effect=requests.HTTPError(response=response))
+    return response
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+@pytest.fixture
+def fetcher(menu_module, checker, sleeps):
+    checker.upstream = menu_module.UpstreamFetcher(
+        rate=0,
+        retries=2,
+        backoff=0.1,
+        max_backoff=1,
+        breaker_failures=3,
+        breaker_reset=60,
+        sleep=sleeps.append,
+    )
+    return checker.upstream
+
+
+def test_transient_failures_are_retried(menu_module, checker, fetcher, sleeps):
+    checker.session.get = Mock(
+        side_effect=[
+            requests.ConnectionError("reset"),
+            _failing(503),
+            mock_response(LISTING_HTML),
+        ]
+    )
+
+    result = checker.get_current_week_menu_url_for_date(TARGET_DATE)
+
+    assert result["url"] == "https://ostrbovlje.si/jedilnik-16-12-20-12-2024/"
+    assert checker.session.get.call_count == 3
+    assert len(sleeps) == 2
+    assert all(0 <= delay <= 0.2 for delay in sleeps)
+    counters = menu_module.metrics.snapshot()["counters"]
+    assert counters['lunch_upstream_retries_total{host="ostrbovlje.si"}'] == 2
+
+
+def test_retries_give_up_after_the_limit(checker, fetcher):
+    checker.session.get = Mock(side_effect=requests.Timeout("slow"))
+
+    with pytest.raises(requests.Timeout):
+        fetcher.get(checker.session, LISTING_URL)
+    assert checker.session.get.call_count == 3
+
+
+def test_other_failures_are_not_retried(checker, fetcher):
+    checker.session.get = Mock(return_value=mock_response("", status_code=404))
+    assert fetcher.get(checker.session, LISTING_URL).status_code == 404
+
+    checker.session.get = Mock(side_effect=RuntimeError("bug"))
+    with pytest.raises(RuntimeError):
+        fetcher.get(checker.session, LISTING_URL)
+    assert checker.session.get.call_count == 1
+
+
+def test_retry_after_is_honoured(checker, fetcher, sleeps):
+    checker.session.get = Mock(
+        side_effect=[
+            _failing(429, headers={"Retry-After": "1"}),
+            mock_response("ok"),
+        ]
+    )
+
+    fetcher.get(checker.session, LISTING_URL)
+
+    assert sleeps == [1.0]
+
+
+def test_circuit_opens_and_fails_fast(menu_module, checker, fetcher):
+    checker.session.get = Mock(side_effect=requests.ConnectionError("down"))
+
+    with pytest.raises(requests.ConnectionError):
+        fetcher.get(checker.session, LISTING_URL, metrics=menu_module.metrics)
+    # The third failure opened the circuit; the next call never goes out
+    assert checker.session.get.call_count == 3
+    assert fetcher.is_open(LISTING_URL)
+    with pytest.raises(menu_module.CircuitOpenError):
+        fetcher.get(checker.session, LISTING_URL, metrics=menu_module.metrics)
+    assert checker.session.get.call_count == 3
+
+    counters = menu_module.metrics.snapshot()["counters"]
+    assert counters['lunch_circuit_opened_total{host="ostrbovlje.si"}'] == 1
+    assert counters['lunch_circuit_rejected_total{host="ostrbovlje.si"}'] == 1
+    # Another host is unaffected
+    checker.session.get = Mock(return_value=mock_response("ok"))
+    assert fetcher.get(checker.session, "https://example.si/").status_code == 200
+
+
+def test_half_open_circuit_lets_one_trial_through(menu_module):
+    now = [0.0]
+    breaker = menu_module.CircuitBreaker(2, 30, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] = 30.0
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    # A failed trial re-opens the circuit for another reset_timeout
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 60.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_open_circuit_serves_the_stale_cache_entry(menu_module, checker, fetcher):
+    checker.session.get = Mock(return_value=mock_response(LISTING_HTML))
+    expected = checker.get_current_week_menu_url_for_date(TARGET_DATE)
+    for entry in menu_module.listing_cache._entries.values():
+        entry["fetched_at"] -= menu_module.listing_cache.ttl + 1
+    for _ in range(3):
+        fetcher.breaker("ostrbovlje.si").record_failure()
+
+    assert checker.get_current_week_menu_url_for_date(TARGET_DATE) == expected
+    assert checker.session.get.call_count == 1
+    counters = menu_module.metrics.snapshot()["counters"]
+    assert counters['lunch_cache_requests_total{cache="listing",result="stale"}'] == 1
+
+
+def test_open_circuit_without_a_cache_entry_is_an_error(menu_module, checker, fetcher):
+    for _ in range(3):
+        fetcher.breaker("ostrbovlje.si").record_failure()
+
+    assert checker.get_current_week_menu_url_for_date(TARGET_DATE) is None
+    checker.session.get.assert_not_called()
+
+
+def test_circuit_state_is_exported_as_a_gauge(menu_module):
+    for _ in range(menu_module.upstream.breaker_failures):
+        menu_module.upstream.breaker("ostrbovlje.si").record_failure()
+    menu_module.upstream.breaker("example.si")
+
+    text = menu_module.metrics.render_prometheus()
+
+    assert "# TYPE lunch_circuit_state gauge" in text
+    assert 'lunch_circuit_state{host="ostrbovlje.si"} 2' in text
+    assert 'lunch_circuit_state{host="example.si"} 0' in text
+
+
+def test_server_errors_open_the_circuit_even_when_not_retried(
+    menu_module, checker, fetcher
+):
+    checker.session.get = Mock(return_value=mock_response("", status_code=500))
+
+    for _ in range(3):
+        assert fetcher.get(checker.session, LISTING_URL).status_code == 500
+    assert fetcher.is_open(LISTING_URL)
+
+    breaker = fetcher.breaker("example.si")
+    checker.session.get = Mock(return_value=mock_response("", status_code=404))
+    fetcher.get(checker.session, "https://example.si/")
+    assert breaker.state == "closed" and breaker._failed == 0
+
+
+def test_timeouts_are_retried_within_the_deadline(menu_module, checker):
+    now = [0.0]
+    timeouts = []
+
+    def advance(seconds):
+        now[0] += seconds
+
+    def slow_get(url, timeout, headers=None):
+        # A real timeout only arrives once the attempt's timeout has passed
+        timeouts.append(timeout)
+        advance(timeout)
+        raise requests.Timeout("slow")
+
+    fetcher = menu_module.UpstreamFetcher(
+        rate=0,
+        retries=2,
+        backoff=0.1,
+        max_backoff=1,
+        timeout=10,
+        deadline=25,
+        sleep=advance,
+        clock=lambda: now[0],
+    )
+    checker.session.get = Mock(side_effect=slow_get)
+
+    with pytest.raises(requests.Timeout):
+        fetcher.get(checker.session, LISTING_URL)
+
+    assert len(timeouts) == 3
+    assert timeouts[:2] == [10, 10]
+    # The last attempt only gets what is left of the deadline
+    assert 0 < timeouts[2] < 5
+    assert now[0] == pytest.approx(25)
@@ -0,0 +1,91 @@
+"""
+Tests for parsing weekly menu pages once into a WeekMenu.
+"""
+
+from datetime import datetime
+from unittest.mock import Mock
+
+from tests.conftest import mock_response
+
+WEEK_URL = "https://ostrbovlje.si/jedilnik-16-12-20-12-2024/"
+MENU_INFO = {"url": WEEK_URL, "text": "Jedilnik 16.12.–20.12. 2024"}
+
+WEEK_HTML = """
+<html>
+<body>
+    <table>
+        <tr><th></th><th>MALICA</th><th>KOSILO</th><th>POP. MALICA</th></tr>
+        <tr><td>PON</td><td>črna žemlja
+mleko</td><td>golaž</td><td>jabolko</td></tr>
+        <tr><td>TOR</td><td>sadni jogurt</td><td>pica</td><td>banana</td></tr>
+        <tr><td>SRE</td><td>ajdov kruh</td><td>ričet</td><td>jogurt</td></tr>
+        <tr><td>ČET</td><td>koruzni kruh</td><td>rižota</td><td>hruška</td></tr>
+        <tr><td>PET</td><td>sirova štručka</td><td>ribji file</td><td>sok</td></tr>
+    </table>
+    <p>Alergeni: G – gluten, L – laktoza</p>
+</body>
+</html>
+"""
+
+
+def test_week_menu_has_all_days(menu_module, checker):
+    checker.session.get = Mock(return_value=mock_response(WEEK_HTML))
+
+    week = checker.get_week_menu(WEEK_URL)
+
+    assert sorted(week.days) == [0, 1, 2, 3, 4]
+    assert week.day(0).sections["MALICA"] == ["črna žemlja", "mleko"]
+    assert week.day(3).label == "ČET"
+    assert week.day(4).sections["KOSILO"] == ["ribji file"]
+    assert week.day(5) is None
+    assert week.allergen_info == "G = gluten, L = laktoza"
+    assert week.content_hash == menu_module.content_hash(WEEK_HTML.encode())
+
+
+def test_other_days_are_in_memory_lookups(menu_module, checker):
+    checker.session.get = Mock(return_value=mock_response(WEEK_HTML))
+
+    monday = checker.get_lunch_menu_for_date(MENU_INFO, datetime(2024, 12, 16))
+    tuesday = checker.get_lunch_menu_for_date(MENU_INFO, datetime(2024, 12, 17))
+
+    assert checker.session.get.call_count == 1
+    assert "🥗 MALICA: črna žemlja | mleko" in monday
+    assert "TOR, 17.12" in tuesday
+    assert "🍝 KOSILO: pica" in tuesday
+    assert "📋 ALERGENI:\nG = gluten, L = laktoza" in tuesday
+
+
+def test_unchanged_body_is_not_reparsed(menu_module, checker, monkeypatch):
+    checker.session.get = Mock(return_value=mock_response(WEEK_HTML))
+    first = checker.get_week_menu(WEEK_URL)
+    for entry in menu_module.week_cache._entries.values():
+        entry["fetched_at"] -= menu_module.week_cache.ttl + 1
+
+    monkeypatch.setattr(checker, "_parse_week_menu", Mock(side_effect=AssertionError))
+
+    assert checker.get_week_menu(WEEK_URL) is first
+    assert checker.session.get.call_count == 2
+
+
+def test_day_missing_from_table_uses_text_fallback(menu_module, checker):
+    checker.session.get = Mock(return_value=mock_response(WEEK_HTML))
+
+    saturday = checker.get_lunch_menu_for_date(MENU_INFO, datetime(2024, 12, 21))
+
+    assert "sobota, 21.12.2024" in saturday
+    assert "SOB, 21.12\n🥗 MALICA: sirova" not in saturday
+
+
+def test_text_fallback_runs_once_per_page_version(menu_module, checker):
+    checker.session.get = Mock(return_value=mock_response(WEEK_HTML))
+
+    saturdays = [
+        checker.get_lunch_menu_for_date(MENU_INFO, datetime(2024, 12, 21))
+        for _ in range(5)
+    ]
+    sunday = checker.get_lunch_menu_for_date(MENU_INFO, datetime(2024, 12, 22))
+
+    assert len(set(saturdays)) == 1
+    assert "nedelja, 22.12.2024" in sunday
+    stages = menu_module.metrics.snapshot()["stages"]
+    assert stages["fallback_parse"]["count"] == 2
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Production entry point for the School Lunch Menu Web App
+
+Under gunicorn (several worker processes, each with a few threads):
+    cd backend && gunicorn -c gunicorn.conf.py wsgi:application
+
+Without gunicorn (e.g. on Windows) this file serves the app with a threaded
+WSGI server and no debugger:
+    cd backend && python wsgi.py
+
+Workers share parsed menus through LUNCH_CACHE_BACKEND (e.g. a redis:// URL
+when running several nodes) or, by default, a directory under the system temp
+dir that only the serving user can access (LUNCH_SHARED_CACHE_DIR).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cache_backends import private_temp_dir  # noqa: E402
+
+if not os.environ.get("LUNCH_CACHE_BACKEND") and not os.environ.get(
+    "LUNCH_SHARED_CACHE_DIR"
+):
+    os.environ["LUNCH_SHARED_CACHE_DIR"] = private_temp_dir("school-lunch-cache")
+
+from app import app as application  # noqa: E402
+
+
+def main():
+    from werkzeug.serving import run_simple
+
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = int(os.environ.get("PORT", "8080"))
+    print(f"🚀 Serving School Lunch Menu Web App on http://{host}:{port}")
+    run_simple(
+        host, port, application, threaded=True, use_debugger=False, use_reloader=False
+    )
+
+
+if __name__ == "__main__":
+    main()
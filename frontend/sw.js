@@ -1,5 +1,5 @@
 // Simplified Service Worker for PWA functionality
-const CACHE_NAME = 'school-lunch-v6';
+const CACHE_NAME = 'school-lunch-v7';
 const urlsToCache = [
   '/manifest.json',
   '/school-logo.png'
@@ -32,10 +32,11 @@ self.addEventListener('fetch', (event) => {
     return;
   }
   
-  // Don't cache API requests - always fetch fresh
+  // Don't keep API responses in the SW cache - let the HTTP cache apply the
+  // API's ETag / Cache-Control (the page picks the cache mode)
   if (url.pathname.startsWith('/api/')) {
     event.respondWith(
-      fetch(event.request, { cache: 'no-store' }).catch((error) => {
+      fetch(event.request).catch((error) => {
         console.log('API fetch failed:', error);
         return new Response(JSON.stringify({
           success: false,
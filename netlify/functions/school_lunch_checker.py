@@ -4,426 +4,1442 @@ School Lunch Menu Checker
 A simple automation to check today's lunch menu from Osnovna šola Trbovlje
 """
 
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from contextlib import ExitStack, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from urllib.parse import urlparse
+import base64
+import hashlib
+import json
+import os
+import random
 import re
 import sys
+import importlib
 import threading
+import time
+from zoneinfo import ZoneInfo
 
-# Import tkinter only when needed (for GUI mode)
-try:
-    import tkinter as tk
-    from tkinter import messagebox, scrolledtext
-    TKINTER_AVAILABLE = True
-except ImportError:
-    TKINTER_AVAILABLE = False
 
-class LunchMenuChecker:
+class _LazyModule:
+    """Module stand-in that imports the real module on first attribute access
+
+    requests and bs4 dominate this module's import time; deferring them keeps
+    cold starts of the Flask server, the Netlify function and the CLI fast.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+requests = _LazyModule('requests')
+bs4 = _LazyModule('bs4')
+
+# How long (seconds) a fetched /prehrana/ listing is served without asking the
+# school site again. After that it is revalidated with a conditional GET.
+LISTING_CACHE_TTL = int(os.environ.get('LUNCH_LISTING_CACHE_TTL', '900'))
+
+# Same for the weekly Jedilnik pages, which rarely change once published
+WEEK_CACHE_TTL = int(os.environ.get('LUNCH_WEEK_CACHE_TTL', '1800'))
+
+# Upstream HTTP connections (and their TLS sessions) are kept in one shared
+# requests.Session, recycled after this many seconds
+SESSION_TTL = int(os.environ.get('LUNCH_SESSION_TTL', '600'))
+# Seconds to wait on the school site for one attempt of a request, and for
+# all of its attempts (retries included) together
+UPSTREAM_TIMEOUT = float(os.environ.get('LUNCH_UPSTREAM_TIMEOUT', '10'))
+UPSTREAM_DEADLINE = float(os.environ.get('LUNCH_UPSTREAM_DEADLINE', '25'))
+# Connections kept (and allowed at once) per school host; further requests
+# to a busy host wait for one of them instead of opening more
+HOST_POOL_SIZE = int(os.environ.get('LUNCH_HOST_POOL_SIZE', '16'))
+
+# Fetch layer (see UpstreamFetcher): requests per second and burst allowed
+# per school host (0 disables the limit), retries of transient failures with
+# jittered exponential backoff, and the circuit breaker that fails fast after
+# consecutive failures until the host has had time to recover
+UPSTREAM_RATE = float(os.environ.get('LUNCH_UPSTREAM_RATE', '10'))
+UPSTREAM_BURST = int(os.environ.get('LUNCH_UPSTREAM_BURST', '20'))
+UPSTREAM_RETRIES = int(os.environ.get('LUNCH_UPSTREAM_RETRIES', '2'))
+RETRY_BACKOFF = float(os.environ.get('LUNCH_RETRY_BACKOFF', '0.25'))
+RETRY_MAX_BACKOFF = float(os.environ.get('LUNCH_RETRY_MAX_BACKOFF', '2'))
+BREAKER_FAILURES = int(os.environ.get('LUNCH_BREAKER_FAILURES', '5'))
+BREAKER_RESET = float(os.environ.get('LUNCH_BREAKER_RESET', '30'))
+# Responses worth retrying; anything else is the page's real answer
+TRANSIENT_STATUSES = (429, 502, 503, 504)
+# Responses that count against a host's circuit breaker even when not retried
+SERVER_ERROR_STATUSES = range(500, 600)
+
+# Where the menus are scraped from. Point these at a local stand-in
+# (benchmarks/fake_upstream.py) to load-test without touching the real site.
+BASE_URL = os.environ.get('LUNCH_BASE_URL', 'https://ostrbovlje.si').rstrip('/')
+MENU_URL = os.environ.get('LUNCH_MENU_URL') or BASE_URL + '/prehrana/'
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+)
+
+# Slovenian day names and the abbreviations used in the menu table, by weekday
+SLOVENIAN_DAYS = {
+    0: ['ponedeljek', 'pon'],  # Monday
+    1: ['torek', 'tor'],       # Tuesday
+    2: ['sreda', 'sre'],       # Wednesday
+    3: ['četrtek', 'čet'],     # Thursday
+    4: ['petek', 'pet'],       # Friday
+    5: ['sobota', 'sob'],      # Saturday
+    6: ['nedelja', 'ned']      # Sunday
+}
+
+MENU_SECTIONS = ('MALICA', 'KOSILO', 'POP. MALICA')
+
+# How to read a school's site: which listing links are menus and which menu
+# section each table column after the day label holds. Schools on the same
+# WordPress "Jedilnik" layout share a profile (see schools.py).
+PARSER_PROFILES = {
+    'wordpress-jedilnik': {
+        'link_keyword': 'jedilnik',
+        'sections': MENU_SECTIONS,
+    },
+}
+DEFAULT_PARSER_PROFILE = 'wordpress-jedilnik'
+
+# Allergen codes as printed after the dishes ("pica–G, L"), in bit order:
+# a dish's or day's allergens are stored as a bitmask of these
+ALLERGENS = {
+    'G': 'gluten',
+    'J': 'jajce',
+    'S': 'soja',
+    'L': 'laktoza',
+    'GS': 'gorčično seme',
+    'R': 'ribe',
+    'O': 'oreščki',
+    'SE': 'sezam',
+    'Z': 'zelena',
+    'ŽD': 'žveplov dioksid',
+    'RA': 'raki',
+    'M': 'mehkužci',
+    'V': 'volčji bob'
+}
+ALLERGEN_BITS = {code: 1 << bit for bit, code in enumerate(ALLERGENS)}
+
+# The allergen codes trailing a dish, e.g. "ribji file–R, G, J"
+DISH_ALLERGENS_RE = re.compile(r'[–-]\s*((?:[A-ZŽ]{1,2}\s*,\s*)*[A-ZŽ]{1,2})\s*$')
+
+# One scan of the page text finds the "Alergeni:" legend and, until then,
+# every allergen code candidate on the page. Codes are matched by their
+# letters rather than as an alternation (GS before G, ...) and checked
+# against ALLERGENS after; the leading character class lets the engine skip
+# to possible starts.
+_CODE_FIRST = ''.join(sorted({code[0] for code in ALLERGENS}))
+_CODE_SECOND = ''.join(sorted({code[1] for code in ALLERGENS if len(code) > 1}))
+ALLERGEN_TOKENS_RE = re.compile(
+    rf'(?=[Aa{_CODE_FIRST}])(?:(?P<legend>(?i:alergeni:))'
+    rf'|\b(?P<code>[{_CODE_FIRST}][{_CODE_SECOND}]?)(?=[–\-,\s]|$))'
+)
+# The legend alone, when the codes are already known from the dishes
+LEGEND_RE = re.compile(r'(?P<legend>alergeni:)', re.IGNORECASE)
+# The legend runs up to "Ta teden" or the end of the page
+LEGEND_END_RE = re.compile(r'(?=Ta teden|$)', re.IGNORECASE)
+# "G – gluten", "GS – gorčično seme", ...
+LEGEND_PAIR_RE = re.compile(r'([A-ZŽ]+)\s*[–-]\s*([^,]+)')
+
+# The school (and its menu day) runs on Slovenian time
+TIMEZONE = 'Europe/Ljubljana'
+
+# API payload fields that change per response rather than with the menu
+VOLATILE_PAYLOAD_FIELDS = ('timestamp', 'fetched_at', 'stale')
+
+
+def content_hash(content):
+    """Stable fingerprint of a fetched page body"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def allergen_mask(codes):
+    """Bitmask of allergen codes (an iterable or a "G,L" string)
+
+    Raises ValueError for unknown codes.
+    """
+    if isinstance(codes, str):
+        codes = codes.split(',')
+    mask = 0
+    for code in codes:
+        code = code.strip().upper()
+        if not code:
+            continue
+        if code not in ALLERGEN_BITS:
+            raise ValueError(f"Unknown allergen code: {code}")
+        mask |= ALLERGEN_BITS[code]
+    return mask
+
+
+def scan_allergens(text, codes=True):
+    """Return ``(legend_pairs, used_codes)`` from one pass over page text
+
+    The scan stops at the first "Alergeni:" legend that lists any pairs;
+    the page's codes are then not needed and ``used_codes`` is empty.
+    Without a legend ``used_codes`` holds every allergen code found on the
+    page. ``codes=False`` looks for the legend only.
+    """
+    used = set()
+    for match in (ALLERGEN_TOKENS_RE if codes else LEGEND_RE).finditer(text):
+        if match.lastgroup == 'legend':
+            pairs = _legend_pairs(text, match.end())
+            if pairs:
+                return pairs, []
+        elif match.group('code') in ALLERGENS:
+            used.add(match.group('code'))
+    return [], [code for code in ALLERGENS if code in used]
+
+
+def _legend_pairs(text, start):
+    """The ``(code, meaning)`` pairs of a legend starting at text[start]"""
+    if start >= len(text):
+        return []
+    end = LEGEND_END_RE.search(text, start + 1).start()
+    pairs = []
+    for code, meaning in LEGEND_PAIR_RE.findall(text[start:end].strip()):
+        code = code.strip()
+        meaning = meaning.strip()
+        if code and meaning:
+            pairs.append((code, meaning))
+    return pairs
+
+
+def format_allergens(pairs):
+    """"G = gluten, J = jajce, S = soja" lines of three pairs, or None"""
+    items = [f"{code} = {meaning}" for code, meaning in pairs]
+    if not items:
+        return None
+    return '\n'.join(', '.join(items[i:i + 3]) for i in range(0, len(items), 3))
+
+
+def allergen_codes(mask):
+    """The allergen codes set in a bitmask, in ALLERGENS order"""
+    return [code for code, bit in ALLERGEN_BITS.items() if mask & bit]
+
+
+def dish_allergens(dish):
+    """Bitmask of the allergen codes trailing a dish name (0 if none)"""
+    match = DISH_ALLERGENS_RE.search(dish)
+    if not match:
+        return 0
+    mask = 0
+    for code in match.group(1).split(','):
+        mask |= ALLERGEN_BITS.get(code.strip(), 0)
+    return mask
+
+
+@dataclass
+class DayMenu:
+    """One day's row of the weekly menu table
+
+    ``allergens`` holds a bitmask per dish, parallel to ``sections``; it is
+    derived from the dish names when not given.
+    """
+    weekday: int
+    label: str
+    sections: dict = field(default_factory=dict)
+    allergens: dict = None
+
+    def __post_init__(self):
+        if self.allergens is None:
+            self.allergens = {
+                section: [dish_allergens(dish) for dish in items]
+                for section, items in self.sections.items()
+            }
+
+    def has_items(self):
+        return any(self.sections.get(section) for section in MENU_SECTIONS)
+
+    @property
+    def allergen_mask(self):
+        """Every allergen served that day, as one bitmask"""
+        mask = 0
+        for masks in self.allergens.values():
+            for dish_mask in masks:
+                mask |= dish_mask
+        return mask
+
+
+@dataclass
+class WeekMenu:
+    """A weekly Jedilnik page parsed once into all of its day rows
+
+    ``content`` keeps the raw page so the text-based fallback parsers can still
+    run for layouts the table parser does not understand.
+    """
+    url: str
+    content_hash: str
+    days: dict = field(default_factory=dict)
+    allergen_info: str = None
+    content: bytes = b''
+
+    def day(self, weekday):
+        """Return the DayMenu for a weekday (0=Monday), or None"""
+        return self.days.get(weekday)
+
+
+def _encode_listing(data):
+    all_menus, fallback_links = data
+    return {
+        'all_menus': [
+            dict(menu, start_date=menu['start_date'].strftime('%Y-%m-%d'),
+                 end_date=menu['end_date'].strftime('%Y-%m-%d'))
+            for menu in all_menus
+        ],
+        'fallback_links': fallback_links,
+    }
+
+
+def _decode_listing(data):
+    all_menus = [
+        dict(menu, start_date=datetime(*map(int, menu['start_date'].split('-'))),
+             end_date=datetime(*map(int, menu['end_date'].split('-'))))
+        for menu in data['all_menus']
+    ]
+    return all_menus, data['fallback_links']
+
+
+def _encode_week(week):
+    return {
+        'url': week.url,
+        'content_hash': week.content_hash,
+        'days': {
+            str(weekday): {
+                'label': day.label,
+                'sections': day.sections,
+                'allergens': day.allergens,
+            }
+            for weekday, day in week.days.items()
+        },
+        'allergen_info': week.allergen_info,
+        'content': base64.b64encode(week.content).decode('ascii'),
+    }
+
+
+def _decode_week(data):
+    week = WeekMenu(
+        url=data['url'],
+        content_hash=data['content_hash'],
+        allergen_info=data['allergen_info'],
+        content=base64.b64decode(data['content']),
+    )
+    for weekday, day in data['days'].items():
+        week.days[int(weekday)] = DayMenu(
+            weekday=int(weekday), label=day['label'], sections=day['sections'],
+            allergens=day.get('allergens')
+        )
+    return week
+
+
+class PageCache:
+    """Process-wide TTL cache of parsed upstream pages
+
+    Each entry keeps the response validators (ETag / Last-Modified) next to the
+    parsed data, so an expired entry can be revalidated with a conditional GET:
+    an unchanged page then costs a 304 and no re-parse.
+
+    With a ``shared`` backend (see cache_backends) entries are also written
+    there, encoded as JSON with ``encode``/``decode``, so other workers and
+    nodes pick up pages one of them already fetched and parsed.
+    """
+
+    # Shared copies outlive the TTL so expired ones can still be revalidated
+    SHARED_ENTRY_TTL = 7 * 24 * 3600
+
+    def __init__(self, ttl, name='page', encode=None, decode=None):
+        self.ttl = ttl
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+        self.shared = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        """Return the cache entry for url, or None"""
+        with self._lock:
+            entry = self._entries.get(url)
+        if self.shared is not None and (entry is None or not self.is_fresh(entry)):
+            entry = self._load_shared(url, entry)
+        return entry
+
+    def lock(self, url):
+        """Cross-process lock held while refreshing url
+
+        A no-op when unshared or when the shared backend cannot be reached:
+        like the shared copies, the lock only saves upstream requests.
+        """
+        if self.shared is None:
+            return nullcontext()
+        stack = ExitStack()
+        try:
+            stack.enter_context(self.shared.lock(self._shared_key(url)))
+        except Exception as e:
+            print(f"Error locking shared {self.name} cache: {e}")
+            return nullcontext()
+        return stack
+
+    def _shared_key(self, url):
+        return f"{self.name}:{url}"
+
+    def _load_shared(self, url, entry):
+        """Adopt the shared copy of url if it is newer than entry"""
+        try:
+            record = self.shared.get(self._shared_key(url))
+            if not record:
+                return entry
+            # Monotonic clocks differ between processes; go by wall-clock age
+            age = max(0.0, time.time() - record['stored_at'])
+            fetched_at = time.monotonic() - age
+            if entry and entry['fetched_at'] >= fetched_at:
+                return entry
+            data = self.decode(record['data']) if self.decode else record['data']
+        except Exception as e:
+            print(f"Error reading shared {self.name} cache: {e}")
+            return entry
+
+        shared_entry = {
+            'data': data,
+            'content_hash': record.get('content_hash'),
+            'etag': record.get('etag'),
+            'last_modified': record.get('last_modified'),
+            'fetched_at': fetched_at,
+        }
+        with self._lock:
+            self._entries[url] = shared_entry
+        return shared_entry
+
+    def _save_shared(self, url, entry):
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(self._shared_key(url), {
+                'data': self.encode(entry['data']) if self.encode else entry['data'],
+                'content_hash': entry['content_hash'],
+                'etag': entry['etag'],
+                'last_modified': entry['last_modified'],
+                'stored_at': time.time(),
+            }, ttl=self.SHARED_ENTRY_TTL)
+        except Exception as e:
+            print(f"Error writing shared {self.name} cache: {e}")
+
+    def is_fresh(self, entry):
+        """Whether an entry may be served without asking upstream"""
+        return time.monotonic() - entry['fetched_at'] < self.ttl
+
+    def conditional_headers(self, entry):
+        """Request headers that revalidate an entry against upstream"""
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, data, response, digest=None):
+        """Cache parsed data together with the response's validators"""
+        entry = {
+            'data': data,
+            'content_hash': digest,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.monotonic(),
+        }
+        with self._lock:
+            self._entries[url] = entry
+        self._save_shared(url, entry)
+        return entry
+
+    def touch(self, url):
+        """Mark an entry as freshly revalidated (upstream answered 304)"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry:
+                entry['fetched_at'] = time.monotonic()
+        if entry:
+            self._save_shared(url, entry)
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and share its result (or its exception).
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class Metrics:
+    """Process-wide stage timers and counters
+
+    ``timer(stage)`` accumulates call counts and seconds per stage (fetches,
+    parses, formatting); ``inc(name, **labels)`` bumps a labelled counter.
+    Both are cheap enough to leave on in production. The totals are rendered
+    in Prometheus text format or returned as a JSON-friendly snapshot.
+    """
+
+    COUNTERS = {
+        'lunch_cache_requests_total': 'Page cache lookups by cache and result',
+        'lunch_upstream_errors_total': 'Failed requests to the school site',
+        'lunch_upstream_retries_total': 'Transient upstream failures retried, by host',
+        'lunch_circuit_rejected_total': (
+            'Upstream requests refused by an open circuit, by host'
+        ),
+        'lunch_circuit_opened_total': 'Times a host circuit opened',
+        'lunch_fallback_parser_total': 'Days formatted with the text fallback parsers',
+        'lunch_archive_hits_total': 'Date lookups answered from the menu archive',
+    }
+
     def __init__(self):
-        self.base_url = "https://ostrbovlje.si"
-        self.menu_url = "https://ostrbovlje.si/prehrana/"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        # name -> (help, fn returning {labels tuple: value}), read on render
+        self._gauges = {}
+
+    def register_gauge(self, name, help_text, fn):
+        """Render fn()'s ``{(('label', 'value'), ...): number}`` as a gauge"""
+        with self._lock:
+            self._gauges[name] = (help_text, fn)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            totals = self._stages.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self, reset=False):
+        """``{'stages': {stage: {count, seconds}}, 'counters': {...}}``
+
+        Counter keys are Prometheus-style ``name{label="value"}`` strings.
+        ``reset=True`` clears the totals, so each snapshot covers one interval.
+        """
+        with self._lock:
+            stages = {
+                stage: {'count': count, 'seconds': round(seconds, 6)}
+                for stage, (count, seconds) in sorted(self._stages.items())
+            }
+            counters = {
+                self._series(name, labels): value
+                for (name, labels), value in sorted(self._counters.items())
+            }
+            if reset:
+                self._stages.clear()
+                self._counters.clear()
+        return {'stages': stages, 'counters': counters}
+
+    def render_prometheus(self):
+        """The totals in Prometheus text exposition format"""
+        with self._lock:
+            stages = sorted(self._stages.items())
+            counters = sorted(self._counters.items())
+
+        lines = [
+            '# HELP lunch_stage_seconds Time spent in each stage of resolving a menu',
+            '# TYPE lunch_stage_seconds summary',
+        ]
+        for stage, (count, seconds) in stages:
+            labels = (('stage', stage),)
+            total = self._series('lunch_stage_seconds_sum', labels)
+            lines.append(f"{total} {seconds:.6f}")
+            lines.append(f"{self._series('lunch_stage_seconds_count', labels)} {count}")
+
+        for name, help_text in self.COUNTERS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (series_name, labels), value in counters:
+                if series_name == name:
+                    lines.append(f"{self._series(name, labels)} {value}")
+
+        with self._lock:
+            gauges = sorted(self._gauges.items())
+        for name, (help_text, fn) in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in sorted(fn().items()):
+                lines.append(f"{self._series(name, labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    @staticmethod
+    def _series(name, labels):
+        if not labels:
+            return name
+        rendered = []
+        for key, value in labels:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"')
+            value = value.replace('\n', '\\n')
+            rendered.append(f'{key}="{value}"')
+        return name + '{' + ','.join(rendered) + '}'
+
+
+class TokenBucket:
+    """Allow ``rate`` acquisitions per second, with bursts of up to ``burst``"""
+
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take one token if one is available; returns 0 or the seconds until one is"""
+        with self._lock:
+            now = self._clock()
+            refilled = self._tokens + (now - self._updated) * self.rate
+            self._tokens = min(self.burst, refilled)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns the wait"""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            self._sleep(delay)
+            waited += delay
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of contacting a host whose circuit is open
+
+    Not a requests exception, so importing this module stays free of
+    requests; callers catch it next to requests.RequestException.
+    """
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream host
+
+    ``closed``: requests flow. After ``failures`` consecutive transient
+    failures it turns ``open`` and refuses requests for ``reset_timeout``
+    seconds, then ``half-open``: one trial request is let through, and its
+    outcome closes or re-opens the circuit.
+    """
+
+    STATES = {'closed': 0, 'half-open': 1, 'open': 2}
+
+    def __init__(self, failures, reset_timeout, clock=time.monotonic):
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failed = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Whether a request may go out now"""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failed = 0
+            self._opened_at = None
+            self._trial = False
+
+    def cancel_trial(self):
+        """Give the half-open trial slot back (the request never completed)"""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        """Count a transient failure; returns True when it opened the circuit"""
+        with self._lock:
+            self._failed += 1
+            was_open = self._opened_at is not None
+            if self._trial or self._failed >= self.failures:
+                self._opened_at = self._clock()
+                self._trial = False
+                return not was_open
+            return False
+
+
+class UpstreamFetcher:
+    """The fetch layer every upstream GET of LunchMenuChecker goes through
+
+    Per host it applies a token-bucket rate limit and a circuit breaker.
+    Transient failures (connection errors, timeouts, 429/502/503/504) are
+    retried with full-jitter exponential backoff, honouring Retry-After.
+    Each attempt waits at most ``timeout`` seconds and all attempts together
+    at most ``deadline``: a retry is only made when it can start before the
+    deadline, and it gets whatever time is left. GETs are idempotent, so
+    retrying is always safe. Other errors and responses are returned or
+    raised unchanged on the first attempt.
+    """
+
+    def __init__(self, rate=UPSTREAM_RATE, burst=UPSTREAM_BURST,
+                 retries=UPSTREAM_RETRIES, backoff=RETRY_BACKOFF,
+                 max_backoff=RETRY_MAX_BACKOFF,
+                 breaker_failures=BREAKER_FAILURES, breaker_reset=BREAKER_RESET,
+                 timeout=UPSTREAM_TIMEOUT, deadline=UPSTREAM_DEADLINE,
+                 sleep=time.sleep, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.timeout = timeout
+        self.deadline = deadline
+        self._sleep = sleep
+        self._clock = clock
+        self._random = random.Random()
+        self._buckets = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forget every host's limiter and breaker state"""
+        with self._lock:
+            self._buckets.clear()
+            self._breakers.clear()
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def breaker(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(
+                    self.breaker_failures, self.breaker_reset
+                )
+            return self._breakers[host]
+
+    def circuit_states(self):
+        """``{(('host', host),): 0 closed / 1 half-open / 2 open}`` for metrics"""
+        with self._lock:
+            breakers = list(self._breakers.items())
+        return {
+            (('host', host),): CircuitBreaker.STATES[breaker.state]
+            for host, breaker in breakers
+        }
+
+    def is_open(self, url):
+        """Whether url's host is currently refusing requests"""
+        return self.breaker(urlparse(url).netloc).state == 'open'
+
+    def get(self, session, url, headers=None, metrics=None):
+        """GET url through session; returns the response or raises"""
+        host = urlparse(url).netloc
+        breaker = self.breaker(host)
+        started = self._clock()
+        attempt = 0
+        while True:
+            self._admit(host, breaker, metrics)
+            if self.rate:
+                waited = self.bucket(host).acquire()
+                if waited and metrics:
+                    metrics.observe('rate_limit', waited)
+
+            retry_after = None
+            timeout = self._attempt_timeout(started)
+            try:
+                if headers:
+                    response = session.get(url, timeout=timeout, headers=headers)
+                else:
+                    response = session.get(url, timeout=timeout)
+                if response.status_code in TRANSIENT_STATUSES:
+                    retry_after = response.headers.get('Retry-After')
+                    response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.HTTPError) as e:
+                delay = self._retry_delay(
+                    host, breaker, attempt, retry_after, started, metrics
+                )
+                if delay is None:
+                    raise e
+                self._sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                breaker.cancel_trial()
+                raise
+            self._record_response(host, breaker, response, metrics)
+            return response
+
+    def _record_response(self, host, breaker, response, metrics=None):
+        """Count a final response: 5xx is a failure, anything else a success"""
+        if response.status_code in SERVER_ERROR_STATUSES:
+            if breaker.record_failure() and metrics:
+                metrics.inc('lunch_circuit_opened_total', host=host)
+        else:
+            breaker.record_success()
+
+    def _admit(self, host, breaker, metrics=None):
+        """Raise CircuitOpenError unless host's breaker lets a request out"""
+        if not breaker.allow():
+            if metrics:
+                metrics.inc('lunch_circuit_rejected_total', host=host)
+            raise CircuitOpenError(f"Circuit open for {host}, not contacting it")
+
+    def _attempt_timeout(self, started):
+        """Timeout of the next attempt: ``timeout``, cut to the time left"""
+        return min(self.timeout, max(0.001, self.deadline - (self._clock() - started)))
+
+    def _retry_delay(self, host, breaker, attempt, retry_after, started, metrics=None):
+        """Record a transient failure; returns the wait before the next
+        attempt, or None when the request should fail instead"""
+        if breaker.record_failure() and metrics:
+            metrics.inc('lunch_circuit_opened_total', host=host)
+        delay = self._delay(attempt, retry_after)
+        if attempt >= self.retries or self._clock() - started + delay >= self.deadline:
+            return None
+        if metrics:
+            metrics.inc('lunch_upstream_retries_total', host=host)
+        return delay
+
+    def _delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, or the server's Retry-After"""
+        if retry_after and retry_after.strip().isdigit():
+            return min(self.max_backoff, float(retry_after))
+        ceiling = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return self._random.uniform(0, ceiling)
+
+
+# Shared by every LunchMenuChecker in the process
+upstream_flight = SingleFlight()
+upstream = UpstreamFetcher()
+listing_cache = PageCache(
+    LISTING_CACHE_TTL, 'listing', _encode_listing, _decode_listing
+)
+week_cache = PageCache(WEEK_CACHE_TTL, 'week', _encode_week, _decode_week)
+metrics = Metrics()
+metrics.register_gauge(
+    'lunch_circuit_state', 'Upstream circuit per host: 0 closed, 1 half-open, 2 open',
+    upstream.circuit_states
+)
+# Formatted allergen legends by (week page content hash, dish allergen mask)
+allergen_memo = OrderedDict()
+_allergen_memo_lock = threading.Lock()
+ALLERGEN_MEMO_SIZE = 256
+# Text-parser results for days the week table lacks (weekends, for one), by
+# (content hash, date, menu title), so they are parsed once per page version
+fallback_memo = OrderedDict()
+_fallback_memo_lock = threading.Lock()
+FALLBACK_MEMO_SIZE = 256
+
+
+_session_lock = threading.Lock()
+_shared_session = None
+_shared_session_created = 0.0
+# Sessions for the other school hosts: {host: (session, created)}
+_host_sessions = {}
+
+
+def _new_session():
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=HOST_POOL_SIZE, pool_block=True
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
+
+
+def shared_session(base_url=None):
+    """The process-wide requests.Session used to talk to a school site
+
+    Reusing it keeps connections in its pool alive across requests (and
+    across warm serverless invocations), so they skip the TCP and TLS
+    handshakes. Every host gets its own session with a bounded connection
+    pool, so schools on different hosts never queue behind each other.
+    Sessions are replaced after SESSION_TTL seconds.
+    """
+    global _shared_session, _shared_session_created
+    host = urlparse(base_url).netloc if base_url else None
+    with _session_lock:
+        if host is None or host == urlparse(BASE_URL).netloc:
+            expired = time.monotonic() - _shared_session_created >= SESSION_TTL
+            if _shared_session is None or expired:
+                if _shared_session is not None:
+                    _shared_session.close()
+                _shared_session = _new_session()
+                _shared_session_created = time.monotonic()
+            return _shared_session
+
+        session, created = _host_sessions.get(host, (None, 0.0))
+        if session is None or time.monotonic() - created >= SESSION_TTL:
+            if session is not None:
+                session.close()
+            session = _new_session()
+            _host_sessions[host] = (session, time.monotonic())
+        return session
+
+
+def clear_caches():
+    """Drop all cached upstream pages"""
+    listing_cache.clear()
+    week_cache.clear()
+    with _allergen_memo_lock:
+        allergen_memo.clear()
+    with _fallback_memo_lock:
+        fallback_memo.clear()
+
+
+def configure_shared_cache(store):
+    """Share parsed pages with other workers and nodes through store
+
+    store is a cache_backends.CacheBackend (or None to stop sharing).
+    """
+    listing_cache.shared = store
+    week_cache.shared = store
+
+
+class LunchMenuChecker:
+    upstream_flight = upstream_flight
+    upstream = upstream
+    listing_cache = listing_cache
+    week_cache = week_cache
+    metrics = metrics
+    # Optional persistent store (menu_archive.MenuArchive) consulted before
+    # going upstream for date lookups
+    archive = None
+    profile = PARSER_PROFILES[DEFAULT_PARSER_PROFILE]
+    # Prefix of this school's page cache keys (empty for the default school)
+    namespace = ''
+
+    def __init__(self, archive=None, base_url=None, menu_url=None, school=None):
+        """school (a schools.School) supplies the URLs, parser profile and
+        cache namespace; otherwise the module-level URLs are used."""
+        self.archive = archive
+        if school is not None:
+            base_url = base_url or school.base_url
+            menu_url = menu_url or school.menu_url
+            self.profile = PARSER_PROFILES[school.profile]
+            self.namespace = school.namespace
+        self.base_url = (base_url or BASE_URL).rstrip('/')
+        if menu_url:
+            self.menu_url = menu_url
+        elif base_url:
+            self.menu_url = self.base_url + '/prehrana/'
+        else:
+            self.menu_url = MENU_URL
+        self.session = self._open_session()
+
+    def _open_session(self):
+        """The HTTP session used to reach self.base_url"""
+        return shared_session(self.base_url)
+
+    def _absolute_url(self, href):
+        """Turn a link href from the school site into an absolute URL"""
+        if href.startswith('/'):
+            return self.base_url + href
+        elif not href.startswith('http'):
+            return self.base_url + '/' + href
+        return href
+
+    def _fetch_cached(self, cache, url, parse, revalidate=False):
+        """Fetch url through a PageCache, parsing the body with parse()
+
+        Fresh entries are served from memory; expired ones are revalidated with
+        a conditional GET, so a 304 (or a 200 with an unchanged body) reuses
+        the cached parse. ``revalidate=True`` skips the freshness check.
+        """
+        key = f"{self.namespace}:{url}" if self.namespace else url
+        entry = cache.get(key)
+        if entry and not revalidate and cache.is_fresh(entry):
+            self.metrics.inc(
+                'lunch_cache_requests_total', cache=cache.name, result='hit'
+            )
+            return entry['data']
+
+        def refresh():
+            # Workers sharing the cache take turns, so one of them goes
+            # upstream and the rest pick up its result
+            with cache.lock(key):
+                return self._refresh_cached(cache, url, parse, revalidate, key)
+
+        # Concurrent misses for the same URL share one upstream request
+        return self.upstream_flight.do(key, refresh)
+
+    def _refresh_cached(self, cache, url, parse, revalidate, key=None):
+        """Fetch (or revalidate) url and update its cache entry (under key)"""
+        key = key or url
+        entry = cache.get(key)
+        if entry and not revalidate and cache.is_fresh(entry):
+            # Another request refreshed it while we were queued
+            self.metrics.inc(
+                'lunch_cache_requests_total', cache=cache.name, result='hit'
+            )
+            return entry['data']
+
+        headers = cache.conditional_headers(entry)
+        try:
+            with self.metrics.timer(f'{cache.name}_fetch'):
+                response = self.fetch(url, headers)
+        except CircuitOpenError:
+            if entry is None:
+                raise
+            # The school site is down: keep serving the expired copy
+            self.metrics.inc(
+                'lunch_cache_requests_total', cache=cache.name, result='stale'
+            )
+            return entry['data']
+        except Exception:
+            self.metrics.inc('lunch_upstream_errors_total', cache=cache.name)
+            raise
+        return self._update_cached(cache, key, entry, response, parse)
+
+    def _update_cached(self, cache, key, entry, response, parse):
+        """Apply an upstream response to key's cache entry; returns the data"""
+        if entry and response.status_code == 304:
+            cache.touch(key)
+            self.metrics.inc(
+                'lunch_cache_requests_total', cache=cache.name, result='revalidated'
+            )
+            return entry['data']
+        try:
+            response.raise_for_status()
+        except Exception:
+            self.metrics.inc('lunch_upstream_errors_total', cache=cache.name)
+            raise
+
+        digest = content_hash(response.content)
+        if entry and entry['content_hash'] == digest:
+            # Upstream ignored the validators but the page is unchanged
+            self.metrics.inc(
+                'lunch_cache_requests_total', cache=cache.name, result='revalidated'
+            )
+            data = entry['data']
+        else:
+            self.metrics.inc(
+                'lunch_cache_requests_total', cache=cache.name, result='miss'
+            )
+            with self.metrics.timer(f'{cache.name}_parse'):
+                data = parse(response.content)
+        return cache.store(key, data, response, digest)['data']
+
+    def fetch(self, url, headers=None):
+        """GET url from the school site through the fetch layer (UpstreamFetcher)"""
+        return self.upstream.get(self.session, url, headers, self.metrics)
+
+    def _fetch_menu_links(self, revalidate=False):
+        """Fetch the prehrana page and parse every Jedilnik link on it
+
+        Returns a ``(all_menus, fallback_links)`` tuple: ``all_menus`` holds the
+        links whose text carries a parsable date range, ``fallback_links`` every
+        Jedilnik link in page order (used when no date range can be parsed).
+        The parsed listing is shared process-wide through ``listing_cache``.
+        """
+        return self._fetch_cached(
+            self.listing_cache, self.menu_url, self._parse_menu_links, revalidate
+        )
+
+    def _parse_menu_links(self, content):
+        """Parse the Jedilnik links out of the prehrana page HTML"""
+        soup = bs4.BeautifulSoup(content, 'html.parser')
+
+        all_menus = []
+        fallback_links = []
+
+        # Look for menu links - they typically contain "Jedilnik" and date ranges
+        for link in soup.find_all('a', href=True):
+            link_text = link.get_text().strip()
+            if self.profile['link_keyword'] in link_text.lower():
+                href = self._absolute_url(link.get('href'))
+                fallback_links.append({'url': href, 'text': link_text})
+
+                # Extract date range from the link text
+                date_match = re.search(r'(\d{1,2})\.(\d{1,2})\.–(\d{1,2})\.(\d{1,2})\.\s*(\d{4})', link_text)
+                if date_match:
+                    start_day, start_month, end_day, end_month, year = map(int, date_match.groups())
+
+                    # Create date objects for the week range
+                    try:
+                        start_date = datetime(year, start_month, start_day)
+                        end_date = datetime(year, end_month, end_day)
+                    except ValueError:
+                        continue
+
+                    all_menus.append({
+                        'url': href,
+                        'text': link_text,
+                        'start_date': start_date,
+                        'end_date': end_date
+                    })
+
+        return all_menus, fallback_links
+
+    def _select_menu_for_date(self, all_menus, target_date):
+        """Pick the menu whose date range contains target_date"""
+        current_week_links = [
+            menu for menu in all_menus
+            if menu['start_date'] <= target_date <= menu['end_date']
+        ]
+
+        # If we found links for the target date, return the most recent one
+        if current_week_links:
+            current_week_links.sort(key=lambda x: x['start_date'], reverse=True)
+            return current_week_links[0]
+
+        return None
+
+    def _select_current_menu(self, all_menus, fallback_links):
+        """Pick the menu for today
+
+        Handles the edge case where on Friday, the school may have already
+        published next week's menu, making the current week's Friday fall
+        outside the new menu's date range.
+        """
+        today = menu_now()
+        today_date_only = today.replace(hour=0, minute=0, second=0, microsecond=0)
+        is_friday = today.weekday() == 4  # Friday is weekday 4
+
+        # Priority 1: Menu where today falls within [start_date, end_date]
+        for menu in all_menus:
+            if menu['start_date'] <= today_date_only <= menu['end_date']:
+                return menu
+
+        # Priority 2: If it's Friday, look for menu where end_date == today
+        # This handles the case where school published next week's menu
+        if is_friday:
+            for menu in all_menus:
+                if menu['end_date'].date() == today_date_only.date():
+                    return menu
+
+        # Priority 3: Most recent menu whose end_date >= today
+        # (current week's menu that hasn't ended yet)
+        valid_menus = [m for m in all_menus if m['end_date'] >= today_date_only]
+        if valid_menus:
+            # Sort by start date descending and return the most recent
+            valid_menus.sort(key=lambda x: x['start_date'], reverse=True)
+            return valid_menus[0]
+
+        # Priority 4: Fallback - get the most recent menu overall
+        if all_menus:
+            return sorted(all_menus, key=lambda x: x['start_date'], reverse=True)[0]
+
+        # Ultimate fallback: get any menu link without date parsing
+        if fallback_links:
+            return fallback_links[0]
+
+        return None
 
     def get_current_week_menu_url_for_date(self, target_date=None):
         """Fetch the menu URL for a specific date (or current week if None)"""
         if target_date is None:
             return self.get_current_week_menu_url()
-        
+
         try:
-            response = self.session.get(self.menu_url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for menu links - they typically contain "Jedilnik" and date ranges
-            menu_links = soup.find_all('a', href=True)
-            current_week_links = []
-            
-            for link in menu_links:
-                link_text = link.get_text().strip()
-                if 'Jedilnik' in link_text or 'jedilnik' in link_text.lower():
-                    # Extract date range from the link text
-                    date_match = re.search(r'(\d{1,2})\.(\d{1,2})\.–(\d{1,2})\.(\d{1,2})\.\s*(\d{4})', link_text)
-                    if date_match:
-                        start_day, start_month, end_day, end_month, year = map(int, date_match.groups())
-                        
-                        # Create date objects for the week range
-                        try:
-                            start_date = datetime(year, start_month, start_day)
-                            end_date = datetime(year, end_month, end_day)
-                            
-                            # Check if target_date falls within this week
-                            if start_date <= target_date <= end_date:
-                                href = link.get('href')
-                                if href.startswith('/'):
-                                    href = self.base_url + href
-                                elif not href.startswith('http'):
-                                    href = self.base_url + '/' + href
-                                
-                                current_week_links.append({
-                                    'url': href,
-                                    'text': link_text,
-                                    'start_date': start_date,
-                                    'end_date': end_date
-                                })
-                        except ValueError:
-                            continue
-            
-            # If we found links for the target date, return the first one
-            if current_week_links:
-                current_week_links.sort(key=lambda x: x['start_date'], reverse=True)
-                return current_week_links[0]
-            
-            return None
-            
-        except requests.RequestException as e:
+            all_menus, _ = self._fetch_menu_links()
+            return self._select_menu_for_date(all_menus, target_date)
+        except (requests.RequestException, CircuitOpenError) as e:
             print(f"Error fetching menu page: {e}")
             return None
         except Exception as e:
             print(f"Error parsing menu page: {e}")
             return None
-    
+
     def get_current_week_menu_url(self):
-        """Fetch the current week's menu URL from the main prehrana page
-        
-        Handles the edge case where on Friday, the school may have already
-        published next week's menu, making the current week's Friday fall
-        outside the new menu's date range.
-        """
+        """Fetch the current week's menu URL from the main prehrana page"""
         try:
-            response = self.session.get(self.menu_url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for menu links - they typically contain "Jedilnik" and date ranges
-            menu_links = soup.find_all('a', href=True)
-            
-            today = datetime.now()
-            today_date_only = today.replace(hour=0, minute=0, second=0, microsecond=0)
-            is_friday = today.weekday() == 4  # Friday is weekday 4
-            
-            # Collect all valid menu links with their date ranges
-            all_menus = []
-            
-            for link in menu_links:
-                link_text = link.get_text().strip()
-                if 'Jedilnik' in link_text or 'jedilnik' in link_text.lower():
-                    # Extract date range from the link text
-                    date_match = re.search(r'(\d{1,2})\.(\d{1,2})\.–(\d{1,2})\.(\d{1,2})\.\s*(\d{4})', link_text)
-                    if date_match:
-                        start_day, start_month, end_day, end_month, year = map(int, date_match.groups())
-                        
-                        # Create date objects for the week range
-                        try:
-                            start_date = datetime(year, start_month, start_day)
-                            end_date = datetime(year, end_month, end_day)
-                            
-                            href = link.get('href')
-                            if href.startswith('/'):
-                                href = self.base_url + href
-                            elif not href.startswith('http'):
-                                href = self.base_url + '/' + href
-                            
-                            all_menus.append({
-                                'url': href,
-                                'text': link_text,
-                                'start_date': start_date,
-                                'end_date': end_date
-                            })
-                        except ValueError:
-                            continue
-            
-            # Priority 1: Menu where today falls within [start_date, end_date]
-            for menu in all_menus:
-                if menu['start_date'] <= today_date_only <= menu['end_date']:
-                    return menu
-            
-            # Priority 2: If it's Friday, look for menu where end_date == today
-            # This handles the case where school published next week's menu
-            if is_friday:
-                for menu in all_menus:
-                    if menu['end_date'].date() == today_date_only.date():
-                        return menu
-            
-            # Priority 3: Most recent menu whose end_date >= today
-            valid_menus = [m for m in all_menus if m['end_date'] >= today_date_only]
-            if valid_menus:
-                valid_menus.sort(key=lambda x: x['start_date'], reverse=True)
-                return valid_menus[0]
-            
-            # Priority 4: Fallback - get the most recent menu overall
-            if all_menus:
-                all_menus.sort(key=lambda x: x['start_date'], reverse=True)
-                return all_menus[0]
-            
-            # Ultimate fallback: get any menu link without date parsing
-            fallback_links = []
-            for link in menu_links:
-                link_text = link.get_text().strip()
-                if 'Jedilnik' in link_text or 'jedilnik' in link_text.lower():
-                    href = link.get('href')
-                    if href.startswith('/'):
-                        href = self.base_url + href
-                    elif not href.startswith('http'):
-                        href = self.base_url + '/' + href
-                    fallback_links.append({'url': href, 'text': link_text})
-            
-            if fallback_links:
-                return fallback_links[0]
-                
-            return None
-            
-        except requests.RequestException as e:
+            all_menus, fallback_links = self._fetch_menu_links()
+            return self._select_current_menu(all_menus, fallback_links)
+        except (requests.RequestException, CircuitOpenError) as e:
             print(f"Error fetching menu page: {e}")
             return None
         except Exception as e:
             print(f"Error parsing menu page: {e}")
             return None
 
-    def extract_allergen_info(self, soup):
-        """Extract allergen information from the menu page"""
+    def extract_allergen_info(self, soup, digest=None, mask=None):
+        """Extract allergen information from the menu page
+
+        Prefers the page's "Alergeni:" legend; without one, lists the codes
+        in ``mask`` (the dishes' allergens, already read by the table
+        parser) or, when that is empty, the known allergen codes that appear
+        on the page. Given the page's content hash the result is memoized
+        (together with ``mask``, which decides what is scanned), so each page
+        version is scanned once.
+        """
+        key = (digest, mask or 0)
+        if digest is not None:
+            with _allergen_memo_lock:
+                if key in allergen_memo:
+                    allergen_memo.move_to_end(key)
+                    return allergen_memo[key]
         try:
-            # Get all text content
-            full_text = soup.get_text()
-            
-            # Look for the allergen section - it typically starts with "Alergeni:"
-            allergen_match = re.search(r'Alergeni:(.+?)(?=Ta teden|$)', full_text, re.DOTALL | re.IGNORECASE)
-            
-            if allergen_match:
-                allergen_text = allergen_match.group(1).strip()
-                
-                # Parse the allergen codes and their meanings
-                allergen_pairs = []
-                
-                # Split by commas and parse each allergen code
-                # Pattern matches: "G – gluten", "GS – gorčično seme", etc.
-                allergen_pattern = r'([A-ZŽ]+)\s*[–-]\s*([^,]+)'
-                matches = re.findall(allergen_pattern, allergen_text)
-                
-                for code, meaning in matches:
-                    code = code.strip()
-                    meaning = meaning.strip()
-                    if code and meaning:
-                        allergen_pairs.append(f"{code} = {meaning}")
-                
-                if allergen_pairs:
-                    # Format the allergen information nicely
-                    result = ""
-                    for i, allergen in enumerate(allergen_pairs):
-                        if i > 0 and i % 3 == 0:  # New line every 3 items
-                            result += "\n"
-                        if i > 0 and i % 3 != 0:  # Add spacing between items on same line
-                            result += ", "
-                        result += allergen
-                    return result
-            
-            # Fallback: look for common allergen patterns in the text
-            fallback_allergens = {
-                'G': 'gluten',
-                'J': 'jajce',
-                'S': 'soja', 
-                'L': 'laktoza',
-                'GS': 'gorčično seme',
-                'R': 'ribe',
-                'O': 'oreščki',
-                'SE': 'sezam',
-                'Z': 'zelena',
-                'ŽD': 'žveplov dioksid',
-                'RA': 'raki',
-                'M': 'mehkužci',
-                'V': 'volčji bob'
-            }
-            
-            # Check which allergen codes appear in the current menu
-            used_allergens = []
-            for code, meaning in fallback_allergens.items():
-                # Look for the code followed by common patterns (–, comma, space, etc.)
-                if re.search(rf'\b{re.escape(code)}(?=[–\-,\s]|$)', full_text):
-                    used_allergens.append(f"{code} = {meaning}")
-            
-            if used_allergens:
-                # Format the used allergens
-                result = ""
-                for i, allergen in enumerate(used_allergens):
-                    if i > 0 and i % 3 == 0:  # New line every 3 items
-                        result += "\n"
-                    if i > 0 and i % 3 != 0:  # Add spacing between items on same line
-                        result += ", "
-                    result += allergen
-                return result
-                
-            return None
-            
+            pairs, used_codes = scan_allergens(soup.get_text(), codes=not mask)
+            if mask:
+                used_codes = allergen_codes(mask)
+            allergen_info = format_allergens(pairs) or format_allergens(
+                (code, ALLERGENS[code]) for code in used_codes
+            )
         except Exception as e:
             print(f"Error extracting allergen info: {e}")
             return None
 
+        if digest is not None:
+            with _allergen_memo_lock:
+                allergen_memo[key] = allergen_info
+                while len(allergen_memo) > ALLERGEN_MEMO_SIZE:
+                    allergen_memo.popitem(last=False)
+        return allergen_info
+
+    def get_week_menu(self, url, revalidate=False):
+        """Fetch and parse a weekly menu page, shared through week_cache"""
+        return self._fetch_cached(
+            self.week_cache, url, lambda content: self._parse_week_menu(url, content),
+            revalidate
+        )
+
+    def _parse_week_menu(self, url, content):
+        """Parse every day row of a weekly menu page into a WeekMenu"""
+        with self.metrics.timer('week_soup'):
+            soup = bs4.BeautifulSoup(content, 'html.parser')
+        week = WeekMenu(url=url, content_hash=content_hash(content), content=content)
+
+        day_by_label = {
+            short.upper(): weekday for weekday, (_, short) in SLOVENIAN_DAYS.items()
+        }
+
+        with self.metrics.timer('week_table'):
+            # Look for the table structure
+            table = soup.find('table')
+            if table:
+                # Based on the table structure we discovered:
+                # Cell 0: Day abbreviation (PON, TOR, SRE, etc.)
+                # Cell 1: MALICA items
+                # Cell 2: KOSILO items
+                # Cell 3: POP. MALICA items
+                for row in table.find_all('tr'):
+                    cells = row.find_all(['td', 'th'])
+                    if not cells:
+                        continue
+
+                    label = cells[0].get_text().strip().upper()
+                    weekday = day_by_label.get(label)
+                    if weekday is None or weekday in week.days:
+                        continue
+
+                    sections = {}
+                    columns = self.profile['sections']
+                    if len(cells) > len(columns):  # Make sure we have all the cells
+                        for section, cell in zip(columns, cells[1:]):
+                            # Split by newlines and clean up
+                            items = []
+                            for item in re.split(r'[\n\r]+', cell.get_text().strip()):
+                                item = item.strip()
+                                if item and len(item) > 1:
+                                    items.append(item)
+                            sections[section] = items
+                    # Per-dish allergen bitmasks are derived from the items
+                    week.days[weekday] = DayMenu(
+                        weekday=weekday, label=label, sections=sections
+                    )
+
+        with self.metrics.timer('allergens'):
+            # The dish codes were read with the day rows; the page text is
+            # only scanned for the legend (or for codes when no dish had any)
+            mask = 0
+            for day in week.days.values():
+                mask |= day.allergen_mask
+            week.allergen_info = self.extract_allergen_info(
+                soup, week.content_hash, mask
+            )
+        return week
+
     def get_lunch_menu_for_date(self, menu_info, target_date):
         """Extract lunch menu for a specific date from the weekly menu page"""
         if not menu_info:
             return "Could not find menu for the specified date."
-        
-        try:
-            response = self.session.get(menu_info['url'], timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Get day name in Slovenian for the target date
-            slovenian_days = {
-                0: ['ponedeljek', 'pon'],  # Monday
-                1: ['torek', 'tor'],       # Tuesday
-                2: ['sreda', 'sre'],       # Wednesday
-                3: ['četrtek', 'čet'],     # Thursday
-                4: ['petek', 'pet'],       # Friday
-                5: ['sobota', 'sob'],      # Saturday
-                6: ['nedelja', 'ned']      # Sunday
-            }
-            
-            today_name = slovenian_days.get(target_date.weekday(), ['', ''])[0]
-            today_short = slovenian_days.get(target_date.weekday(), ['', ''])[1]
-            today_formatted = target_date.strftime("%d.%m.%Y")
-            today_short_date = target_date.strftime("%d.%m")
-            
-            return self._extract_menu_from_soup(soup, menu_info, today_name, today_short, today_formatted, today_short_date, target_date)
-            
-        except requests.RequestException as e:
-            return f"Napaka pri pridobivanju jedilnika: {e}"
-        except Exception as e:
-            return f"Napaka pri obdelavi jedilnika: {e}"
-    
+        return self._day_menu(menu_info, target_date)[0]
+
     def get_today_lunch_menu(self, menu_info):
         """Extract today's lunch menu from the weekly menu page"""
         if not menu_info:
             return "Could not find current week's menu."
-        
+        return self._day_menu(menu_info, menu_now())[0]
+
+    def _day_menu(self, menu_info, day):
+        """Return ``(menu_text, error)`` for one day of menu_info's week
+
+        ``error`` is None on success; otherwise menu_text is the user-facing
+        error message.
+        """
         try:
-            response = self.session.get(menu_info['url'], timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Get today's day name in Slovenian
-            today = datetime.now()
-            slovenian_days = {
-                0: ['ponedeljek', 'pon'],  # Monday
-                1: ['torek', 'tor'],       # Tuesday
-                2: ['sreda', 'sre'],       # Wednesday
-                3: ['četrtek', 'čet'],     # Thursday
-                4: ['petek', 'pet'],       # Friday
-                5: ['sobota', 'sob'],      # Saturday
-                6: ['nedelja', 'ned']      # Sunday
-            }
-            
-            today_name = slovenian_days.get(today.weekday(), ['', ''])[0]
-            today_short = slovenian_days.get(today.weekday(), ['', ''])[1]
-            today_formatted = today.strftime("%d.%m.%Y")
-            today_short_date = today.strftime("%d.%m")
-            
-            return self._extract_menu_from_soup(soup, menu_info, today_name, today_short, today_formatted, today_short_date, today)
-            
-        except requests.RequestException as e:
-            return f"Napaka pri pridobivanju jedilnika: {e}"
+            week = self.get_week_menu(menu_info['url'])
+            self._archive_week(week, menu_info)
+            with self.metrics.timer('format'):
+                return self._format_day_menu(week, menu_info, day), None
+        except (requests.RequestException, CircuitOpenError) as e:
+            return f"Napaka pri pridobivanju jedilnika: {e}", str(e)
         except Exception as e:
-            return f"Napaka pri obdelavi jedilnika: {e}"
-    
-    def _extract_menu_from_soup(self, soup, menu_info, today_name, today_short, today_formatted, today_short_date, today):
-        """Extract menu from BeautifulSoup object for a specific day"""
+            return f"Napaka pri obdelavi jedilnika: {e}", str(e)
+
+    def _archive_week(self, week, menu_info):
+        """Record a parsed week in the archive, if one is configured"""
+        if self.archive is None:
+            return
         try:
-            # Look for the table structure
-            table = soup.find('table')
-            if table:
-                # Parse the table to extract today's menu
-                rows = table.find_all('tr')
-                
-                # Find the row index for today's day
-                today_row_index = -1
-                
-                # Look for the row that contains today's day abbreviation in the first cell
-                for i, row in enumerate(rows):
-                    cells = row.find_all(['td', 'th'])
-                    if len(cells) > 0:
-                        first_cell_text = cells[0].get_text().strip().upper()
-                        if first_cell_text == today_short.upper():
-                            today_row_index = i
-                            break
-                
-                # If we found today's row, extract the menu items from the appropriate cells
-                if today_row_index >= 0:
-                    today_row = rows[today_row_index]
-                    cells = today_row.find_all(['td', 'th'])
-                    
-                    menu_sections = {'MALICA': [], 'KOSILO': [], 'POP. MALICA': []}
-                    
-                    # Based on the table structure we discovered:
-                    # Cell 0: Day abbreviation (PON, TOR, SRE, etc.)
-                    # Cell 1: MALICA items
-                    # Cell 2: KOSILO items  
-                    # Cell 3: POP. MALICA items
-                    
-                    if len(cells) >= 4:  # Make sure we have all the cells
-                        # Extract MALICA items (cell 1)
-                        if len(cells) > 1:
-                            malica_text = cells[1].get_text().strip()
-                            if malica_text:
-                                # Split by newlines and clean up
-                                malica_items = []
-                                for item in re.split(r'[\n\r]+', malica_text):
-                                    item = item.strip()
-                                    if item and len(item) > 1:
-                                        malica_items.append(item)
-                                menu_sections['MALICA'] = malica_items
-                        
-                        # Extract KOSILO items (cell 2)
-                        if len(cells) > 2:
-                            kosilo_text = cells[2].get_text().strip()
-                            if kosilo_text:
-                                # Split by newlines and clean up
-                                kosilo_items = []
-                                for item in re.split(r'[\n\r]+', kosilo_text):
-                                    item = item.strip()
-                                    if item and len(item) > 1:
-                                        kosilo_items.append(item)
-                                menu_sections['KOSILO'] = kosilo_items
-                        
-                        # Extract POP. MALICA items (cell 3)
-                        if len(cells) > 3:
-                            pop_malica_text = cells[3].get_text().strip()
-                            if pop_malica_text:
-                                # Split by newlines and clean up
-                                pop_malica_items = []
-                                for item in re.split(r'[\n\r]+', pop_malica_text):
-                                    item = item.strip()
-                                    if item and len(item) > 1:
-                                        pop_malica_items.append(item)
-                                menu_sections['POP. MALICA'] = pop_malica_items
-                    
-                    # If we found menu items, format and return them
-                    if any(menu_sections.values()):
-                        result = f"🍽️ Kosilo za {today_name}, {today_formatted}\n"
-                        result += f"📋 Jedilnik: {menu_info['text']}\n\n"
-                        result += f"{today_short.upper()}, {today_short_date}\n"
-                        
-                        if menu_sections['MALICA']:
-                            result += f"🥗 MALICA: {' | '.join(menu_sections['MALICA'])}\n"
-                        if menu_sections['KOSILO']:
-                            result += f"🍝 KOSILO: {' | '.join(menu_sections['KOSILO'])}\n"
-                        if menu_sections['POP. MALICA']:
-                            result += f"🍎 POP. MALICA: {' | '.join(menu_sections['POP. MALICA'])}\n"
-                        
-                        # Add allergen information
-                        allergen_info = self.extract_allergen_info(soup)
-                        if allergen_info:
-                            result += f"\n📋 ALERGENI:\n{allergen_info}"
-                        
-                        return result
-            
-            # Fallback: Parse the text content line by line
+            self.archive.record_week(week, menu_info)
+        except Exception as e:
+            print(f"Error archiving menu: {e}")
+
+    def _format_day_menu(self, week, menu_info, day):
+        """Format one day of a parsed WeekMenu for display"""
+        today_name, today_short = SLOVENIAN_DAYS.get(day.weekday(), ['', ''])
+        today_formatted = day.strftime("%d.%m.%Y")
+        today_short_date = day.strftime("%d.%m")
+
+        day_menu = week.day(day.weekday())
+        if not day_menu or not day_menu.has_items():
+            return self._fallback_day_menu(week, menu_info, day)
+
+        result = f"🍽️ Kosilo za {today_name}, {today_formatted}\n"
+        result += f"📋 Jedilnik: {menu_info['text']}\n\n"
+        result += f"{today_short.upper()}, {today_short_date}\n"
+
+        if day_menu.sections.get('MALICA'):
+            result += f"🥗 MALICA: {' | '.join(day_menu.sections['MALICA'])}\n"
+        if day_menu.sections.get('KOSILO'):
+            result += f"🍝 KOSILO: {' | '.join(day_menu.sections['KOSILO'])}\n"
+        if day_menu.sections.get('POP. MALICA'):
+            result += f"🍎 POP. MALICA: {' | '.join(day_menu.sections['POP. MALICA'])}\n"
+
+        # Add allergen information
+        if week.allergen_info:
+            result += f"\n📋 ALERGENI:\n{week.allergen_info}"
+
+        return result
+
+    def _fallback_day_menu(self, week, menu_info, day):
+        """Format a day the week table lacks with the text parsers
+
+        The result is memoized per page version, so repeated lookups of such
+        a day (every weekend request for today) parse the page only once.
+        """
+        key = (week.content_hash, day.date(), menu_info['text'])
+        if week.content_hash is not None:
+            with _fallback_memo_lock:
+                if key in fallback_memo:
+                    fallback_memo.move_to_end(key)
+                    return fallback_memo[key]
+
+        today_name, today_short = SLOVENIAN_DAYS.get(day.weekday(), ['', ''])
+        self.metrics.inc('lunch_fallback_parser_total')
+        with self.metrics.timer('fallback_parse'):
+            soup = bs4.BeautifulSoup(week.content, 'html.parser')
+            result = self._extract_menu_from_soup(
+                soup, menu_info, today_name, today_short, day.strftime("%d.%m.%Y"),
+                day.strftime("%d.%m"), day, week.content_hash
+            )
+
+        if week.content_hash is not None:
+            with _fallback_memo_lock:
+                fallback_memo[key] = result
+                while len(fallback_memo) > FALLBACK_MEMO_SIZE:
+                    fallback_memo.popitem(last=False)
+        return result
+
+    def _extract_menu_from_soup(self, soup, menu_info, today_name, today_short,
+                                today_formatted, today_short_date, today,
+                                digest=None):
+        """Extract menu for a specific day from the page text
+
+        Used when the menu table (see ``_parse_week_menu``) has no row for the
+        day; tries progressively looser text-based parsers.
+        """
+        try:
+            # Parse the text content line by line
             menu_text = soup.get_text()
             lines = menu_text.split('\n')
             
@@ -506,7 +1522,7 @@ class LunchMenuChecker:
                     result += f"🍎 POP. MALICA: {', '.join(today_menu_items['POP. MALICA'])}\n"
                 
                 # Add allergen information
-                allergen_info = self.extract_allergen_info(soup)
+                allergen_info = self.extract_allergen_info(soup, digest)
                 if allergen_info:
                     result += f"\n📋 ALERGENI:\n{allergen_info}"
                 
@@ -543,7 +1559,7 @@ class LunchMenuChecker:
                     result += f"🍎 POP. MALICA: {', '.join(pop_malica_items)}\n"
                 
                 # Add allergen information
-                allergen_info = self.extract_allergen_info(soup)
+                allergen_info = self.extract_allergen_info(soup, digest)
                 if allergen_info:
                     result += f"\n📋 ALERGENI:\n{allergen_info}"
                 
@@ -570,146 +1586,257 @@ class LunchMenuChecker:
         except Exception as e:
             return f"Napaka pri obdelavi jedilnika: {e}"
 
-    def check_lunch_menu_for_date(self, target_date):
-        """Check lunch menu for a specific date"""
-        print(f"🔍 Iščem jedilnik za {target_date.strftime('%d.%m.%Y')}...")
-        
-        # Get menu URL for the target date
-        menu_info = self.get_current_week_menu_url_for_date(target_date)
+    def resolve_menu(self, target_date=None):
+        """Resolve the selected menu and the day's menu text in one pass
+
+        Fetches the prehrana listing once and the selected week page once.
+        Returns a dict with ``menu_info`` (the selected link, or None),
+        ``menu`` (the formatted day menu or an error message) and ``error``
+        (None, or why the school site could not be read or parsed).
+        """
+        with self.metrics.timer('resolve'):
+            return self._resolve_menu(target_date)
+
+    def _resolve_menu(self, target_date):
+        archived = self._archived_resolution(target_date)
+        if archived:
+            return archived
+
+        menu_info = None
+        error = None
+        try:
+            menu_info = self.select_menu(*self._fetch_menu_links(), target_date)
+        except (requests.RequestException, CircuitOpenError) as e:
+            print(f"Error fetching menu page: {e}")
+            error = str(e)
+        except Exception as e:
+            print(f"Error parsing menu page: {e}")
+            error = str(e)
+
         if not menu_info:
-            return f"❌ Ne morem najti jedilnika za {target_date.strftime('%d.%m.%Y')}. Preverite internetno povezavo."
-        
+            return self._menu_not_found(target_date, error)
+
         print(f"📋 Našel jedilnik: {menu_info['text']}")
-        
-        # Get lunch menu for the target date
-        lunch_menu = self.get_lunch_menu_for_date(menu_info, target_date)
-        return lunch_menu
-    
+
+        menu, error = self._day_menu(menu_info, target_date or menu_now())
+        return {'menu_info': menu_info, 'menu': menu, 'error': error}
+
+    def _archived_resolution(self, target_date):
+        """Announce the lookup and answer date lookups from the archive index
+
+        Returns a resolve_menu() result, or None when upstream must be asked.
+        """
+        if target_date is None:
+            print("🔍 Iščem današnji jedilnik...")
+            return None
+        print(f"🔍 Iščem jedilnik za {target_date.strftime('%d.%m.%Y')}...")
+
+        archived = self._lookup_archive(target_date)
+        if not archived:
+            return None
+        self.metrics.inc('lunch_archive_hits_total')
+        menu_info, week = archived
+        return {
+            'menu_info': menu_info,
+            'menu': self._format_day_menu(week, menu_info, target_date),
+            'error': None,
+        }
+
+    def select_menu(self, all_menus, fallback_links, target_date=None):
+        """Today's menu (with the Friday rules) or the one covering target_date
+
+        ``all_menus`` and ``fallback_links`` are as returned by menu_links().
+        """
+        if target_date is None:
+            return self._select_current_menu(all_menus, fallback_links)
+        return self._select_menu_for_date(all_menus, target_date)
+
+    def _menu_not_found(self, target_date, error):
+        if target_date is None:
+            menu = "❌ Ne morem najti trenutnega jedilnika."
+        else:
+            menu = f"❌ Ne morem najti jedilnika za {target_date.strftime('%d.%m.%Y')}."
+        menu += " Preverite internetno povezavo."
+        return {'menu_info': None, 'menu': menu, 'error': error}
+
+    def prefetch(self):
+        """Warm the caches with the listing and the current and next week
+
+        Revalidates the listing and both week pages against upstream (cheap
+        conditional GETs when nothing changed) so user requests hit a warm
+        cache. Returns the URLs of the warmed week pages.
+        """
+        all_menus, fallback_links = self._fetch_menu_links(revalidate=True)
+
+        today = menu_now().replace(hour=0, minute=0, second=0, microsecond=0)
+        current = self._select_current_menu(all_menus, fallback_links)
+        upcoming = sorted(
+            (m for m in all_menus if m['start_date'] > today),
+            key=lambda x: x['start_date']
+        )
+
+        warmed = []
+        for menu_info in [current] + upcoming[:1]:
+            if menu_info and menu_info['url'] not in warmed:
+                week = self.get_week_menu(menu_info['url'], revalidate=True)
+                self._archive_week(week, menu_info)
+                warmed.append(menu_info['url'])
+        return warmed
+
+    # The archive tools (crawler.py, backfill.py, snapshot.py) use these
+    # rather than the fetch and parse internals
+
+    def menu_links(self, revalidate=False):
+        """The listing's links as ``(all_menus, fallback_links)``
+
+        See _fetch_menu_links.
+        """
+        return self._fetch_menu_links(revalidate)
+
+    def parse_listing(self, content):
+        """Parse a fetched listing page into ``(all_menus, fallback_links)``"""
+        return self._parse_menu_links(content)
+
+    def parse_week(self, url, content):
+        """Parse a fetched week page into a WeekMenu"""
+        return self._parse_week_menu(url, content)
+
+    @staticmethod
+    def week_links(all_menus, fallback_links):
+        """Every linked week once, in page order, dated where the link text allows
+
+        Dated links carry the date range the archive needs to index days.
+        """
+        dated = {menu['url']: menu for menu in all_menus}
+        links = []
+        seen = set()
+        for link in fallback_links:
+            if link['url'] not in seen:
+                seen.add(link['url'])
+                links.append(dated.get(link['url'], link))
+        return links
+
+    def day_menu(self, menu_info, day):
+        """``(menu_text, error)`` for one day of a selected week, see _day_menu"""
+        return self._day_menu(menu_info, day)
+
+    def _lookup_archive(self, target_date):
+        """Return ``(menu_info, week)`` for target_date from the archive, or None"""
+        if self.archive is None:
+            return None
+        try:
+            return self.archive.lookup(target_date.date())
+        except Exception as e:
+            print(f"Error reading menu archive: {e}")
+            return None
+
+    def check_lunch_menu_for_date(self, target_date):
+        """Check lunch menu for a specific date"""
+        return self.resolve_menu(target_date)['menu']
+
     def check_lunch_menu(self):
         """Main method to check today's lunch menu"""
-        print("🔍 Iščem današnji jedilnik...")
-        
-        # Get current week's menu URL
-        menu_info = self.get_current_week_menu_url()
-        if not menu_info:
-            return "❌ Ne morem najti trenutnega jedilnika. Preverite internetno povezavo."
-        
-        print(f"📋 Našel jedilnik: {menu_info['text']}")
-        
-        # Get today's lunch menu
-        lunch_menu = self.get_today_lunch_menu(menu_info)
-        return lunch_menu
+        return self.resolve_menu()['menu']
+
+
+def extract_date_range(menu_title):
+    """Extract the "d. m. – d. m. yyyy" date range from a menu title"""
+    date_match = re.search(
+        r'(\d{1,2}\.\s*\d{1,2}\.\s*–\s*\d{1,2}\.\s*\d{1,2}\.\s*\d{4})', menu_title
+    )
+    if date_match:
+        return date_match.group(1)
+    return None
+
+
+def menu_covers(menu_info, day):
+    """Whether menu_info is a dated week whose range contains day"""
+    if not menu_info or 'start_date' not in menu_info:
+        return False
+    return menu_info['start_date'].date() <= day.date() <= menu_info['end_date'].date()
+
+
+def menu_payload(menu_info, menu, day=None):
+    """The /api/menu JSON fields describing one resolved day's menu
+
+    With day (the day being served), ``covers_day`` tells whether the menu's
+    week actually contains it, see menu_cache_headers().
+    """
+    payload = {'success': True, 'menu': menu}
+    if day is not None:
+        payload['covers_day'] = menu_covers(menu_info, day)
+
+    # Add menu URL and date range if available
+    if menu_info:
+        payload['source_url'] = menu_info['url']
+        payload['menu_title'] = menu_info['text']
+
+        date_range = extract_date_range(menu_info['text'])
+        if date_range:
+            payload['date_range'] = date_range
+    return payload
+
+
+def menu_etag(payload):
+    """Strong ETag (quoted) over the menu content of an API payload"""
+    content = {k: v for k, v in payload.items() if k not in VOLATILE_PAYLOAD_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False).encode()
+    return '"' + hashlib.sha256(encoded).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value matches etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def _menu_timezone():
+    # Without a system tz database the rules come from the tzdata package
+    return ZoneInfo(TIMEZONE)
+
+
+def menu_now():
+    """The current Ljubljana wall-clock time as a naive datetime
+
+    Menu dates are naive Ljubljana dates, while the host may run on UTC.
+    """
+    return datetime.now(_menu_timezone()).replace(tzinfo=None)
+
+
+def cache_headers(now=None):
+    """Cache-Control / Expires headers valid until the next Ljubljana midnight
+
+    Today's menu cannot change meaning before the day ends, so browsers and
+    CDNs may keep a response exactly until then.
+    """
+    tz = _menu_timezone()
+    now = now.astimezone(tz) if now else datetime.now(tz)
+    tomorrow = now + timedelta(days=1)
+    midnight = tomorrow.replace(hour=0, minute=0, second=0, microsecond=0)
+    # Subtract in UTC so DST transitions are accounted for
+    expires = midnight.astimezone(timezone.utc)
+    max_age = max(0, int((expires - now.astimezone(timezone.utc)).total_seconds()))
+    return {
+        'Cache-Control': f'public, max-age={max_age}',
+        'Expires': format_datetime(expires, usegmt=True),
+    }
+
+
+def menu_cache_headers(payload, now=None):
+    """cache_headers() for a payload whose menu covers the served day
+
+    Anything else (the last listed week as a fallback, no menu found) may be
+    replaced by the right week at any time, so it gets ``no-cache``.
+    """
+    if not payload.get('covers_day'):
+        return {'Cache-Control': 'no-cache'}
+    return cache_headers(now)
 
-class LunchMenuGUI:
-    def __init__(self):
-        if not TKINTER_AVAILABLE:
-            raise ImportError("Tkinter is not available. Cannot create GUI.")
-        self.checker = LunchMenuChecker()
-        self.setup_gui()
-    
-    def setup_gui(self):
-        """Setup the GUI interface"""
-        self.root = tk.Tk()
-        self.root.title("🍽️ Šolski Jedilnik - Osnovna šola Trbovlje")
-        self.root.geometry("600x500")
-        self.root.configure(bg='#f0f0f0')
-        
-        # Title
-        title_label = tk.Label(
-            self.root, 
-            text="🍽️ Šolski Jedilnik",
-            font=("Arial", 16, "bold"),
-            bg='#f0f0f0',
-            fg='#2c3e50'
-        )
-        title_label.pack(pady=10)
-        
-        # Subtitle
-        subtitle_label = tk.Label(
-            self.root,
-            text="Osnovna šola Trbovlje",
-            font=("Arial", 12),
-            bg='#f0f0f0',
-            fg='#7f8c8d'
-        )
-        subtitle_label.pack(pady=(0, 20))
-        
-        # Check button
-        self.check_button = tk.Button(
-            self.root,
-            text="🔍 Preveri današnji jedilnik",
-            font=("Arial", 14, "bold"),
-            bg='#3498db',
-            fg='white',
-            relief='raised',
-            borderwidth=2,
-            padx=20,
-            pady=10,
-            command=self.check_menu_threaded
-        )
-        self.check_button.pack(pady=10)
-        
-        # Result text area
-        self.result_text = scrolledtext.ScrolledText(
-            self.root,
-            wrap=tk.WORD,
-            width=70,
-            height=20,
-            font=("Arial", 10),
-            bg='white',
-            fg='#2c3e50',
-            relief='sunken',
-            borderwidth=2
-        )
-        self.result_text.pack(pady=20, padx=20, fill='both', expand=True)
-        
-        # Initial message
-        initial_message = """👋 Dobrodošli v aplikaciji za preverjanje šolskega jedilnika!
-
-🔹 Kliknite na gumb "Preveri današnji jedilnik" za prikaz današnjega kosila
-🔹 Aplikacija avtomatsko poišče najnovejši jedilnik na spletni strani šole
-🔹 Prikazan bo jedilnik za današnji dan
-
-📍 Osnovna šola Trbovlje
-🌐 https://ostrbovlje.si/prehrana/"""
-        
-        self.result_text.insert('1.0', initial_message)
-        self.result_text.config(state='disabled')
-    
-    def check_menu_threaded(self):
-        """Check menu in a separate thread to avoid GUI freezing"""
-        self.check_button.config(state='disabled', text="⏳ Preverjam...")
-        self.result_text.config(state='normal')
-        self.result_text.delete('1.0', tk.END)
-        self.result_text.insert('1.0', "🔍 Pridobivam podatke o jedilniku...\nProsimo počakajte...")
-        self.result_text.config(state='disabled')
-        
-        def check_menu():
-            try:
-                result = self.checker.check_lunch_menu()
-                
-                # Update GUI in main thread
-                self.root.after(0, lambda: self.update_result(result))
-            except Exception as e:
-                error_msg = f"❌ Napaka: {str(e)}"
-                self.root.after(0, lambda: self.update_result(error_msg))
-        
-        thread = threading.Thread(target=check_menu)
-        thread.daemon = True
-        thread.start()
-    
-    def update_result(self, result):
-        """Update the result text area"""
-        self.result_text.config(state='normal')
-        self.result_text.delete('1.0', tk.END)
-        self.result_text.insert('1.0', result)
-        self.result_text.config(state='disabled')
-        
-        self.check_button.config(state='normal', text="🔍 Preveri današnji jedilnik")
-    
-    def run(self):
-        """Run the GUI application"""
-        self.root.mainloop()
 
 def main():
     """Main function"""
@@ -721,7 +1848,12 @@ def main():
         print(result)
         print("="*50)
     else:
-        # GUI mode
+        # GUI mode - the tkinter GUI lives in its own module, loaded only here
+        try:
+            from lunch_menu_gui import LunchMenuGUI, TKINTER_AVAILABLE
+        except ImportError:
+            TKINTER_AVAILABLE = False
+
         if not TKINTER_AVAILABLE:
             print("❌ GUI mode is not available (tkinter not installed).")
             print("Running in CLI mode instead...")